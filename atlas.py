@@ -0,0 +1,124 @@
+import pygame
+
+
+class TextureAtlas:
+    """
+    A few large SRCALPHA pages plus an index key -> subsurface of a page.
+    Subsurfaces share pixels with their page, so code that already holds
+    them keeps working.
+    """
+
+    def __init__(self, pages, regions):
+        self.pages = pages
+        self.regions = regions
+
+    def __getitem__(self, key):
+        return self.regions[key]
+
+    def __contains__(self, key):
+        return key in self.regions
+
+    def __len__(self):
+        return len(self.regions)
+
+    def memory_bytes(self):
+        return sum(p.get_width() * p.get_height() * p.get_bytesize() for p in self.pages)
+
+
+def pack_surfaces(items, page_size=1024, padding=1):
+    """
+    Shelf-pack (key, surface) pairs into pages of page_size x page_size.
+    Tallest surfaces go first; anything larger than a page gets a page of its own.
+    """
+    order = sorted(items, key=lambda kv: (-kv[1].get_height(), -kv[1].get_width()))
+    placements = []  # (key, surface, page_index, x, y)
+    page_sizes = []
+    page = -1
+    x = y = shelf_h = 0
+    for key, surf in order:
+        w, h = surf.get_size()
+        if w + padding > page_size or h + padding > page_size:
+            page_sizes.append((w, h))
+            placements.append((key, surf, len(page_sizes) - 1, 0, 0))
+            page = -1
+            continue
+        if page < 0 or x + w + padding > page_size:
+            x = 0
+            y += shelf_h
+            shelf_h = 0
+        if page < 0 or y + h + padding > page_size:
+            page_sizes.append((page_size, page_size))
+            page = len(page_sizes) - 1
+            x = y = shelf_h = 0
+        placements.append((key, surf, page, x, y))
+        x += w + padding
+        shelf_h = max(shelf_h, h + padding)
+
+    # обрезаем страницы по фактически занятой области
+    used = [(0, 0)] * len(page_sizes)
+    for key, surf, page_index, px, py in placements:
+        uw, uh = used[page_index]
+        used[page_index] = (max(uw, px + surf.get_width()), max(uh, py + surf.get_height()))
+
+    pages = []
+    for size in used:
+        surf = pygame.Surface(size, pygame.SRCALPHA)
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert_alpha()
+        surf.fill((0, 0, 0, 0))
+        pages.append(surf)
+    regions = {}
+    for key, surf, page_index, px, py in placements:
+        page_surf = pages[page_index]
+        page_surf.blit(surf, (px, py), special_flags=pygame.BLEND_RGBA_MAX)
+        regions[key] = page_surf.subsurface((px, py, surf.get_width(), surf.get_height()))
+    return TextureAtlas(pages, regions)
+
+
+class RenderQueue:
+    """
+    Collects (surface, dest) draws and flushes them with one Surface.blits
+    call per layer: lower layers first, submission order inside a layer, so
+    the z-order is the same as blitting one by one. Software blits have no
+    per-source state to switch, so atlas subsurfaces, rotated frames and
+    loose surfaces share the call; what it saves is a Python-level blit per
+    sprite.
+    """
+
+    def __init__(self):
+        self._layers = {}  # layer -> [(surface, dest), ...]
+        self.batches = 0
+
+    def __len__(self):
+        return sum(len(seq) for seq in self._layers.values())
+
+    def _layer(self, layer):
+        seq = self._layers.get(layer)
+        if seq is None:
+            seq = self._layers[layer] = []
+        return seq
+
+    def push(self, surface, dest, layer=0):
+        self._layer(layer).append((surface, dest))
+
+    def extend(self, seq, layer=0):
+        self._layer(layer).extend(seq)
+
+    def push_sprites(self, sprites, layer=0):
+        self._layer(layer).extend((s.image, s.rect) for s in sprites)
+
+    def clear(self):
+        for seq in self._layers.values():
+            seq.clear()
+
+    def flush(self, target):
+        """Draw everything queued onto target and empty the queue; returns blits calls made."""
+        calls = 0
+        for layer in sorted(self._layers):
+            seq = self._layers[layer]
+            if seq:
+                target.blits(seq, doreturn=False)
+                seq.clear()  # список остаётся — в следующем кадре без новых аллокаций
+                calls += 1
+        self.batches = calls
+        return calls
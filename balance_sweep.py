@@ -0,0 +1,330 @@
+"""
+Balance sweep: many headless games played by a scripted autopilot, one per
+(parameter combination, seed), spread over a multiprocessing pool.
+
+    python balance_sweep.py --param SPAWN_INTERVAL=600,800,1000 \\
+                            --param ENEMY_SPEED=2,2.5,3 --seeds 50 \\
+                            [--mode classic] [--max-seconds 600] [--workers N]
+                            [--purchase quantum_capacitor] [--out sweep.csv]
+                            [--reaction-ms 350] [--aim-error 18]
+    python balance_sweep.py --check-quality --seeds 5 [--mode horde]
+
+Any numeric main_game constant can be swept; TUNABLES lists the usual ones.
+--out gets one row per game (params, seed, survival time, score, max enemy
+level); --summary (default: <out>_summary.csv) gets one row per combination
+with means and medians. A .parquet file name writes Parquet when pandas
+with pyarrow is installed.
+"""
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+# SDL иначе перехватывает SIGTERM, и Pool.terminate() не может остановить воркер
+os.environ["SDL_NO_SIGNAL_HANDLERS"] = "1"
+
+import main_game as mg
+from quality import LEVELS
+
+TUNABLES = ("SPAWN_INTERVAL", "ENEMY_SPEED", "DIFFICULTY_INTERVAL", "POWERUP_INTERVAL",
+            "POWERUP_DURATION", "ENEMY_DAMAGE_BASE", "ENEMY_DAMAGE_PER_LEVEL", "MAX_ENEMY_LEVEL",
+            "FIRE_RATE", "PLAYER_SPEED_BASE", "HORDE_SPAWN_INTERVAL", "HORDE_WAVE",
+            "HORDE_CONTACT_DAMAGE")
+RESULT_FIELDS = ("seed", "survived_s", "score", "max_level", "ticks", "timed_out")
+
+# Автопилот: держится дальше KITE_RADIUS от ближайших врагов и не прижимается к стенам
+KITE_RADIUS = 190
+WALL_MARGIN = 90
+PICKUP_RADIUS = 260  # бонус ближе этого и рядом нет угрозы — едем за ним
+# «человечность»: решение пересматривается раз в REACTION_MS, прицел с ошибкой AIM_ERROR_DEG
+# (без этого автопилот сбивает каждого врага с первого выстрела и не умирает никогда)
+REACTION_MS = 350
+AIM_ERROR_DEG = 18.0
+
+
+class Autopilot:
+    """
+    input_source for run loops: aims at the nearest enemy, always fires and
+    steers away from enemies inside KITE_RADIUS (weighted by closeness), off
+    the walls, and toward a nearby power-up when nothing is close.
+    It only looks at the field every reaction_ms and aims with a gaussian
+    error of aim_error_deg, so it plays like a decent human, not a turret.
+    """
+
+    def __init__(self, seed=0, reaction_ms=REACTION_MS, aim_error_deg=AIM_ERROR_DEG,
+                 kite_radius=KITE_RADIUS, wall_margin=WALL_MARGIN):
+        self.rng = random.Random(f"{seed}:autopilot")
+        self.reaction_ms = reaction_ms
+        self.aim_error = aim_error_deg
+        self.kite_radius = kite_radius
+        self.wall_margin = wall_margin
+        self._next_look = 0
+        self._inputs = None
+
+    @staticmethod
+    def _enemy_positions(state):
+        pts = [(e.pos.x, e.pos.y) for e in state.enemies]
+        horde = state.horde
+        if horde is not None and len(horde):
+            n = len(horde)
+            pts.extend(zip(horde.x[:n].tolist(), horde.y[:n].tolist()))
+        return pts
+
+    def __call__(self, state):
+        if self._inputs is None or state.now >= self._next_look:
+            self._inputs = self._decide(state)
+            self._next_look = state.now + self.reaction_ms
+        return self._inputs
+
+    def _decide(self, state):
+        px, py = state.player.pos
+        enemies = self._enemy_positions(state)
+        aim = (mg.WIDTH // 2, 0)
+        vx = vy = 0.0
+        threat = False
+        if enemies:
+            ex, ey = min(enemies, key=lambda p: (p[0] - px) ** 2 + (p[1] - py) ** 2)
+            a = math.atan2(ey - py, ex - px) + math.radians(self.rng.gauss(0.0, self.aim_error))
+            aim = (int(px + 200 * math.cos(a)), int(py + 200 * math.sin(a)))
+            r = self.kite_radius
+            for ex, ey in enemies:
+                dx, dy = px - ex, py - ey
+                d = math.hypot(dx, dy)
+                if d < r:
+                    threat = True
+                    w = (r - d) / r / max(d, 1.0)
+                    vx += dx * w
+                    vy += dy * w
+        m = self.wall_margin
+        if px < m:
+            vx += (m - px) / m
+        elif px > mg.WIDTH - m:
+            vx -= (px - (mg.WIDTH - m)) / m
+        if py < m:
+            vy += (m - py) / m
+        elif py > mg.HEIGHT - m:
+            vy -= (py - (mg.HEIGHT - m)) / m
+        if not threat and state.powerups:
+            target = min(state.powerups, key=lambda p: (p.rect.centerx - px) ** 2 + (p.rect.centery - py) ** 2)
+            dx, dy = target.rect.centerx - px, target.rect.centery - py
+            if math.hypot(dx, dy) < PICKUP_RADIUS:
+                vx, vy = vx + dx, vy + dy
+        dead = 0.15 * max(abs(vx), abs(vy), 1e-9)  # мелкую составляющую не жмём
+        return mg.InputState(up=vy < -dead, down=vy > dead, left=vx < -dead, right=vx > dead,
+                             mouse_pos=aim, fire=True)
+
+
+# ------------------------------------------------------------------ воркеры
+
+_defaults = {}
+
+
+def _init_worker():
+    mg.PARTICLES = False  # только картинка, а стоит времени симуляции
+    win = mg.init_headless()
+    mg.Assets.prepare_assets()
+    mg.preload_assets(win, show=False)
+    for name in TUNABLES:
+        _defaults[name] = getattr(mg, name)
+
+
+def play(job):
+    """One game: job = (params, seed, mode, purchases, max_ticks, pilot kwargs). Returns a result row."""
+    params, seed, mode, purchases, max_ticks, skill = job
+    if not _defaults:
+        _init_worker()
+    for name, value in _defaults.items():
+        setattr(mg, name, value)
+    for name, value in params.items():
+        setattr(mg, name, value)
+    state = mg.GameState(purchases=purchases, mode=mode, seed=seed)
+    pilot = Autopilot(seed, **skill)
+    while not state.game_over and state.ticks < max_ticks:
+        state.step(pilot(state), mg.SIM_DT)
+    row = dict(params)
+    row.update(seed=seed, survived_s=round(state.now / 1000, 3), score=state.score,
+               max_level=state.max_enemy_level, ticks=state.ticks, timed_out=int(not state.game_over))
+    return row
+
+
+def check_quality(seeds, mode, purchases, max_ticks, skill):
+    """
+    Plays every seed once per quality level. The governor may only change
+    the picture, so ticks and score have to match across levels; returns the
+    seeds where they don't.
+    """
+    _init_worker()
+    mismatched = []
+    try:
+        for seed in seeds:
+            results = []
+            for settings in LEVELS:
+                mg.apply_quality(settings)
+                row = play(({}, seed, mode, purchases, max_ticks, skill))
+                results.append((settings["name"], row["ticks"], row["score"]))
+            same = len({r[1:] for r in results}) == 1
+            print(f"  seed {seed}: " + "  ".join(f"{n} {t}t/{s}" for n, t, s in results)
+                  + ("" if same else "  MISMATCH"))
+            if not same:
+                mismatched.append(seed)
+    finally:
+        mg.apply_quality(LEVELS[0])
+    return mismatched
+
+
+# ------------------------------------------------------------------ сетка и сводка
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() and "." not in text else value
+
+
+def parse_params(specs):
+    """['NAME=a,b,c', ...] -> {NAME: [a, b, c]} for numeric main_game constants."""
+    grid = {}
+    for spec in specs or ():
+        name, _, values = spec.partition("=")
+        name = name.strip().upper()
+        if not values:
+            raise SystemExit(f"--param {spec!r}: expected NAME=v1,v2,...")
+        current = getattr(mg, name, None)
+        if isinstance(current, bool) or not isinstance(current, (int, float)):
+            raise SystemExit(f"--param {name}: not a numeric main_game constant")
+        grid[name] = [_number(v.strip()) for v in values.split(",") if v.strip()]
+    return grid
+
+
+def combinations(grid):
+    names = list(grid)
+    for values in itertools.product(*(grid[n] for n in names)):
+        yield dict(zip(names, values))
+
+
+def summarize(rows, names):
+    """One row per parameter combination: games, means, medians, timeouts."""
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(row[n] for n in names), []).append(row)
+    out = []
+    for key in sorted(groups):
+        games = groups[key]
+        survived = [r["survived_s"] for r in games]
+        scores = [r["score"] for r in games]
+        levels = [r["max_level"] for r in games]
+        summary = dict(zip(names, key))
+        summary.update(games=len(games),
+                       survived_mean=round(statistics.fmean(survived), 2),
+                       survived_median=round(statistics.median(survived), 2),
+                       score_mean=round(statistics.fmean(scores), 1),
+                       score_median=statistics.median(scores),
+                       max_level_mean=round(statistics.fmean(levels), 2),
+                       timeouts=sum(r["timed_out"] for r in games))
+        out.append(summary)
+    return out
+
+
+def write_table(path, rows, fields):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    if path.endswith(".parquet"):
+        try:
+            import pandas
+            pandas.DataFrame(rows, columns=fields).to_parquet(path, index=False)
+        except ImportError as e:
+            raise SystemExit(f"{path}: Parquet needs pandas and pyarrow ({e}); use a .csv name")
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Headless balance sweep with an autopilot player")
+    ap.add_argument("--param", action="append", metavar="NAME=v1,v2,...",
+                    help="main_game constant and the values to try (repeatable)")
+    ap.add_argument("--seeds", type=int, default=20, help="games per parameter combination")
+    ap.add_argument("--seed-base", type=int, default=1)
+    ap.add_argument("--mode", choices=("classic", "horde"), default="classic")
+    ap.add_argument("--purchase", action="append", default=[], help="owned shop item (repeatable)")
+    ap.add_argument("--max-seconds", type=float, default=600, help="sim time cap per game")
+    ap.add_argument("--reaction-ms", type=float, default=REACTION_MS, help="autopilot decision interval")
+    ap.add_argument("--aim-error", type=float, default=AIM_ERROR_DEG, help="autopilot aim spread, degrees")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--out", default="sweep.csv")
+    ap.add_argument("--summary", help="per-combination table (default: <out>_summary)")
+    ap.add_argument("--check-quality", action="store_true",
+                    help="play each seed at every quality level and verify ticks and score match")
+    args = ap.parse_args()
+
+    if args.check_quality:
+        seeds = range(args.seed_base, args.seed_base + args.seeds)
+        skill = {"reaction_ms": args.reaction_ms, "aim_error_deg": args.aim_error}
+        bad = check_quality(seeds, args.mode, {item: True for item in args.purchase},
+                            int(args.max_seconds * mg.SIM_HZ), skill)
+        print(f"quality levels: {len(seeds) - len(bad)}/{len(seeds)} seeds identical")
+        sys.exit(1 if bad else 0)
+
+    grid = parse_params(args.param)
+    names = list(grid)
+    purchases = {item: True for item in args.purchase}
+    max_ticks = int(args.max_seconds * mg.SIM_HZ)
+    skill = {"reaction_ms": args.reaction_ms, "aim_error_deg": args.aim_error}
+    jobs = [(params, args.seed_base + i, args.mode, purchases, max_ticks, skill)
+            for params in combinations(grid) for i in range(args.seeds)]
+    print(f"{len(jobs)} games ({len(jobs) // args.seeds} combinations x {args.seeds} seeds) "
+          f"on {args.workers} workers")
+
+    rows = []
+    t0 = time.perf_counter()
+    report_every = max(1, len(jobs) // 20)
+    if args.workers > 1:
+        pool = multiprocessing.Pool(args.workers, initializer=_init_worker)
+        try:
+            chunk = max(1, len(jobs) // (args.workers * 8))
+            for row in pool.imap_unordered(play, jobs, chunksize=chunk):
+                rows.append(row)
+                if len(rows) % report_every == 0:
+                    print(f"  {len(rows)}/{len(jobs)}  {time.perf_counter() - t0:.0f}s", file=sys.stderr)
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    else:
+        for job in jobs:
+            rows.append(play(job))
+            if len(rows) % report_every == 0:
+                print(f"  {len(rows)}/{len(jobs)}  {time.perf_counter() - t0:.0f}s", file=sys.stderr)
+    elapsed = time.perf_counter() - t0
+
+    rows.sort(key=lambda r: (tuple(r[n] for n in names), r["seed"]))
+    write_table(args.out, rows, names + list(RESULT_FIELDS))
+    base, ext = os.path.splitext(args.out)
+    summary_path = args.summary or f"{base}_summary{ext or '.csv'}"
+    summary = summarize(rows, names)
+    write_table(summary_path, summary, list(summary[0]) if summary else names)
+
+    sim_s = sum(r["survived_s"] for r in rows)
+    print(f"done in {elapsed:.1f}s: {sim_s / 60:.0f} sim-minutes, "
+          f"{sum(r['ticks'] for r in rows) / max(elapsed, 1e-9):.0f} ticks/s overall")
+    header = "  ".join(f"{n:>14}" for n in names)
+    print(f"{header}  {'games':>5} {'surv med s':>10} {'score med':>9} {'max lvl':>7}")
+    for s in summary:
+        cols = "  ".join(f"{s[n]:>14}" for n in names)
+        print(f"{cols}  {s['games']:>5} {s['survived_median']:>10} {s['score_median']:>9} {s['max_level_mean']:>7}")
+    print(f"games: {args.out}\nsummary: {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
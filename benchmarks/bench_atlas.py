@@ -0,0 +1,102 @@
+"""
+Sprite draw cost on real game frames: the autopilot from balance_sweep plays
+a seeded game and every few ticks the draw list (horde, then all sprites with
+their interpolated rects) is recorded. Each frame is then drawn one blit at a
+time and through RenderQueue (one blits call per layer); the two results are
+compared pixel for pixel, so a z-order change shows up as a mismatch.
+
+    python benchmarks/bench_atlas.py [--mode classic horde] [--ticks 3600] [--every 30]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame  # noqa: E402
+from atlas import RenderQueue  # noqa: E402
+from balance_sweep import Autopilot  # noqa: E402
+import main_game  # noqa: E402
+
+
+def record(mode, ticks, every, seed=7):
+    """Draw lists [(layer, [(surface, dest), ...]), ...] from one autopilot game."""
+    state = main_game.GameState(mode=mode, seed=seed)
+    pilot = Autopilot(seed)
+    frames = []
+    while not state.game_over and state.ticks < ticks:
+        state.step(pilot(state), main_game.SIM_DT)
+        if state.ticks % every == 0:
+            horde = []
+            if state.horde is not None and len(state.horde):
+                horde = state.horde.blit_sequence(state.horde_images, 0.5)
+            sprites = [(s.image, main_game.sprite_dest(s, 0.5)) for s in state.all_sprites]
+            frames.append((horde, sprites))
+    return frames
+
+
+def draw_loop(win, frame):
+    for seq in frame:
+        for surf, dest in seq:
+            win.blit(surf, dest)
+
+
+def draw_queue(win, queue, frame):
+    horde, sprites = frame
+    queue.extend(horde, layer=0)
+    queue.extend(sprites, layer=1)
+    return queue.flush(win)
+
+
+def timed(fn, frames, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            fn(frame)
+    return (time.perf_counter() - t0) / (repeat * len(frames)) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mode", nargs="+", default=["classic", "horde"])
+    ap.add_argument("--ticks", type=int, default=3600, help="sim ticks per game")
+    ap.add_argument("--every", type=int, default=30, help="record a frame every N ticks")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    pygame.init()
+    win = pygame.display.set_mode((main_game.WIDTH, main_game.HEIGHT))
+    main_game.Assets.prepare_assets()
+    main_game.preload_assets(win, show=False)
+    main_game.PARTICLES = False
+    print(f"{'mode':>8} {'frames':>6} {'draws/frame':>11} {'blit loop ms':>12} {'queue ms':>9} "
+          f"{'blits calls':>11} {'pixels':>7}")
+    for mode in args.mode:
+        frames = record(mode, args.ticks, args.every)
+        if not frames:
+            continue
+        queue = RenderQueue()
+        # одинаковая картинка: чёрный фон, затем оба способа
+        mismatched = 0
+        for frame in frames:
+            win.fill((0, 0, 0))
+            draw_loop(win, frame)
+            expected = pygame.image.tobytes(win, "RGB")
+            win.fill((0, 0, 0))
+            draw_queue(win, queue, frame)
+            mismatched += pygame.image.tobytes(win, "RGB") != expected
+        calls = sum(draw_queue(win, queue, frame) for frame in frames) / len(frames)
+        draws = sum(len(h) + len(s) for h, s in frames) / len(frames)
+        t_loop = timed(lambda f: draw_loop(win, f), frames, args.repeat)
+        t_queue = timed(lambda f: draw_queue(win, queue, f), frames, args.repeat)
+        pixels = "same" if not mismatched else f"{mismatched} diff"
+        print(f"{mode:>8} {len(frames):>6} {draws:>11.0f} {t_loop:>12.3f} {t_queue:>9.3f} "
+              f"{calls:>11.1f} {pixels:>7}")
+
+
+if __name__ == "__main__":
+    main()
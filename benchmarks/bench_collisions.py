@@ -0,0 +1,76 @@
+"""
+Broadphase benchmark: pygame.sprite.spritecollide per bullet vs SpatialHash.
+
+    python benchmarks/bench_collisions.py [--ticks N]
+
+For each entity count the scene has N enemies and N bullets scattered over a
+field that grows with N (constant density, ~250 of each per 800x600 screen),
+and both paths must report the same hits.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame  # noqa: E402
+from spatial_hash import SpatialHash  # noqa: E402
+
+WIDTH, HEIGHT = 800, 600
+PER_SCREEN = 250
+
+
+class Box(pygame.sprite.Sprite):
+    def __init__(self, rng, w, h, field):
+        super().__init__()
+        self.rect = pygame.Rect(0, 0, w, h)
+        self.rect.center = (rng.randint(0, field[0]), rng.randint(0, field[1]))
+
+
+def make_scene(n, seed=1):
+    rng = random.Random(seed)
+    scale = max(1.0, n / PER_SCREEN) ** 0.5
+    field = (int(WIDTH * scale), int(HEIGHT * scale))
+    enemies = pygame.sprite.Group(Box(rng, 40, 40, field) for _ in range(n))
+    bullets = [Box(rng, 8, 24, field) for _ in range(n)]
+    return enemies, bullets
+
+
+def brute(enemies, bullets):
+    return [[id(e) for e in pygame.sprite.spritecollide(b, enemies, False)] for b in bullets]
+
+
+def hashed(enemies, bullets, grid):
+    grid.rebuild(enemies)
+    return [[id(e) for e in grid.collide(b.rect)] for b in bullets]
+
+
+def bench(fn, ticks):
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        result = fn()
+    return (time.perf_counter() - t0) / ticks * 1000, result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ticks", type=int, default=5)
+    ap.add_argument("--cell", type=int, default=64)
+    args = ap.parse_args()
+
+    print(f"{'entities':>9} {'brute ms':>10} {'hash ms':>9} {'speedup':>8} {'hash us/entity':>15}")
+    for n in (50, 100, 250, 500, 1000, 2000, 4000):
+        enemies, bullets = make_scene(n)
+        grid = SpatialHash(args.cell)
+        t_brute, ref = bench(lambda: brute(enemies, bullets), args.ticks)
+        t_hash, got = bench(lambda: hashed(enemies, bullets, grid), args.ticks)
+        if got != ref:
+            raise SystemExit(f"mismatch at n={n}")
+        print(f"{n:>9} {t_brute:>10.2f} {t_hash:>9.2f} {t_brute / t_hash:>7.1f}x "
+              f"{t_hash * 1000 / (2 * n):>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Scripted headless scenarios with a regression check against a stored baseline.
+
+    python benchmarks/bench_scenarios.py [--ticks N] [--only NAME ...]
+                                         [--baseline FILE] [--threshold PCT]
+                                         [--out FILE] [--save-baseline]
+                                         [--capture png|raw] [--capture-every N]
+
+Every scenario runs in a fresh interpreter so peak RSS is its own. Per
+scenario it reports sim ticks/s (GameState.step only), render frames/s
+(GameRenderer.draw to the off-screen window) and peak memory. Results go to
+--out as JSON. With a baseline, any scenario whose ticks/s or frames/s drops,
+or whose peak memory grows, by more than --threshold percent is reported and
+the exit code is 1. Baselines are machine specific; record one locally with
+--save-baseline. --capture also records every rendered frame of the sprite
+scenarios (to a temporary folder) and reports the capture stats; the copy
+into the capture queue is timed separately from render fps.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(HERE, "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(HERE, "results", "baseline.json")
+# метрика -> True, если больше — лучше
+METRICS = {"sim_tps": True, "render_fps": True, "peak_rss_mb": False}
+
+
+# ------------------------------------------------------------------ сценарии
+
+def _state(mg, mode="classic", purchases=None):
+    st = mg.GameState(purchases=purchases, mode=mode, seed=1)
+    # штатные таймеры спавна выключены: численность держит сам сценарий
+    for timer in (st.spawn_timer, st.powerup_timer, st.difficulty_timer):
+        st.timers.cancel(timer)
+    return st
+
+
+def _top_up(mg, n):
+    def hook(st):
+        st.player.health = 100
+        if st.horde is not None:
+            missing = n - len(st.horde)
+            if missing > 0:
+                st.horde.spawn(missing, st.enemy_level, mg.WIDTH, mg.HEIGHT, len(st.horde_images))
+            return
+        while len(st.enemies) < n:
+            st._add(mg.Enemy(level=st.enemy_level, rng=st.spawn_rng), st.enemies)
+    return hook
+
+
+def _aim(mg, fire, sweep_deg=None, period_ticks=240):
+    cx, cy = mg.WIDTH // 2, mg.HEIGHT // 2
+
+    def source(st):
+        t = st.ticks
+        if sweep_deg is None:
+            a = 2 * math.pi * t / period_ticks
+        else:
+            a = math.radians(-90 + sweep_deg * math.sin(2 * math.pi * t / period_ticks))
+        return mg.InputState(mouse_pos=(cx + int(200 * math.cos(a)), cy + int(200 * math.sin(a))), fire=fire)
+    return source
+
+
+def homing(n):
+    def setup(mg):
+        return _state(mg), _aim(mg, fire=False), _top_up(mg, n)
+    return setup
+
+
+def horde(n):
+    def setup(mg):
+        return _state(mg, mode="horde"), _aim(mg, fire=False), _top_up(mg, n)
+    return setup
+
+
+def autofire(n):
+    def setup(mg):
+        return _state(mg), _aim(mg, fire=True), _top_up(mg, n)
+    return setup
+
+
+def beam_sweep(n):
+    def setup(mg):
+        st = _state(mg, purchases={"quantum_capacitor": True})
+        source = _aim(mg, fire=True, sweep_deg=70)
+        top_up = _top_up(mg, n)
+
+        def hook(s):
+            top_up(s)
+            s.beam_ready = True  # луч заряжен всю сессию
+        return st, source, hook
+    return setup
+
+
+SCENARIOS = {
+    "homing_50": homing(50),
+    "homing_500": homing(500),
+    "homing_2000": homing(2000),
+    "horde_2000": horde(2000),
+    "autofire_200": autofire(200),
+    "beam_sweep_500": beam_sweep(500),
+    "starfield_1080p": None,  # особый случай, см. run_starfield
+    "particles_20k": None,  # особый случай, см. run_particles
+}
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux — КиБ, macOS — байты
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_starfield(mg, ticks, warmup):
+    import pygame
+    target = pygame.Surface((1920, 1080))
+    sf = mg.Starfield(1920, 1080, layers=3, density_per_100px=0.9)
+    sim = render = 0.0
+    for i in range(warmup + ticks):
+        t0 = time.perf_counter()
+        sf.update(mg.FRAME_MS)
+        t1 = time.perf_counter()
+        target.fill((0, 0, 0))
+        sf.render(target)
+        t2 = time.perf_counter()
+        if i >= warmup:
+            sim += t1 - t0
+            render += t2 - t1
+    return {"sim_tps": ticks / sim, "render_fps": ticks / render, "entities": sum(len(l["stars"]) for l in sf.layers)}
+
+
+def run_particles(mg, ticks, warmup):
+    import random
+    from particles import ParticleSystem
+    win = mg.init_headless()
+    ps = ParticleSystem(20000, seed=1)
+    rnd = random.Random(1)
+    sim = render = 0.0
+    for i in range(warmup + ticks):
+        t0 = time.perf_counter()
+        # бюджет держится полным: каждый тик новые обломки вытесняют самые старые
+        while len(ps) < ps.capacity:
+            ps.emit("debris", rnd.randint(0, mg.WIDTH), rnd.randint(0, mg.HEIGHT), count=1000)
+        ps.emit("debris", rnd.randint(0, mg.WIDTH), rnd.randint(0, mg.HEIGHT))
+        ps.update(mg.SIM_DT)
+        t1 = time.perf_counter()
+        win.fill((0, 0, 0))
+        ps.draw(win)
+        t2 = time.perf_counter()
+        if i >= warmup:
+            sim += t1 - t0
+            render += t2 - t1
+    return {"sim_tps": ticks / sim, "render_fps": ticks / render, "entities": len(ps)}
+
+
+def run_scenario(name, ticks, warmup, capture_fmt=None, capture_every=1):
+    import main_game as mg
+    win = mg.init_headless()
+    mg.Assets.prepare_assets()
+    mg.preload_assets(win, show=False)
+    if name == "starfield_1080p":
+        result = run_starfield(mg, ticks, warmup)
+    elif name == "particles_20k":
+        result = run_particles(mg, ticks, warmup)
+    else:
+        st, source, hook = SCENARIOS[name](mg)
+        renderer = mg.GameRenderer(win)
+        tmp = cap = None
+        if capture_fmt:
+            tmp = tempfile.TemporaryDirectory(prefix="capture-")
+            cap = mg.FrameCapture(tmp.name, capture_fmt, capture_every)
+        sim = render = copy = 0.0
+        entities = 0
+        for i in range(warmup + ticks):
+            if cap is not None and i == warmup:
+                cap.start()
+            hook(st)
+            inputs = source(st)
+            t0 = time.perf_counter()
+            st.step(inputs, mg.SIM_DT)
+            t1 = time.perf_counter()
+            renderer.draw(st, mg.SIM_DT)
+            t2 = time.perf_counter()
+            if cap is not None:
+                cap.capture(win)
+            if i >= warmup:
+                sim += t1 - t0
+                render += t2 - t1
+                copy += time.perf_counter() - t2
+                entities = max(entities, len(st.all_sprites) + (len(st.horde) if st.horde is not None else 0))
+        result = {"sim_tps": ticks / sim, "render_fps": ticks / render, "entities": entities,
+                  "score": st.score}
+        if cap is not None:
+            result["capture"] = cap.stop()
+            result["capture"]["loop_ms"] = round(copy * 1000 / ticks, 3)
+            tmp.cleanup()
+    result["peak_rss_mb"] = _peak_rss_mb()
+    result["ticks"] = ticks
+    return result
+
+
+# ------------------------------------------------------------------ сравнение
+
+def compare(results, baseline, threshold):
+    """Rows (scenario, metric, base, now, change %, regressed) for metrics present in both."""
+    rows = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, higher_better in METRICS.items():
+            b, c = base.get(metric), cur.get(metric)
+            if not b or c is None:
+                continue
+            change = (c - b) / b * 100
+            regressed = (-change if higher_better else change) > threshold
+            rows.append((name, metric, b, c, change, regressed))
+    return rows
+
+
+def _meta(ticks):
+    import pygame
+    try:
+        import numpy
+        np_version = numpy.__version__
+    except ImportError:
+        np_version = None
+    return {"python": platform.python_version(), "pygame": pygame.version.ver, "numpy": np_version,
+            "machine": platform.machine(), "system": platform.system(), "ticks": ticks,
+            "date": time.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def _write(path, data):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ticks", type=int, default=600)
+    ap.add_argument("--warmup", type=int, default=60)
+    ap.add_argument("--only", nargs="*", choices=list(SCENARIOS))
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--threshold", type=float, default=10.0, help="allowed regression, percent")
+    ap.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    ap.add_argument("--capture", choices=("png", "raw"), help="also record the rendered frames")
+    ap.add_argument("--capture-every", type=int, default=1, help="record every Nth frame")
+    ap.add_argument("--run", help=argparse.SUPPRESS)  # дочерний процесс: один сценарий, JSON в stdout
+    args = ap.parse_args()
+
+    if args.run:
+        print(json.dumps(run_scenario(args.run, args.ticks, args.warmup, args.capture, args.capture_every)))
+        return
+
+    results = {}
+    print(f"{'scenario':<16} {'entities':>8} {'sim ticks/s':>12} {'render fps':>11} {'peak MB':>8}")
+    for name in args.only or SCENARIOS:
+        cmd = [sys.executable, os.path.abspath(__file__), "--run", name,
+               "--ticks", str(args.ticks), "--warmup", str(args.warmup)]
+        if args.capture:
+            cmd += ["--capture", args.capture, "--capture-every", str(args.capture_every)]
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT)
+        if proc.returncode != 0:
+            raise SystemExit(f"{name} failed:\n{proc.stderr}")
+        r = results[name] = json.loads(proc.stdout.strip().splitlines()[-1])
+        peak = "-" if r["peak_rss_mb"] is None else f"{r['peak_rss_mb']:.1f}"
+        print(f"{name:<16} {r['entities']:>8} {r['sim_tps']:>12.0f} {r['render_fps']:>11.0f} {peak:>8}")
+        c = r.get("capture")
+        if c:
+            print(f"{'':<16} capture: {c['written']} written, {c['dropped']} dropped, "
+                  f"{c['loop_ms']:.2f} ms/frame in the loop, {c['encode_ms']:.1f} ms encode on workers")
+
+    data = {"meta": _meta(args.ticks), "scenarios": results}
+    _write(args.out, data)
+    print(f"results: {args.out}")
+    if args.save_baseline:
+        _write(args.baseline, data)
+        print(f"baseline saved: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("no baseline to compare against (use --save-baseline)")
+        return
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f).get("scenarios", {})
+    rows = compare(results, baseline, args.threshold)
+    print(f"\n{'scenario':<16} {'metric':<12} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, metric, b, c, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<16} {metric:<12} {b:>10.1f} {c:>10.1f} {change:>+7.1f}%{flag}")
+    failed = sorted({row[0] for row in rows if row[5]})
+    if failed:
+        raise SystemExit(f"regressed past {args.threshold:g}%: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import pygame
+
+log = logging.getLogger("capture")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+WORKER_NICE = 10  # воркеры уступают процессор игровому потоку (Linux: nice на поток)
+
+
+def _png_chunk(tag, data):
+    return struct.pack("!I", len(data)) + tag + data + struct.pack("!I", zlib.crc32(data, zlib.crc32(tag)))
+
+
+def encode_png(raw, width, height, level=3):
+    """RGB24 bytes -> PNG file contents. The heavy part (zlib) runs without the GIL."""
+    stride = width * 3
+    view = memoryview(raw)
+    # фильтр 0 для каждой строки: один байт перед строкой
+    rows = b"".join(b"\x00" + view[y * stride:(y + 1) * stride] for y in range(height))
+    header = struct.pack("!IIBBBBB", width, height, 8, 2, 0, 0, 0)  # 8 бит, RGB, без чересстрочности
+    return (PNG_SIGNATURE + _png_chunk(b"IHDR", header)
+            + _png_chunk(b"IDAT", zlib.compress(rows, level)) + _png_chunk(b"IEND", b""))
+
+
+class FrameCapture:
+    """
+    Records frames without holding up the game loop. capture(surface) blits
+    the frame into a free buffer from a fixed pool (the bounded queue) and
+    hands it to worker threads; if every buffer is still waiting to be
+    encoded the frame is dropped instead. Workers write a PNG sequence
+    (frame_000000.png, ...) or append raw RGB24 frames to frames.rgb.
+    PNGs are compressed with zlib directly: pygame.image.save holds the GIL
+    for the whole encode, zlib.compress releases it.
+    """
+
+    FORMATS = ("png", "raw")
+
+    def __init__(self, out_dir, fmt="png", every=1, buffers=8, workers=2, level=3, fps=60):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"capture format must be one of {self.FORMATS}, not {fmt!r}")
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.every = max(1, every)
+        self.buffers = buffers
+        self.workers = workers
+        self.level = level
+        self.fps = fps
+        self.size = None
+        self.active = False
+        self._free = queue.Queue()
+        self._work = queue.Queue()
+        self._threads = []
+        self._raw = None
+        self._raw_lock = threading.Lock()
+        self._lock = threading.Lock()  # счётчики воркеров
+        self.frames = 0  # кадров предложено capture()
+        self.skipped = 0  # пропущено из-за every
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.bytes = 0
+        self.copy_ms = 0.0
+        self.copy_max_ms = 0.0
+        self.encode_ms = 0.0
+        self.encode_max_ms = 0.0
+        self.max_backlog = 0
+        self.started = None
+        self.stopped = None
+
+    def start(self):
+        """Create out_dir and start the workers; raises OSError if the output can't be created."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        if self.fmt == "raw":
+            self._raw = open(os.path.join(self.out_dir, "frames.rgb"), "wb")
+        self._threads = [threading.Thread(target=self._worker, name=f"capture-{i}", daemon=True)
+                         for i in range(self.workers)]
+        for t in self._threads:
+            t.start()
+        self.active = True
+        self.started = time.perf_counter()
+        return self
+
+    def capture(self, surface):
+        """Queue a copy of surface; False if the frame was skipped or dropped."""
+        if not self.active:
+            return False
+        self.frames += 1
+        if (self.frames - 1) % self.every:
+            self.skipped += 1
+            return False
+        if self.size is None:
+            # буферы — в формате самой поверхности, тогда копия — это memcpy без конверсии
+            self.size = surface.get_size()
+            for _ in range(self.buffers):
+                self._free.put(pygame.Surface(self.size, 0, surface))
+        if surface.get_size() != self.size:
+            self.dropped += 1  # окно поменяло размер — последовательность должна быть одного размера
+            return False
+        t0 = time.perf_counter()
+        try:
+            buf = self._free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        buf.blit(surface, (0, 0))
+        self._work.put((self.queued, buf))
+        self.queued += 1
+        self.max_backlog = max(self.max_backlog, self.buffers - self._free.qsize())
+        ms = (time.perf_counter() - t0) * 1000
+        self.copy_ms += ms
+        self.copy_max_ms = max(self.copy_max_ms, ms)
+        return True
+
+    def _worker(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), WORKER_NICE)
+        except (AttributeError, OSError):  # не Linux / нет прав — работаем с обычным приоритетом
+            pass
+        while True:
+            item = self._work.get()
+            if item is None:
+                return
+            index, buf = item
+            t0 = time.perf_counter()
+            try:
+                raw = pygame.image.tobytes(buf, "RGB")
+            finally:
+                self._free.put(buf)  # поверхность больше не нужна — сразу обратно в пул
+            try:
+                n = self._write(index, raw)
+            except OSError:
+                with self._lock:
+                    self.errors += 1
+                continue
+            ms = (time.perf_counter() - t0) * 1000
+            with self._lock:
+                self.written += 1
+                self.bytes += n
+                self.encode_ms += ms
+                self.encode_max_ms = max(self.encode_max_ms, ms)
+
+    def _write(self, index, raw):
+        if self.fmt == "raw":
+            with self._raw_lock:
+                # воркеры заканчивают не по порядку — каждый кадр на своё место
+                self._raw.seek(index * len(raw))
+                self._raw.write(raw)
+            return len(raw)
+        data = encode_png(raw, self.size[0], self.size[1], self.level)
+        with open(os.path.join(self.out_dir, f"frame_{index:06d}.png"), "wb") as f:
+            f.write(data)
+        return len(data)
+
+    def stop(self, block=True):
+        """
+        Stop accepting frames, finish every queued one, stop the workers and
+        write the info file; returns stats(). With block=False the draining
+        happens on a background thread (the interpreter still waits for it at
+        exit) and the returned stats are a snapshot.
+        """
+        if not self.active:
+            return self.stats()
+        self.active = False
+        if block:
+            self._finish()
+        else:
+            threading.Thread(target=self._finish, name="capture-stop").start()
+        return self.stats()
+
+    def _finish(self):
+        for _ in self._threads:
+            self._work.put(None)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+        self.stopped = time.perf_counter()
+        try:
+            self._write_info()
+        except OSError as e:
+            log.warning("capture: %s", e)
+        s = self.stats()
+        log.info("capture: %s  %d frames written, %d dropped, %d errors",
+                 self.out_dir, s["written"], s["dropped"], s["errors"])
+
+    def _write_info(self):
+        if self.size is None:
+            return
+        w, h = self.size
+        fps = self.fps / self.every
+        if self.fmt == "raw":
+            source = f"-f rawvideo -pix_fmt rgb24 -s {w}x{h} -r {fps:g} -i frames.rgb"
+        else:
+            source = f"-framerate {fps:g} -i frame_%06d.png"
+        with open(os.path.join(self.out_dir, "capture.txt"), "w", encoding="utf-8") as f:
+            f.write(f"format {self.fmt}\nsize {w}x{h}\nframes {self.written}\ndropped {self.dropped}\n"
+                    f"fps {fps:g}\n# ffmpeg {source} -pix_fmt yuv420p capture.mp4\n")
+
+    def stats(self):
+        with self._lock:
+            written, encode_ms, encode_max = self.written, self.encode_ms, self.encode_max_ms
+            errors, nbytes = self.errors, self.bytes
+        sent = self.queued or 1
+        return {
+            "format": self.fmt,
+            "queued": self.queued,
+            "written": written,
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+            "errors": errors,
+            "backlog": self.queued - written - errors,
+            "max_backlog": self.max_backlog,
+            "copy_ms": round(self.copy_ms / sent, 3),
+            "copy_max_ms": round(self.copy_max_ms, 3),
+            "encode_ms": round(encode_ms / max(written, 1), 3),
+            "encode_max_ms": round(encode_max, 3),
+            "mb": round(nbytes / 1e6, 1),
+        }
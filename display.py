@@ -0,0 +1,165 @@
+import os
+
+import pygame
+
+# Логическое разрешение: в нём работают симуляция, UI и вся отрисовка.
+# Размер окна/экрана от него не зависит.
+LOGICAL_SIZE = (800, 600)
+
+# "scaled"   — pygame.SCALED: SDL сам растягивает кадр на GPU и пересчитывает мышь
+# "software" — кадр рисуется в поверхность LOGICAL_SIZE и одним scale-блитом
+#              выводится в окно нативного размера (с полосами по краям)
+# "native"   — как раньше: окно ровно LOGICAL_SIZE, FULLSCREEN меняет видеорежим
+RENDER_MODE = "scaled"
+# True — сглаженное растяжение (linear / smoothscale), False — ближайший пиксель:
+# картинка грубее, зато в режиме "software" кадр дешевле примерно втрое
+SMOOTH_SCALE = True
+# только целые множители (пиксели одинакового размера, полосы шире)
+INTEGER_SCALE = False
+
+
+def fit_rect(src_size, dst_size, integer=False):
+    """Largest rect with src's aspect ratio centred in dst (letterbox/pillarbox)."""
+    sw, sh = src_size
+    dw, dh = dst_size
+    scale = min(dw / sw, dh / sh)
+    if integer and scale >= 1:
+        scale = int(scale)
+    rect = pygame.Rect(0, 0, max(1, round(sw * scale)), max(1, round(sh * scale)))
+    rect.center = (dw // 2, dh // 2)
+    return rect
+
+
+class Display:
+    """
+    The window plus the logical surface everything is drawn to. set_mode()
+    returns the logical surface, present() puts it on screen and to_logical()
+    maps window coordinates (mouse) back to logical ones.
+    """
+
+    def __init__(self, size=LOGICAL_SIZE, mode=RENDER_MODE, smooth=SMOOTH_SCALE, integer=INTEGER_SCALE):
+        self.size = tuple(size)
+        self.requested_mode = mode
+        self.smooth = smooth
+        self.integer = integer
+        self.mode = None  # фактический режим (scaled может откатиться на software)
+        self.fullscreen = None
+        self.window = None
+        self.surface = None
+        self._dest = None
+        self._target = None
+
+    def set_mode(self, fullscreen=False):
+        """(Re)create the window only if it does not exist or the mode changed."""
+        if self.surface is not None and fullscreen == self.fullscreen:
+            return self.surface
+        self.fullscreen = fullscreen
+        mode = self.requested_mode
+        if mode == "scaled":
+            try:
+                self._open_scaled(fullscreen)
+            except (pygame.error, AttributeError):
+                # нет GPU-рендерера (или pygame 1.x) — растягиваем сами
+                mode = "software"
+            else:
+                self.mode = mode
+                return self.surface
+        if mode == "software":
+            self._open_software(fullscreen)
+        else:
+            flags = pygame.FULLSCREEN if fullscreen else 0
+            self.window = self.surface = pygame.display.set_mode(self.size, flags)
+            self._dest = self._target = None
+        self.mode = mode
+        return self.surface
+
+    def _open_scaled(self, fullscreen):
+        # качество растяжения SDL читает из хинта в момент создания рендерера
+        os.environ["SDL_RENDER_SCALE_QUALITY"] = "linear" if self.smooth else "nearest"
+        flags = pygame.SCALED | (pygame.FULLSCREEN if fullscreen else 0)
+        self.window = self.surface = pygame.display.set_mode(self.size, flags)
+        self._dest = self._target = None
+
+    def _open_software(self, fullscreen):
+        if not fullscreen:
+            # в окне масштаб 1:1 — рисуем прямо в окно, без лишнего блита
+            self.window = self.surface = pygame.display.set_mode(self.size)
+            self._dest = self._target = None
+            return
+        self.window = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        self.window.fill((0, 0, 0))
+        self._dest = fit_rect(self.size, self.window.get_size(), self.integer)
+        if self._dest.size == self.size:
+            # масштаб 1:1 — растягивать нечего, рисуем прямо в центр экрана
+            self.surface = self.window.subsurface(self._dest)
+            self._target = None
+            return
+        self.surface = pygame.Surface(self.size).convert()
+        self._target = self.window.subsurface(self._dest)
+
+    @property
+    def output_size(self):
+        return self.window.get_size() if self.window is not None else self.size
+
+    def present(self, rects=None):
+        """Show the frame; rects (dirty rectangles) only help when nothing is scaled."""
+        if self._target is not None:
+            if self.smooth:
+                try:
+                    pygame.transform.smoothscale(self.surface, self._dest.size, self._target)
+                except ValueError:  # smoothscale умеет только 24/32 бита
+                    self.smooth = False
+                    pygame.transform.scale(self.surface, self._dest.size, self._target)
+            else:
+                pygame.transform.scale(self.surface, self._dest.size, self._target)
+            pygame.display.flip()
+        elif rects is None:
+            pygame.display.flip()
+        elif self._dest is not None:
+            pygame.display.update([pygame.Rect(r).move(self._dest.topleft) for r in rects])
+        else:
+            pygame.display.update(rects)
+
+    def to_logical(self, pos):
+        if self._dest is None:
+            return pos
+        x = (pos[0] - self._dest.x) * self.size[0] // self._dest.width
+        y = (pos[1] - self._dest.y) * self.size[1] // self._dest.height
+        return x, y
+
+
+_active = None
+
+
+def get_display():
+    """The game's Display, created on first use (the window itself opens in set_mode)."""
+    global _active
+    if _active is None:
+        _active = Display()
+    return _active
+
+
+def set_mode(fullscreen=False):
+    return get_display().set_mode(fullscreen)
+
+
+def present(rects=None):
+    """Flip the shared Display; plain flip/update when the window was opened elsewhere (headless)."""
+    # окно могли пересоздать в обход Display (init_headless) — тогда растягивать нечего
+    if _active is not None and _active.window is not None and pygame.display.get_surface() is _active.window:
+        _active.present(rects)
+    elif rects is None:
+        pygame.display.flip()
+    else:
+        pygame.display.update(rects)
+
+
+def to_logical(pos):
+    if _active is None or _active._dest is None:
+        return pos
+    return _active.to_logical(pos)
+
+
+def mouse_pos():
+    """Mouse position in logical coordinates."""
+    return to_logical(pygame.mouse.get_pos())
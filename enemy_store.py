@@ -0,0 +1,140 @@
+import random
+
+try:
+    import numpy as np
+except ImportError:  # horde mode is unavailable without numpy
+    np = None
+
+
+class EnemyStore:
+    """
+    Structure-of-arrays enemy storage for horde mode.
+    Live enemies occupy the first `count` slots of every array; remove() compacts
+    them with a keep-mask, so survivors stay in spawn order. Positions are float
+    so sub-pixel velocity is not truncated, and homing/collision run as
+    whole-array NumPy operations. prev_x/prev_y hold positions from before the
+    last update() for render interpolation.
+    """
+
+    FIELDS = ("x", "y", "prev_x", "prev_y", "vx", "vy", "level", "sprite", "uid")
+
+    def __init__(self, capacity=4096, size=40, rng=None, seed=None):
+        if np is None:
+            raise RuntimeError("EnemyStore requires numpy (pip install numpy)")
+        self.capacity = capacity
+        self.size = size
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.prev_x = np.zeros(capacity, dtype=np.float32)
+        self.prev_y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.level = np.zeros(capacity, dtype=np.int16)
+        self.sprite = np.zeros(capacity, dtype=np.int16)
+        # номер врага по порядку появления: порядок в массивах всегда по возрастанию uid
+        self.uid = np.zeros(capacity, dtype=np.uint32)
+        self.next_uid = 0
+        self.rng = rng or np.random.default_rng(random.getrandbits(32) if seed is None else seed)
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self, needed):
+        cap = self.capacity
+        while cap < needed:
+            cap *= 2
+        for name in self.FIELDS:
+            old = getattr(self, name)
+            arr = np.zeros(cap, dtype=old.dtype)
+            arr[:self.count] = old[:self.count]
+            setattr(self, name, arr)
+        self.capacity = cap
+
+    def spawn(self, n, level, width, height, sprite_count=1):
+        """Spawn n enemies just outside a random screen edge (same layout as Enemy)."""
+        if n <= 0:
+            return
+        if self.count + n > self.capacity:
+            self._grow(self.count + n)
+        rng = self.rng
+        s = slice(self.count, self.count + n)
+        side = rng.integers(0, 4, n)  # 0 top, 1 bottom, 2 left, 3 right
+        along_x = rng.integers(0, width + 1, n).astype(np.float32)
+        along_y = rng.integers(0, height + 1, n).astype(np.float32)
+        self.x[s] = np.select([side == 2, side == 3], [-20.0, width + 20.0], along_x)
+        self.y[s] = np.select([side == 0, side == 1], [-20.0, height + 20.0], along_y)
+        self.prev_x[s] = self.x[s]
+        self.prev_y[s] = self.y[s]
+        self.vx[s] = 0.0
+        self.vy[s] = 0.0
+        self.level[s] = level
+        self.sprite[s] = rng.integers(0, max(1, sprite_count), n)
+        self.uid[s] = np.arange(self.next_uid, self.next_uid + n, dtype=np.uint32)
+        self.next_uid += n
+        self.count += n
+
+    def update(self, px, py, speed):
+        """Move every enemy `speed` px toward (px, py)."""
+        n = self.count
+        if not n:
+            return
+        x, y = self.x[:n], self.y[:n]
+        self.prev_x[:n] = x
+        self.prev_y[:n] = y
+        dx = px - x
+        dy = py - y
+        dist = np.hypot(dx, dy)
+        np.maximum(dist, 1e-6, out=dist)
+        vx, vy = self.vx[:n], self.vy[:n]
+        np.multiply(dx, speed / dist, out=vx)
+        np.multiply(dy, speed / dist, out=vy)
+        x += vx
+        y += vy
+
+    def collide_rect(self, rect):
+        """Indices (ascending) of enemies whose box overlaps a pygame.Rect."""
+        n = self.count
+        if not n:
+            return np.empty(0, dtype=np.intp)
+        half = self.size / 2
+        x, y = self.x[:n], self.y[:n]
+        # те же строгие неравенства, что у Rect.colliderect
+        mask = ((x - half < rect.right) & (x + half > rect.left)
+                & (y - half < rect.bottom) & (y + half > rect.top))
+        return np.flatnonzero(mask)
+
+    def remove(self, indices):
+        """Drop enemies by index, compacting the live prefix."""
+        n = self.count
+        if not len(indices):
+            return
+        keep = np.ones(n, dtype=bool)
+        keep[indices] = False
+        m = int(keep.sum())
+        for name in self.FIELDS:
+            arr = getattr(self, name)
+            arr[:m] = arr[:n][keep]
+        self.count = m
+
+    def centers(self, indices):
+        return list(zip(self.x[indices].astype(int).tolist(), self.y[indices].astype(int).tolist()))
+
+    def blit_sequence(self, images, alpha=1.0):
+        """(image, topleft) pairs for one Surface.blits call, alpha-blended between the last two updates."""
+        n = self.count
+        if not n:
+            return []
+        half = self.size // 2
+        x, y = self.x[:n], self.y[:n]
+        if alpha < 1.0:
+            x = self.prev_x[:n] + (x - self.prev_x[:n]) * alpha
+            y = self.prev_y[:n] + (y - self.prev_y[:n]) * alpha
+        xs = (x - half).astype(np.int32).tolist()
+        ys = (y - half).astype(np.int32).tolist()
+        ids = self.sprite[:n].tolist()
+        return [(images[i], (x, y)) for i, x, y in zip(ids, xs, ys)]
+
+    def draw(self, target, images, alpha=1.0):
+        if self.count:
+            target.blits(self.blit_sequence(images, alpha), doreturn=False)
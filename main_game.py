@@ -1,7 +1,24 @@
 import pygame
 import math
+import logging
 import random
 import os
+import time
+from spatial_hash import SpatialHash
+from rotation_cache import RotationCache
+from enemy_store import EnemyStore
+from particles import ParticleSystem
+from pools import PooledSprite, SpritePool
+from text_cache import TextCache
+from atlas import RenderQueue, pack_surfaces
+from preloader import AssetPreloader
+from timestep import FRAME_MS, FixedStep, FireScheduler, Scheduler
+from replay import InputRecorder
+from profiler import FrameProfiler, ProfilerOverlay
+from quality import QualityGovernor
+from capture import FrameCapture
+import display
+import storage
 
 class FontCompat:
     def __init__(self, size, bold=False):
@@ -28,8 +45,11 @@ class FontCompat:
 # ==============================
 #         Настройки
 # ==============================
-WIDTH, HEIGHT = 800, 600
-FPS = 60
+WIDTH, HEIGHT = display.LOGICAL_SIZE  # логическое разрешение симуляции; окно может быть любым (см. display.py)
+FPS = 60  # ограничение частоты кадров рендера (0 — без ограничения)
+SIM_HZ = 120  # частота симуляции, не зависит от FPS
+SIM_DT = 1000 / SIM_HZ  # мс на тик симуляции
+MAX_FRAME_MS = 250  # после фриза догоняем не больше этого времени
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -42,14 +62,29 @@ PLAYER_SPEED_BASE = 5
 PLAYER_SPEED = PLAYER_SPEED_BASE
 BULLET_SPEED = 10
 ENEMY_SPEED = 2
+FIRE_RATE = 5  # выстрелов в секунду
 SPAWN_INTERVAL = 1000  # мс
 POWERUP_INTERVAL = 7000  # каждые 7 секунд шанс спавна бонуса
 POWERUP_DURATION = 5000  # эффект длится 5 секунд
 DIFFICULTY_INTERVAL = 10000  # каждые 10 сек сложность ↑
 MAX_ENEMY_LEVEL = 15
+ENEMY_DAMAGE_BASE = 10  # урон от тарана обычного врага...
+ENEMY_DAMAGE_PER_LEVEL = 2  # ...плюс столько за каждый уровень сложности
+# Режим орды: тысячи врагов в EnemyStore (NumPy) вместо спрайтов
+HORDE_SPAWN_INTERVAL = 250  # мс между волнами
+HORDE_WAVE = 40  # врагов за волну
+HORDE_MAX_ENEMIES = 2500
+HORDE_CONTACT_DAMAGE = 1  # урон за касание в орде (врагов слишком много для обычного урона)
 PLAYER_ROT_OFFSET = 0  # базовый спрайт смотрит вверх; смещение не требуется
 PLAYER_MUZZLE_DIST = 28  # пиксели вперёд от центра до "носа" корабля (в базовой ориентации)
 USE_PROCEDURAL_STARFIELD = True  # включить качественный процедурный фон без артефактов скейлинга
+ROTATION_STEP_DEG = 2  # шаг квантования углов поворота спрайтов (кэш поворотов)
+ROTATION_CACHE_MB = 12  # потолок кэша поворотов; давно не нужные углы вытесняются
+CHARGED_TINT = (0, 255, 120, 100)  # зелёный оттенок заряженных пуль
+CHARGED_TINT_ENABLED = True  # выключает регулятор качества на низких уровнях
+
+# Общий кэш повёрнутых кадров игрока и снарядов
+ROTATIONS = RotationCache(step=ROTATION_STEP_DEG, max_bytes=ROTATION_CACHE_MB << 20)
 
 
 # ==============================
@@ -57,6 +92,10 @@ USE_PROCEDURAL_STARFIELD = True  # включить качественный п
 # ==============================
 class Assets:
     _cache = {}
+    _atlas = None
+    _prepared = False
+    _enemy_list = None
+    load_report = None  # текст со статистикой последней предзагрузки
 
     @staticmethod
     def load_image(path, size=None):
@@ -86,7 +125,11 @@ class Assets:
     def prepare_assets():
         """
         Ensure local assets subfolders exist. No external references or copies.
+        Runs once per process.
         """
+        if Assets._prepared:
+            return
+        Assets._prepared = True
         Assets.prepare_dir(Assets.assets_dir())
         Assets.prepare_dir(os.path.join(Assets.assets_dir(), "player"))
         Assets.prepare_dir(os.path.join(Assets.assets_dir(), "enemies"))
@@ -145,15 +188,19 @@ class Assets:
 
     @staticmethod
     def enemy_candidates():
-        # Only use assets/enemies
+        # Only use assets/enemies; список читается один раз
+        if Assets._enemy_list is not None:
+            return Assets._enemy_list
         root = os.path.join(Assets.assets_dir(), "enemies")
         ships = []
         try:
-            for name in os.listdir(root):
+            # порядок стабилен, чтобы выбор по сиду не зависел от файловой системы
+            for name in sorted(os.listdir(root)):
                 if name.lower().endswith(".png"):
                     ships.append(os.path.join(root, name))
         except Exception:
             ships = []
+        Assets._enemy_list = ships
         return ships
 
     @staticmethod
@@ -218,10 +265,77 @@ class Assets:
         # Specific beam sprite requested by user
         return os.path.join(Assets.assets_dir(), "lasers", "03.png")
 
+    @staticmethod
+    def manifest():
+        """(path, size) of every image the game loads through load_image."""
+        entries = [(p, (50, 50)) for p in Assets.player_damage_variants().values()]
+        entries += [(p, (40, 40)) for p in sorted(Assets.enemy_candidates())]
+        entries += [(p, (48, 48)) for p in Assets.explosion_frame_paths()]
+        entries += [(p, (8, 24)) for p in Assets.shot_frame_paths()]
+        entries.append((Assets.beam_sprite_path(), None))
+        return [(p, size) for p, size in entries if os.path.exists(p)]
+
+    @staticmethod
+    def build_atlas(page_size=1024):
+        """
+        Load the manifest and pack it into atlas pages. Cached images are replaced
+        by subsurfaces of the pages, so sprites pick them up transparently.
+        """
+        if Assets._atlas is not None:
+            return Assets._atlas
+        items = []
+        for path, size in Assets.manifest():
+            try:
+                items.append(((path, size), Assets.load_image(path, size)))
+            except Exception:
+                continue
+        atlas = pack_surfaces(items, page_size=page_size)
+        for key, _ in items:
+            Assets._cache[key] = atlas[key]
+        # кадры, закэшированные до упаковки, перечитаем уже из атласа
+        Bullet._frames_cache = None
+        Explosion._frames_cache = None
+        Assets._atlas = atlas
+        return atlas
+
 # ==============================
 #         Классы
 # ==============================
 
+class InputState:
+    """Снимок ввода за один тик симуляции: WASD, мышь, фокус окна"""
+    __slots__ = ("up", "down", "left", "right", "mouse_pos", "fire", "focused")
+
+    def __init__(self, up=False, down=False, left=False, right=False,
+                 mouse_pos=(WIDTH // 2, 0), fire=False, focused=True):
+        self.up = up
+        self.down = down
+        self.left = left
+        self.right = right
+        self.mouse_pos = mouse_pos
+        self.fire = fire
+        self.focused = focused
+
+    @property
+    def moving(self):
+        # Считаем движением только WASD
+        return self.up or self.down or self.left or self.right
+
+    @staticmethod
+    def poll():
+        """Read live keyboard/mouse state (needs a real window)."""
+        keys = pygame.key.get_pressed()
+        return InputState(
+            up=bool(keys[pygame.K_w]),
+            down=bool(keys[pygame.K_s]),
+            left=bool(keys[pygame.K_a]),
+            right=bool(keys[pygame.K_d]),
+            mouse_pos=display.mouse_pos(),
+            fire=bool(pygame.mouse.get_pressed()[0]),
+            focused=bool(pygame.mouse.get_focused()),
+        )
+
+
 class Player(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
@@ -248,6 +362,7 @@ class Player(pygame.sprite.Sprite):
         self.image = self.base_image.copy()
         self.rect = self.image.get_rect(center=(x, y))
         self.pos = pygame.Vector2(x, y)
+        self.prev_pos = (x, y)
         self.health = 100
         self.last_angle_deg = 0
         self.muzzle_pos = (x, y)
@@ -262,25 +377,28 @@ class Player(pygame.sprite.Sprite):
             return self.images_by_state.get("very", self.images_by_state.get("slight", self.images_by_state.get("full", self.base_image)))
         return self.images_by_state.get("damaged", self.images_by_state.get("very", self.images_by_state.get("slight", self.images_by_state.get("full", self.base_image))))
 
-    def update(self, keys):
+    def update(self, inputs, speed=None, dt=FRAME_MS):
+        if speed is None:
+            speed = PLAYER_SPEED
+        self.prev_pos = (self.pos.x, self.pos.y)
         move = pygame.Vector2(0, 0)
-        if keys[pygame.K_w]:
+        if inputs.up:
             move.y -= 1
-        if keys[pygame.K_s]:
+        if inputs.down:
             move.y += 1
-        if keys[pygame.K_a]:
+        if inputs.left:
             move.x -= 1
-        if keys[pygame.K_d]:
+        if inputs.right:
             move.x += 1
 
         if move.length_squared() > 0:
-            move = move.normalize() * PLAYER_SPEED
+            move = move.normalize() * (speed * dt / FRAME_MS)
             self.pos += move
 
         self.pos.x = max(25, min(WIDTH - 25, self.pos.x))
         self.pos.y = max(25, min(HEIGHT - 25, self.pos.y))
 
-        mx, my = pygame.mouse.get_pos()
+        mx, my = inputs.mouse_pos
         # Перед поворотом выберем базовый спрайт под текущее HP
         self.base_image = self._select_base_image_for_health()
         # Математический угол (0° вправо, +90° вниз из-за экранных координат)
@@ -288,16 +406,15 @@ class Player(pygame.sprite.Sprite):
         angle_math = math.degrees(math.atan2(dy, dx))
         # Для спрайта, который изначально "смотрит вверх"
         angle = -angle_math - 90 + PLAYER_ROT_OFFSET
-        rotated_image = pygame.transform.rotate(self.base_image, angle)
-        rect = rotated_image.get_rect(center=self.pos)
-        self.image = rotated_image
-        self.rect = rect
+        self.image = ROTATIONS.get(self.base_image, angle)
+        # хитбокс — на базовом шаге поворота, регулятор качества его не меняет
+        self.rect = ROTATIONS.rect(self.base_image, angle, self.pos)
         self.last_angle_deg = angle
         # больше не используем привязку к локальной геометрии — спавним по вектору направления
         self.muzzle_pos = (self.pos.x, self.pos.y)
 
 
-class Bullet(pygame.sprite.Sprite):
+class Bullet(PooledSprite):
     def __init__(self, x, y, angle):
         super().__init__()
         # Animated laser frames if available
@@ -316,12 +433,6 @@ class Bullet(pygame.sprite.Sprite):
 
         if Bullet._frames_cache:
             self.frames = Bullet._frames_cache
-            self.frame_index = 0
-            self.timer = 0
-            self.frame_delay = 2  # faster flicker for laser look
-            self.angle = angle
-            base = pygame.transform.rotate(self.frames[0], self._pygame_angle(self.angle))
-            self.image = base.copy()
             self.half_len = 12
         else:
             # Fallback: simple rectangle bullet
@@ -330,6 +441,15 @@ class Bullet(pygame.sprite.Sprite):
             pygame.draw.rect(self.image, (255, 255, 100), (0, 0, 6, 12))
             pygame.draw.rect(self.image, (255, 255, 255, 80), (0, 10, 6, 6))
             self.half_len = 8
+        self.reset(x, y, angle)
+
+    def reset(self, x, y, angle):
+        if self.frames:
+            self.frame_index = 0
+            self.timer = 0
+            self.frame_delay = 2 * FRAME_MS  # faster flicker for laser look (ms)
+            self.angle = angle
+            self.image = ROTATIONS.get(self.frames[0], self._pygame_angle(self.angle))
 
         # Сместим центр спрайта назад, чтобы точка спавна совпадала с "носом" пули
         a = math.radians(angle)
@@ -341,7 +461,12 @@ class Bullet(pygame.sprite.Sprite):
         # Центр = точка_носа - (dx, dy).
         cx = x - (self.half_len * sina)
         cy = y + (self.half_len * cosa)
-        self.rect = self.image.get_rect(center=(cx, cy))
+        if self.frames:
+            self.rect = ROTATIONS.rect(self.frames[0], self._pygame_angle(self.angle), (cx, cy))
+        else:
+            self.rect = self.image.get_rect(center=(cx, cy))
+        self.pos = pygame.Vector2(cx, cy)
+        self.prev_pos = (cx, cy)
         self.vx = math.cos(math.radians(angle)) * BULLET_SPEED
         self.vy = math.sin(math.radians(angle)) * BULLET_SPEED
         self.angle = angle
@@ -352,38 +477,33 @@ class Bullet(pygame.sprite.Sprite):
         # We want bullet to point towards mouse; our velocity uses math angle (0 to right, 90 up)
         return -angle_deg + 90
 
-    def update(self):
-        self.rect.x += self.vx
-        self.rect.y += self.vy
+    def update(self, dt=FRAME_MS):
+        k = dt / FRAME_MS
+        self.prev_pos = (self.pos.x, self.pos.y)
+        self.pos.x += self.vx * k
+        self.pos.y += self.vy * k
+        self.rect.center = (round(self.pos.x), round(self.pos.y))
         if self.frames:
-            self.timer += 1
+            self.timer += dt
             if self.timer >= self.frame_delay:
-                self.timer = 0
+                self.timer -= self.frame_delay
                 self.frame_index = (self.frame_index + 1) % len(self.frames)
-                base = pygame.transform.rotate(self.frames[self.frame_index], self._pygame_angle(self.angle))
-                if self.charged:
-                    # overlay green tint for charged bullets
-                    overlay = pygame.Surface(base.get_size(), pygame.SRCALPHA)
-                    overlay.fill((0, 255, 120, 100))
-                    base.blit(overlay, (0, 0), special_flags=pygame.BLEND_PREMULTIPLIED)
-                self.image = base
+                # green tint for charged bullets is baked into the cached frame
+                tint = CHARGED_TINT if self.charged and CHARGED_TINT_ENABLED else None
+                self.image = ROTATIONS.get(self.frames[self.frame_index], self._pygame_angle(self.angle), tint)
         if not pygame.Rect(0, 0, WIDTH, HEIGHT).collidepoint(self.rect.center):
             self.kill()
 
-class BeamBullet(pygame.sprite.Sprite):
+class BeamBullet(PooledSprite):
+    _scaled_cache = None
+
     def __init__(self, x, y, angle):
         super().__init__()
+        self.reset(x, y, angle)
+
+    def reset(self, x, y, angle):
         BEAM_LATERAL_OFFSET = -6  # сместим чуть влево относительно направления, чтобы выйти строго из носа
-        path = Assets.beam_sprite_path()
-        try:
-            base = Assets.load_image(path)
-        except Exception:
-            base = pygame.Surface((12, 48), pygame.SRCALPHA)
-            pygame.draw.rect(base, (150, 220, 255), (4, 0, 4, 48))
-        # scale 5x relative to обычного снаряда (~8x24)
-        scaled = pygame.transform.smoothscale(base, (40, 120))
-        rotated = pygame.transform.rotate(scaled, -angle + 90)
-        self.image = rotated
+        self.image = ROTATIONS.get(BeamBullet._scaled_image(), -angle + 90)
         a = math.radians(angle)
         sina = math.sin(a); cosa = math.cos(a)
         half_len = 60
@@ -395,54 +515,80 @@ class BeamBullet(pygame.sprite.Sprite):
         py =  cosa
         cx += px * BEAM_LATERAL_OFFSET
         cy += py * BEAM_LATERAL_OFFSET
-        self.rect = self.image.get_rect(center=(cx, cy))
+        self.rect = ROTATIONS.rect(BeamBullet._scaled_image(), -angle + 90, (cx, cy))
+        self.pos = pygame.Vector2(cx, cy)
+        self.prev_pos = (cx, cy)
         speed = BULLET_SPEED * 2.2
         # скорость — вдоль направления
         self.vx =  cosa * speed
         self.vy =  sina * speed
         self.pierce = 999  # goes through many enemies
 
-    def update(self):
-        self.rect.x += self.vx
-        self.rect.y += self.vy
+    @staticmethod
+    def _scaled_image():
+        # масштабируем спрайт луча один раз; дальше кадры берутся из кэша поворотов
+        if BeamBullet._scaled_cache is None:
+            try:
+                base = Assets.load_image(Assets.beam_sprite_path())
+            except Exception:
+                base = pygame.Surface((12, 48), pygame.SRCALPHA)
+                pygame.draw.rect(base, (150, 220, 255), (4, 0, 4, 48))
+            # scale 5x relative to обычного снаряда (~8x24)
+            BeamBullet._scaled_cache = pygame.transform.smoothscale(base, (40, 120))
+        return BeamBullet._scaled_cache
+
+    def update(self, dt=FRAME_MS):
+        k = dt / FRAME_MS
+        self.prev_pos = (self.pos.x, self.pos.y)
+        self.pos.x += self.vx * k
+        self.pos.y += self.vy * k
+        self.rect.center = (round(self.pos.x), round(self.pos.y))
         if not pygame.Rect(0, 0, WIDTH, HEIGHT).collidepoint(self.rect.center):
             self.kill()
 
 
 class Enemy(pygame.sprite.Sprite):
-    def __init__(self, level=1):
+    def __init__(self, level=1, rng=random):
         super().__init__()
         self.level = level
         # Use enemy ship PNGs from the new pack
         try:
-            candidate = random.choice(Assets.enemy_candidates())
+            candidate = rng.choice(Assets.enemy_candidates())
             self.image = Assets.load_image(candidate, (40, 40))
         except Exception:
             self.image = pygame.Surface((40, 40), pygame.SRCALPHA)
 
         self.rect = self.image.get_rect()
-        side = random.choice(['top', 'bottom', 'left', 'right'])
+        side = rng.choice(['top', 'bottom', 'left', 'right'])
         if side == 'top':
-            self.rect.center = (random.randint(0, WIDTH), -20)
+            self.rect.center = (rng.randint(0, WIDTH), -20)
         elif side == 'bottom':
-            self.rect.center = (random.randint(0, WIDTH), HEIGHT + 20)
+            self.rect.center = (rng.randint(0, WIDTH), HEIGHT + 20)
         elif side == 'left':
-            self.rect.center = (-20, random.randint(0, HEIGHT))
+            self.rect.center = (-20, rng.randint(0, HEIGHT))
         else:
-            self.rect.center = (WIDTH + 20, random.randint(0, HEIGHT))
+            self.rect.center = (WIDTH + 20, rng.randint(0, HEIGHT))
+        self.pos = pygame.Vector2(self.rect.center)
+        self.prev_pos = self.rect.center
 
-    def update(self, player):
+    def update(self, player, dt=FRAME_MS):
         px, py = player.rect.center
-        ex, ey = self.rect.center
+        ex, ey = self.pos
         angle = math.atan2(py - ey, px - ex)
-        self.rect.x += math.cos(angle) * ENEMY_SPEED
-        self.rect.y += math.sin(angle) * ENEMY_SPEED
+        step = ENEMY_SPEED * dt / FRAME_MS
+        self.prev_pos = (ex, ey)
+        self.pos.x += math.cos(angle) * step
+        self.pos.y += math.sin(angle) * step
+        self.rect.center = (round(self.pos.x), round(self.pos.y))
 
 
 class PowerUp(pygame.sprite.Sprite):
-    def __init__(self):
+    TYPES = ("speed", "autofire", "heal")
+
+    def __init__(self, rng=random, kind=None):
         super().__init__()
-        self.type = random.choice(["speed", "autofire", "heal"])
+        # kind задаёт тип явно (клиент сетевой игры), иначе — случайный
+        self.type = kind or rng.choice(list(PowerUp.TYPES))
         self.image = pygame.Surface((30, 30), pygame.SRCALPHA)
 
         if self.type == "speed":
@@ -458,38 +604,47 @@ class PowerUp(pygame.sprite.Sprite):
             pygame.draw.rect(self.image, (255, 255, 255), (13, 6, 4, 18))
             pygame.draw.rect(self.image, (255, 255, 255), (6, 13, 18, 4))
 
-        self.rect = self.image.get_rect(center=(random.randint(50, WIDTH - 50),
-                                                random.randint(50, HEIGHT - 50)))
+        self.rect = self.image.get_rect(center=(rng.randint(50, WIDTH - 50),
+                                                rng.randint(50, HEIGHT - 50)))
 
     def update(self):
         pass
 
 
-class Flash(pygame.sprite.Sprite):
+class Flash(PooledSprite):
     """Вспышка при подборе бонуса"""
     def __init__(self, pos):
         super().__init__()
         self.image = pygame.Surface((100, 100), pygame.SRCALPHA)
+        self.reset(pos)
+
+    def reset(self, pos):
+        # поверхность своя у каждого экземпляра и переживает повторное использование
+        self.image.fill((0, 0, 0, 0))
         self.rect = self.image.get_rect(center=pos)
         self.radius = 10
-        self.life = 15  # кадров
+        self.life = 15 * FRAME_MS  # мс
 
-    def update(self):
-        self.life -= 1
-        self.radius += 8
-        alpha = max(0, int(255 * (self.life / 15)))
+    def update(self, dt=FRAME_MS):
+        self.life -= dt
+        self.radius += 8 * dt / FRAME_MS
+        alpha = max(0, int(255 * (self.life / (15 * FRAME_MS))))
         self.image.fill((0, 0, 0, 0))
-        pygame.draw.circle(self.image, (255, 255, 255, alpha), (50, 50), self.radius)
+        pygame.draw.circle(self.image, (255, 255, 255, alpha), (50, 50), int(self.radius))
         if self.life <= 0:
             self.kill()
 
 
-class Explosion(pygame.sprite.Sprite):
+class Explosion(PooledSprite):
     """Анимация взрыва при уничтожении врага"""
     _frames_cache = None
+    frame_step = 1  # >1 — пропускаем кадры: взрыв короче и реже меняет картинку
 
     def __init__(self, pos, size=(48, 48), fps=18):
         super().__init__()
+        self.reset(pos, size, fps)
+
+    def reset(self, pos, size=(48, 48), fps=18):
         if Explosion._frames_cache is None:
             paths = Assets.explosion_frame_paths()
             if paths:
@@ -507,28 +662,47 @@ class Explosion(pygame.sprite.Sprite):
             self.frames = [surf] * 8
         self.frame_index = 0
         self.timer = 0
-        self.frame_delay = max(1, int(60 / fps))  # in ticks at 60 FPS
+        self.frame_delay = max(1, int(60 / fps)) * FRAME_MS  # ms, same pacing as 60 FPS ticks
         self.image = self.frames[0]
         self.rect = self.image.get_rect(center=pos)
 
-    def update(self):
-        self.timer += 1
+    def update(self, dt=FRAME_MS):
+        self.timer += dt
         if self.timer >= self.frame_delay:
-            self.timer = 0
-            self.frame_index += 1
+            self.timer -= self.frame_delay
+            self.frame_index += Explosion.frame_step
             if self.frame_index >= len(self.frames):
                 self.kill()
                 return
             self.image = self.frames[self.frame_index]
 
 
+# Пулы переиспользуемых спрайтов: выстрелы и взрывы не создают новых объектов в устойчивом режиме
+POOL_CAP = 512
+BULLET_POOL = SpritePool(Bullet, POOL_CAP)
+BEAM_POOL = SpritePool(BeamBullet, POOL_CAP)
+EXPLOSION_POOL = SpritePool(Explosion, POOL_CAP)
+FLASH_POOL = SpritePool(Flash, POOL_CAP)
+SPRITE_POOLS = (BULLET_POOL, BEAM_POOL, EXPLOSION_POOL, FLASH_POOL)
+
+
 class Starfield:
-    """Простой, но качественный процедурный фон: параллакс-слои звёзд без масштабирования текстур"""
-    def __init__(self, width, height, layers=3, density_per_100px=0.8):
+    """
+    Простой, но качественный процедурный фон: параллакс-слои звёзд без масштабирования текстур.
+    Каждый слой заранее отрисован в вертикально зацикленные тайлы (по одному на группу фазы
+    мерцания); кадр — это два blit'а на тайл со сдвигом и альфой группы, так что цена
+    не зависит от количества звёзд.
+    """
+    TWINKLE_GROUPS = 4
+
+    def __init__(self, width, height, layers=3, density_per_100px=0.8, seed=42):
         self.width = width
         self.height = height
         self.layers = []
-        rng = random.Random(42)
+        self.max_layers = layers  # рисуются только ближние max_layers слоёв (регулятор качества)
+        self.twinkle = 0.0
+        rng = random.Random(seed)
+        groups = self.TWINKLE_GROUPS
         # для каждого слоя — различная скорость и размер
         for i in range(layers):
             speed = 0.3 + i * 0.5
@@ -540,55 +714,113 @@ class Starfield:
                 x = rng.uniform(0, width)
                 y = rng.uniform(0, height)
                 twinkle_phase = rng.uniform(0, 2 * math.pi)
-                stars.append([x, y, twinkle_phase])
+                # звезда попадает в ближайшую группу фазы мерцания
+                group = int(round(twinkle_phase / (2 * math.pi) * groups)) % groups
+                stars.append((x, y, group))
+            # звёзды рисуются в пиковой яркости; текущая яркость задаётся альфой тайла
+            peak = min(255, alpha + 40)
+            tiles = [self._bake_tile([s for s in stars if s[2] == g], radius, peak) for g in range(groups)]
+            stamps = [self._bake_stamp(radius, peak) for _ in range(groups)]
             self.layers.append({
                 "speed": speed,
                 "radius": radius,
                 "alpha": alpha,
+                "peak": peak,
                 "stars": stars,
+                "tiles": tiles,
+                "stamps": stamps,
+                "offset": 0.0,
             })
-        # подготовим поверхности для слоёв для более дешёвого рендера
-        self.layer_surfaces = [pygame.Surface((width, height), pygame.SRCALPHA) for _ in self.layers]
+
+    def _bake_tile(self, stars, radius, peak):
+        # непрозрачный тайл с colorkey + RLE: blit стоит O(строк + пикселей звёзд)
+        tile = pygame.Surface((self.width, self.height))
+        tile.fill((0, 0, 0))
+        color = (peak, peak, peak)
+        for x, y, _ in stars:
+            # дублируем звёзды у края, чтобы шов при зацикливании был незаметен
+            for dy in (-self.height, 0, self.height):
+                pygame.draw.circle(tile, color, (int(x), int(y) + dy), radius)
+        tile.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+        return tile
+
+    @staticmethod
+    def _bake_stamp(radius, peak):
+        # одна звезда для точечной перерисовки (dirty-rect режим)
+        size = 2 * radius + 3
+        stamp = pygame.Surface((size, size))
+        stamp.fill((0, 0, 0))
+        pygame.draw.circle(stamp, (peak, peak, peak), (radius + 1, radius + 1), radius)
+        stamp.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+        return stamp
 
     def update(self, dt_ms):
-        for idx, layer in enumerate(self.layers):
-            spd = layer["speed"] * (dt_ms / 16.666)  # нормируем к ~60 FPS
-            for star in layer["stars"]:
-                star[1] += spd
-                if star[1] > self.height:
-                    star[0] = (star[0] + random.uniform(-20, 20)) % self.width
-                    star[1] -= self.height
-                star[2] += 0.05  # твинг
-            # перерисуем слой на буфер
-            surf = self.layer_surfaces[idx]
-            surf.fill((0, 0, 0, 0))
-            r = layer["radius"]
+        k = dt_ms / FRAME_MS  # нормируем к 60 FPS
+        self.twinkle += 0.05 * k  # твинг
+        groups = self.TWINKLE_GROUPS
+        for layer in self.layers:
+            spd = layer["speed"] * k
+            layer["offset"] = (layer["offset"] + spd) % self.height
             base_alpha = layer["alpha"]
-            for x, y, phase in layer["stars"]:
+            peak = layer["peak"]
+            for g, tile in enumerate(layer["tiles"]):
+                phase = self.twinkle + 2 * math.pi * g / groups
                 a = base_alpha + int(40 * math.sin(phase))
                 a = max(60, min(255, a))
-                pygame.draw.circle(surf, (255, 255, 255, a), (int(x), int(y)), r)
+                tile.set_alpha(255 * a // peak, pygame.RLEACCEL)
+                layer["stamps"][g].set_alpha(255 * a // peak, pygame.RLEACCEL)
+
+    def visible_layers(self):
+        # слои идут от дальних к ближним; отбрасываем дальние
+        return self.layers[len(self.layers) - self.max_layers:] if self.max_layers > 0 else []
 
     def render(self, target):
         # лёгкий параллакс — задние слои рисуем первыми
-        for surf in self.layer_surfaces:
-            target.blit(surf, (0, 0))
+        h = self.height
+        for layer in self.visible_layers():
+            oy = int(layer["offset"])
+            for tile in layer["tiles"]:
+                target.blit(tile, (0, oy))
+                target.blit(tile, (0, oy - h))
+
+    def _star_blits(self):
+        h = self.height
+        for layer in self.visible_layers():
+            oy = int(layer["offset"])
+            r1 = layer["radius"] + 1
+            stamps = layer["stamps"]
+            for x, y, g in layer["stars"]:
+                yield stamps[g], (int(x) - r1, (int(y) + oy) % h - r1)
+
+    def star_rects(self):
+        """Screen rects of every star stamp at the current scroll offset."""
+        return [pygame.Rect(pos, stamp.get_size()) for stamp, pos in self._star_blits()]
+
+    def render_stars(self, target):
+        """Draw stars one stamp each (for partial redraws); returns the rects touched."""
+        return target.blits(list(self._star_blits()))
 
 
 # ==============================
 #         Интерфейс
 # ==============================
 
+# Кэш отрисованного текста HUD: подписи — LRU, числа — из атласа цифр
+HUD_TEXT = TextCache(max_entries=128)
+
+
 def draw_ui(win, player, score, font, powerup_active, enemy_level):
-    pygame.draw.rect(win, RED, (10, 10, 200, 20))
+    """Draw the HUD; returns the rects it touched (for dirty-rect rendering)."""
+    rects = [pygame.draw.rect(win, RED, (10, 10, 200, 20))]
     pygame.draw.rect(win, GREEN, (10, 10, 2 * player.health, 20))
-    text = font.render(f"HP: {player.health}   SCORE: {score}", True, WHITE)
-    win.blit(text, (10, 40))
+    hp_rect = HUD_TEXT.draw_label_number(win, font, "HP: ", player.health, WHITE, (10, 40))
+    score_rect = HUD_TEXT.draw_label_number(win, font, "   SCORE: ", score, WHITE, (hp_rect.right, 40))
+    rects.append(hp_rect.union(score_rect))
     if powerup_active:
-        p_text = font.render(f"Power-Up: {powerup_active.upper()}", True, (100, 200, 255))
-        win.blit(p_text, (10, 70))
-    lvl_text = font.render(f"Enemy Level: {enemy_level}", True, (255, 200, 200))
-    win.blit(lvl_text, (WIDTH - 230, 10))
+        p_text = HUD_TEXT.render(font, f"Power-Up: {powerup_active.upper()}", (100, 200, 255))
+        rects.append(win.blit(p_text, (10, 70)))
+    rects.append(HUD_TEXT.draw_label_number(win, font, "Enemy Level: ", enemy_level, (255, 200, 200), (WIDTH - 230, 10)))
+    return rects
 
 def draw_beam_charge(win, progress):
     # progress: 0..1, draw at bottom center, filling bottom->top
@@ -596,273 +828,827 @@ def draw_beam_charge(win, progress):
     x = WIDTH // 2 - bar_w // 2
     y = HEIGHT - bar_h - 12
     # outline
-    pygame.draw.rect(win, (220, 220, 220), (x, y, bar_w, bar_h), 2, border_radius=6)
+    outline = pygame.draw.rect(win, (220, 220, 220), (x, y, bar_w, bar_h), 2, border_radius=6)
     # fill
     clamped = max(0.0, min(1.0, progress))
     fill_h = int((bar_h - 4) * clamped)
     fill_rect = pygame.Rect(x + 2, y + (bar_h - 2 - fill_h), bar_w - 4, fill_h)
     pygame.draw.rect(win, (0, 255, 140), fill_rect, border_radius=4)
+    return outline
+
+def draw_pause(win, font):
+    text = HUD_TEXT.render(font, "PAUSED  (P / Esc)", WHITE)
+    return win.blit(text, text.get_rect(center=(WIDTH // 2, HEIGHT // 2)))
+
+
+def toggle_capture(capture):
+    """Start a new recording in CAPTURE_DIR, or finish the running one; returns the active FrameCapture or None."""
+    if capture is not None:
+        # очередь дописывается в фоне: иначе кадр ждал бы до buffers PNG-кодирований
+        capture.stop(block=False)
+        return None
+    base = out_dir = os.path.join(CAPTURE_DIR, time.strftime("%Y%m%d-%H%M%S"))
+    n = 1
+    while os.path.exists(out_dir):  # F5 дважды за секунду — прошлая запись может ещё дописываться
+        n += 1
+        out_dir = f"{base}-{n}"
+    try:
+        return FrameCapture(out_dir, CAPTURE_FORMAT, CAPTURE_EVERY, fps=FPS or 60).start()
+    except OSError as e:
+        logging.getLogger("capture").warning("capture: can't record to %s: %s", out_dir, e)
+        return None
 
 
 # ==============================
-#         Основная игра
+#         Состояние игры
 # ==============================
 
-def main(fullscreen=False, purchases=None):
-    global PLAYER_SPEED
-    global PLAYER_ROT_OFFSET
-    # Ensure game assets are prepared into ./assets on first run
-    Assets.prepare_assets()
-    flags = pygame.FULLSCREEN if fullscreen else 0
-    win = pygame.display.set_mode((WIDTH, HEIGHT), flags)
-    clock = pygame.time.Clock()
-    font = FontCompat(24)
-    # Background setup
-    starfield = None
-    # Если пользователь хочет процедурный фон — включаем его.
-    if USE_PROCEDURAL_STARFIELD:
-        starfield = Starfield(WIDTH, HEIGHT, layers=3, density_per_100px=0.9)
-    else:
-        # Load background: prefer animated spritesheet if present, otherwise static
-        bg_path = Assets.background_image()
-        bg_strip_path = Assets.background_strip()
-        background = None
-        bg_frames = None
-        bg_frame_index = 0
-        bg_timer = 0
-        bg_frame_delay = int(60 / 6)  # ~6 FPS
-        try:
-            if os.path.exists(bg_strip_path):
-                sheet = pygame.image.load(bg_strip_path).convert()
-                sw, sh = sheet.get_width(), sheet.get_height()
-                # Assume 4 frames horizontally if divisible; otherwise fall back to static
-                frames_count = 4 if sw % 4 == 0 else 0
-                if frames_count:
-                    fw = sw // frames_count
-                    bg_frames = []
-                    for i in range(frames_count):
-                        frame = pygame.Surface((fw, sh)).convert()
-                        frame.blit(sheet, (0, 0), (i * fw, 0, fw, sh))
-                        bg_frames.append(pygame.transform.smoothscale(frame, (WIDTH, HEIGHT)))
-            if bg_frames is None and os.path.exists(bg_path):
-                background = pygame.transform.smoothscale(pygame.image.load(bg_path).convert(), (WIDTH, HEIGHT))
-        except Exception:
-            background = None
-
-    player = Player(WIDTH // 2, HEIGHT // 2)
-    all_sprites = pygame.sprite.Group()
-    bullets = pygame.sprite.Group()
-    enemies = pygame.sprite.Group()
-    powerups = pygame.sprite.Group()
-    flashes = pygame.sprite.Group()
-    explosions = pygame.sprite.Group()
-    all_sprites.add(player)
-
-    score = 0
-    last_spawn = pygame.time.get_ticks()
-    last_powerup_spawn = pygame.time.get_ticks()
-    last_difficulty_increase = pygame.time.get_ticks()
-    powerup_active = None
-    powerup_end_time = 0
-    autofire = False
-    enemy_level = 1
-    max_enemy_level = enemy_level
-
-    # Ability flags
-    purchases = purchases or {}
-    quantum_enabled = purchases.get("quantum_capacitor", False)
-    beam_idle_start = None
-    beam_ready = False
-    BEAM_IDLE_MS = 5000
-
-    running = True
-    while running:
-        clock.tick(FPS)
-        keys = pygame.key.get_pressed()
-        now = pygame.time.get_ticks()
+BEAM_IDLE_MS = 5000
+COLLISION_CELL = 64  # размер ячейки сетки столкновений, px
+USE_DIRTY_RECTS = False  # рендер грязными прямоугольниками вместо полного flip()
+DIRTY_FULL_THRESHOLD = 0.35  # доля экрана, после которой выгоднее полный кадр
+RECORD_REPLAYS = False  # писать ввод каждой партии в REPLAY_DIR (python replay.py <файл>)
+REPLAY_DIR = "replays"
+PARTICLES = True  # частицы (обломки, искры, выхлоп); нужен numpy
+PARTICLE_BUDGET = 20000  # больше не живёт одновременно: новые вытесняют самые старые
+ADAPTIVE_QUALITY = True  # снижать качество картинки, когда кадр не укладывается в 1000 / FPS мс
+PROFILE = False  # писать тайминги фаз с первого кадра (иначе — после F3); F4 — сохранить трейс
+TRACE_DIR = "traces"
+CAPTURE = False  # писать кадры с первого кадра партии (иначе — по F5)
+CAPTURE_DIR = "captures"  # каждая запись — своя подпапка
+CAPTURE_FORMAT = "png"  # "png" — последовательность PNG, "raw" — кадры RGB24 подряд в одном файле
+CAPTURE_EVERY = 1  # писать каждый N-й кадр
+
+
+class GameState:
+    """
+    Вся игровая логика без окна: игрок, пули, враги, бонусы, таймеры и счёт.
+    step(inputs, dt) продвигает симуляцию на dt миллисекунд и не трогает дисплей;
+    игра шагает фиксированным SIM_DT, скорости пересчитываются из «пикселей за кадр 60 FPS».
+    mode="horde" держит врагов в EnemyStore вместо группы спрайтов.
+    Случайность — только из собственных потоков, выведенных из seed (спавн, бонусы),
+    так что один и тот же seed и один и тот же ввод по тикам дают ту же партию.
+    """
+
+    def __init__(self, purchases=None, mode="classic", seed=None):
+        self.mode = mode
+        self.profiler = None  # FrameProfiler: отметки фаз внутри step()
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.spawn_rng = random.Random(f"{self.seed}:spawn")
+        self.powerup_rng = random.Random(f"{self.seed}:powerup")
+        self.now = 0
+        self.ticks = 0
+        self.player = Player(WIDTH // 2, HEIGHT // 2)
+        self.all_sprites = pygame.sprite.Group()
+        self.bullets = pygame.sprite.Group()
+        self.enemies = pygame.sprite.Group()
+        self.powerups = pygame.sprite.Group()
+        self.flashes = pygame.sprite.Group()
+        self.explosions = pygame.sprite.Group()
+        self.all_sprites.add(self.player)
+        # broadphase для всех столкновений; пересобирается каждый тик
+        self.enemy_grid = SpatialHash(COLLISION_CELL)
+        self.powerup_grid = SpatialHash(COLLISION_CELL)
+        self.horde = None
+        self.horde_images = []
+        if mode == "horde":
+            self.horde = EnemyStore(capacity=HORDE_MAX_ENEMIES, seed=self.spawn_rng.getrandbits(32))
+            self.horde_images = GameState._load_enemy_images()
+
+        self.score = 0
+        self.powerup_active = None
+        self.autofire = False
+        self.fire = FireScheduler(FIRE_RATE)
+        self.player_speed = PLAYER_SPEED_BASE
+        self.enemy_level = 1
+        self.max_enemy_level = self.enemy_level
+        self.game_over = False
+
+        # Ability flags
+        purchases = purchases or {}
+        self.quantum_enabled = purchases.get("quantum_capacitor", False)
+        self.beam_ready = False
+
+        # все отложенные события — в одном планировщике на времени симуляции;
+        # нет шагов (пауза) — стоят и таймеры
+        self.timers = Scheduler()
+        self.spawn_timer = self.timers.every(HORDE_SPAWN_INTERVAL if self.horde is not None else SPAWN_INTERVAL,
+                                             self._spawn, name="spawn")
+        self.difficulty_timer = self.timers.every(DIFFICULTY_INTERVAL, self._raise_difficulty, name="difficulty")
+        self.powerup_timer = self.timers.every(POWERUP_INTERVAL, self._spawn_powerup, name="powerup")
+        self.powerup_expiry = None
+        self.beam_timer = None
+
+        self.particles = None
+        if PARTICLES:
+            try:
+                self.particles = ParticleSystem(PARTICLE_BUDGET, seed=self.seed)
+            except RuntimeError:  # нет numpy
+                pass
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                return "quit"
+    @staticmethod
+    def _load_enemy_images():
+        images = []
+        for path in sorted(Assets.enemy_candidates()):
+            try:
+                images.append(Assets.load_image(path, (40, 40)))
+            except Exception:
+                pass
+        return images or [pygame.Surface((40, 40), pygame.SRCALPHA)]
+
+    def _add(self, sprite, group):
+        self.all_sprites.add(sprite)
+        group.add(sprite)
+
+    def beam_progress(self):
+        if self.beam_ready:
+            return 1.0
+        if self.beam_timer is None or not self.beam_timer.active:
+            return 0.0
+        return 1.0 - self.timers.remaining(self.beam_timer) / BEAM_IDLE_MS
+
+    # --- события планировщика (callback(now))
+
+    def _spawn(self, now):
+        if self.horde is not None:
+            n = min(HORDE_WAVE, HORDE_MAX_ENEMIES - len(self.horde))
+            self.horde.spawn(n, self.enemy_level, WIDTH, HEIGHT, len(self.horde_images))
+        else:
+            self._add(Enemy(level=self.enemy_level, rng=self.spawn_rng), self.enemies)
+
+    def _raise_difficulty(self, now):
+        if self.enemy_level < MAX_ENEMY_LEVEL:
+            self.enemy_level += 1
+            self.max_enemy_level = max(self.max_enemy_level, self.enemy_level)
+        if self.enemy_level >= MAX_ENEMY_LEVEL:
+            self.timers.cancel(self.difficulty_timer)
+
+    def _spawn_powerup(self, now):
+        if len(self.powerups) < 3 and self.powerup_rng.random() < 0.6:
+            self._add(PowerUp(self.powerup_rng), self.powerups)
+
+    def _expire_powerup(self, now):
+        self.powerup_active = None
+        self.player_speed = PLAYER_SPEED_BASE
+        self.autofire = False
+
+    def _beam_charged(self, now):
+        self.beam_ready = True
+        self._add(FLASH_POOL.acquire(self.player.rect.center), self.flashes)
+
+    def step(self, inputs, dt):
+        self.now += dt
+        self.ticks += 1
+        now = self.now
+        player = self.player
+        prof = self.profiler
 
         # Beam charge while idle (no movement, no shooting)
-        if quantum_enabled:
-            # Считаем движением только WASD
-            is_moving = any((keys[pygame.K_w], keys[pygame.K_a], keys[pygame.K_s], keys[pygame.K_d]))
-            if is_moving:
+        if self.quantum_enabled:
+            if inputs.moving:
                 # движение сбрасывает заряд и таймер
-                beam_ready = False
-                beam_idle_start = None
+                self.beam_ready = False
+                self.timers.cancel(self.beam_timer)
+            elif not self.beam_ready and (self.beam_timer is None or not self.beam_timer.active):
+                # стоим — копим заряд; готовый заряд держится, пока не начнём двигаться
+                self.beam_timer = self.timers.schedule(BEAM_IDLE_MS, self._beam_charged, name="beam")
+
+        # спавн врагов и бонусов, рост сложности, конец бонуса, заряд луча
+        self.timers.advance(now)
+
+        # стрельба: ровно FIRE_RATE выстрелов в секунду симуляции, независимо от FPS
+        shots = self.fire.update(now, inputs.fire or (self.autofire and inputs.focused))
+        for _ in range(shots):
+            mx, my = inputs.mouse_pos
+            angle = math.degrees(math.atan2(my - player.rect.centery, mx - player.rect.centerx))
+            # спавним пулю у "носа" корабля по направлению выстрела (независимо от поворота спрайта)
+            ux = math.cos(math.radians(angle))
+            uy = math.sin(math.radians(angle))
+            spawn_x = player.rect.centerx + ux * PLAYER_MUZZLE_DIST
+            spawn_y = player.rect.centery + uy * PLAYER_MUZZLE_DIST
+            if self.quantum_enabled and self.beam_ready:
+                # Заряженный режим: все выстрелы — луч до начала движения
+                self._add(BEAM_POOL.acquire(spawn_x, spawn_y, angle), self.bullets)
             else:
-                # стоим — копим заряд, и если заряд уже готов, держим его пока не начнём двигаться
-                if not beam_ready:
-                    if beam_idle_start is None:
-                        beam_idle_start = now
-                    elif now - beam_idle_start >= BEAM_IDLE_MS:
-                        beam_ready = True
-                        flashes.add(Flash(player.rect.center))
-                        all_sprites.add(list(flashes)[-1])
-
-        # стрельба
-        mouse_pressed = pygame.mouse.get_pressed()[0]
-        if mouse_pressed or (autofire and pygame.mouse.get_focused()):
-            if now % 200 < 20:
-                mx, my = pygame.mouse.get_pos()
-                angle = math.degrees(math.atan2(my - player.rect.centery, mx - player.rect.centerx))
-                # спавним пулю у "носа" корабля по направлению выстрела (независимо от поворота спрайта)
-                ux = math.cos(math.radians(angle))
-                uy = math.sin(math.radians(angle))
-                spawn_x = player.rect.centerx + ux * PLAYER_MUZZLE_DIST
-                spawn_y = player.rect.centery + uy * PLAYER_MUZZLE_DIST
-                if quantum_enabled and beam_ready:
-                    # Заряженный режим: все выстрелы — луч до начала движения
-                    beam = BeamBullet(spawn_x, spawn_y, angle)
-                    all_sprites.add(beam)
-                    bullets.add(beam)
-                else:
-                    bullet = Bullet(spawn_x, spawn_y, angle)
-                    all_sprites.add(bullet)
-                    bullets.add(bullet)
-
-        # спавн врагов
-        if now - last_spawn > SPAWN_INTERVAL:
-            enemy = Enemy(level=enemy_level)
-            all_sprites.add(enemy)
-            enemies.add(enemy)
-            last_spawn = now
-
-        # рост сложности
-        if now - last_difficulty_increase > DIFFICULTY_INTERVAL and enemy_level < MAX_ENEMY_LEVEL:
-            enemy_level += 1
-            max_enemy_level = max(max_enemy_level, enemy_level)
-            last_difficulty_increase = now
-
-        # спавн бонусов
-        if now - last_powerup_spawn > POWERUP_INTERVAL and len(powerups) < 3:
-            if random.random() < 0.6:
-                pu = PowerUp()
-                all_sprites.add(pu)
-                powerups.add(pu)
-            last_powerup_spawn = now
+                self._add(BULLET_POOL.acquire(spawn_x, spawn_y, angle), self.bullets)
+
+        if prof is not None:
+            prof.mark("sim.logic")
 
         # обновления
-        player.update(keys)
-        bullets.update()
-        enemies.update(player)
-        flashes.update()
-        explosions.update()
+        player.update(inputs, self.player_speed, dt)
+        particles = self.particles
+        if particles is not None:
+            particles.update(dt)
+            if inputs.moving:
+                # выхлоп — из кормы, против направления, куда смотрит корабль
+                mx, my = inputs.mouse_pos
+                back = math.atan2(player.pos.y - my, player.pos.x - mx)
+                particles.emit("exhaust", player.pos.x + math.cos(back) * 20, player.pos.y + math.sin(back) * 20,
+                               back)
+        self.bullets.update(dt)
+        self.enemies.update(player, dt)
+        if self.horde is not None:
+            self.horde.update(player.rect.centerx, player.rect.centery, ENEMY_SPEED * dt / FRAME_MS)
+        self.flashes.update(dt)
+        self.explosions.update(dt)
+
+        if prof is not None:
+            prof.mark("sim.update")
+
+        self.enemy_grid.rebuild(self.enemies)
+        self.powerup_grid.rebuild(self.powerups)
 
         # попадания по врагам
-        for bullet in list(bullets):
-            hit_list = pygame.sprite.spritecollide(bullet, enemies, False)
+        for bullet in list(self.bullets):
+            hit_list = self.enemy_grid.collide(bullet.rect)
             for e in hit_list:
-                boom = Explosion(e.rect.center)
-                all_sprites.add(boom)
-                explosions.add(boom)
+                self._add(EXPLOSION_POOL.acquire(e.rect.center), self.explosions)
+                if particles is not None:
+                    particles.emit("debris", *e.rect.center)
+                    particles.emit("sparks", *bullet.rect.center, math.atan2(-bullet.vy, -bullet.vx))
                 e.kill()
-                score += 10 + enemy_level * 5
+                self.enemy_grid.remove(e)
+                self.score += 10 + self.enemy_level * 5
                 if hasattr(bullet, "pierce") and bullet.pierce > 0:
                     bullet.pierce -= 1
                 else:
                     bullet.kill()
                     break
 
+        if self.horde is not None:
+            self._horde_collisions()
+
         # столкновение с игроком
-        hits = pygame.sprite.spritecollide(player, enemies, True)
+        hits = self.enemy_grid.collide_sprite(player, dokill=True)
         for enemy in hits:
-            boom = Explosion(enemy.rect.center, size=(40, 40), fps=18)
-            all_sprites.add(boom)
-            explosions.add(boom)
-            player.health -= 10 + enemy_level * 2  # урон растёт с уровнем
+            self._add(EXPLOSION_POOL.acquire(enemy.rect.center, size=(40, 40), fps=18), self.explosions)
+            if particles is not None:
+                particles.emit("debris", *enemy.rect.center)
+            player.health -= ENEMY_DAMAGE_BASE + self.enemy_level * ENEMY_DAMAGE_PER_LEVEL
             if player.health <= 0:
-                running = False
+                self.game_over = True
 
         # подбор бонусов
-        got = pygame.sprite.spritecollide(player, powerups, True)
+        got = self.powerup_grid.collide_sprite(player, dokill=True)
         for p in got:
-            powerup_active = p.type
-            powerup_end_time = now + POWERUP_DURATION
-            flash = Flash(p.rect.center)
-            all_sprites.add(flash)
-            flashes.add(flash)
+            self.powerup_active = p.type
+            # новый бонус продлевает действие, а не ставит второй таймер
+            if self.powerup_expiry is None:
+                self.powerup_expiry = self.timers.schedule(POWERUP_DURATION, self._expire_powerup, name="powerup_end")
+            else:
+                self.timers.reschedule(self.powerup_expiry, POWERUP_DURATION)
+            self._add(FLASH_POOL.acquire(p.rect.center), self.flashes)
 
             if p.type == "heal":
                 player.health = min(100, player.health + 25)
             elif p.type == "speed":
-                PLAYER_SPEED = 8
+                self.player_speed = 8
             elif p.type == "autofire":
-                autofire = True
+                self.autofire = True
+
+        if prof is not None:
+            prof.mark("sim.collide")
+
+    def entity_counts(self):
+        return {
+            "bullets": len(self.bullets),
+            "enemies": len(self.enemies) + (len(self.horde) if self.horde is not None else 0),
+            "explosions": len(self.explosions),
+            "sprites": len(self.all_sprites),
+            "particles": len(self.particles) if self.particles is not None else 0,
+        }
 
-        # сброс эффектов
-        if powerup_active and now > powerup_end_time:
-            powerup_active = None
-            PLAYER_SPEED = PLAYER_SPEED_BASE
-            autofire = False
+    def _horde_collisions(self):
+        horde = self.horde
+        # пули: та же логика пробития, что и для спрайтов, но проверка — векторная
+        for bullet in list(self.bullets):
+            hit = horde.collide_rect(bullet.rect)
+            if not len(hit):
+                continue
+            pierce = getattr(bullet, "pierce", 0)
+            if len(hit) > pierce:
+                hit = hit[:pierce + 1]
+                bullet.kill()
+            else:
+                bullet.pierce -= len(hit)
+            for center in horde.centers(hit):
+                self._add(EXPLOSION_POOL.acquire(center), self.explosions)
+                if self.particles is not None:
+                    self.particles.emit("debris", *center)
+            if self.particles is not None:
+                self.particles.emit("sparks", *bullet.rect.center, math.atan2(-bullet.vy, -bullet.vx))
+            self.score += len(hit) * (10 + self.enemy_level * 5)
+            horde.remove(hit)
+
+        # касание игрока
+        hit = horde.collide_rect(self.player.rect)
+        if len(hit):
+            for center in horde.centers(hit):
+                self._add(EXPLOSION_POOL.acquire(center, size=(40, 40), fps=18), self.explosions)
+                if self.particles is not None:
+                    self.particles.emit("debris", *center)
+            self.player.health -= len(hit) * HORDE_CONTACT_DAMAGE
+            horde.remove(hit)
+            if self.player.health <= 0:
+                self.game_over = True
 
-        # рендер
-        if starfield:
-            # обновляем с учётом прошедшего времени
-            starfield.update(clock.get_time())
+
+# ==============================
+#         Рендер
+# ==============================
+
+def sprite_dest(sprite, alpha):
+    """
+    Rect to draw a sprite at, between its position before and after the last
+    sim tick (alpha 0..1). Sprites without prev_pos are drawn where they are.
+    A rotated image coarser than the hitbox is centred on it.
+    """
+    rect = sprite.rect
+    w, h = sprite.image.get_size()
+    if w != rect.w or h != rect.h:
+        rect = pygame.Rect(rect.centerx - w // 2, rect.centery - h // 2, w, h)
+    prev = getattr(sprite, "prev_pos", None)
+    if prev is None or alpha >= 1.0:
+        return rect
+    back = 1.0 - alpha
+    pos = sprite.pos
+    return rect.move(round((prev[0] - pos[0]) * back), round((prev[1] - pos[1]) * back))
+
+
+class GameRenderer:
+    """
+    Рисует GameState на поверхность; сам состояние не меняет.
+    alpha — доля тика симуляции, прошедшая после последнего step(): спрайты
+    рисуются между прошлым и текущим положением, поэтому движение плавное при любом FPS.
+    """
+
+    def __init__(self, win, font=None, starfield=None):
+        self.win = win
+        self.font = font or FontCompat(24)
+        self.queue = RenderQueue()
+        self.profiler = None
+        self.starfield = None
+        self.background = None
+        self.bg_frames = None
+        self.bg_frame_index = 0
+        self.bg_timer = 0
+        self.bg_frame_delay = 1000 / 6  # мс, ~6 FPS
+        # Если пользователь хочет процедурный фон — включаем его.
+        if USE_PROCEDURAL_STARFIELD:
+            self.starfield = starfield or Starfield(WIDTH, HEIGHT, layers=3, density_per_100px=0.9)
+        else:
+            self._load_background()
+
+    def _load_background(self):
+        # Load background: prefer animated spritesheet if present, otherwise static
+        bg_path = Assets.background_image()
+        bg_strip_path = Assets.background_strip()
+        try:
+            if os.path.exists(bg_strip_path):
+                sheet = pygame.image.load(bg_strip_path).convert()
+                sw, sh = sheet.get_width(), sheet.get_height()
+                # Assume 4 frames horizontally if divisible; otherwise fall back to static
+                frames_count = 4 if sw % 4 == 0 else 0
+                if frames_count:
+                    fw = sw // frames_count
+                    self.bg_frames = []
+                    for i in range(frames_count):
+                        frame = pygame.Surface((fw, sh)).convert()
+                        frame.blit(sheet, (0, 0), (i * fw, 0, fw, sh))
+                        self.bg_frames.append(pygame.transform.smoothscale(frame, (WIDTH, HEIGHT)))
+            if self.bg_frames is None and os.path.exists(bg_path):
+                self.background = pygame.transform.smoothscale(pygame.image.load(bg_path).convert(), (WIDTH, HEIGHT))
+        except Exception:
+            self.background = None
+
+    def draw_background(self, dt=FRAME_MS):
+        win = self.win
+        if self.starfield:
             # очищаем весь кадр перед отрисовкой звёзд, иначе будет "смазывание"
             win.fill((0, 0, 0))
-            starfield.render(win)
-        elif 'bg_frames' in locals() and bg_frames:
-            bg_timer += 1
-            if bg_timer >= bg_frame_delay:
-                bg_timer = 0
-                bg_frame_index = (bg_frame_index + 1) % len(bg_frames)
-            win.blit(bg_frames[bg_frame_index], (0, 0))
-        elif 'background' in locals() and background:
-            win.blit(background, (0, 0))
+            self.starfield.render(win)
+        elif self.bg_frames:
+            self.bg_timer += dt
+            if self.bg_timer >= self.bg_frame_delay:
+                self.bg_timer -= self.bg_frame_delay
+                self.bg_frame_index = (self.bg_frame_index + 1) % len(self.bg_frames)
+            win.blit(self.bg_frames[self.bg_frame_index], (0, 0))
+        elif self.background:
+            win.blit(self.background, (0, 0))
         else:
             win.fill(GRAY)
-        all_sprites.draw(win)
-        draw_ui(win, player, score, font, powerup_active, enemy_level)
+
+    def draw_sprites(self, state, alpha=1.0):
+        # всё идёт через очередь: один blits на слой в порядке отрисовки, орда — слоем ниже
+        queue = self.queue
+        if state.horde is not None and len(state.horde):
+            queue.extend(state.horde.blit_sequence(state.horde_images, alpha), layer=0)
+        queue.extend(((s.image, sprite_dest(s, alpha)) for s in state.all_sprites), layer=1)
+        queue.flush(self.win)
+
+    def draw_particles(self, state):
+        """All particles in one additive pass over the frame; returns the rect they cover or None."""
+        if state.particles is None:
+            return None
+        return state.particles.draw(self.win)
+
+    def draw_hud(self, state):
+        rects = draw_ui(self.win, state.player, state.score, self.font, state.powerup_active, state.enemy_level)
         # draw charge indicator
-        if quantum_enabled:
-            if beam_ready:
-                draw_beam_charge(win, 1.0)
-            else:
-                prog = 0.0
-                if beam_idle_start is not None:
-                    prog = max(0.0, min(1.0, (now - beam_idle_start) / BEAM_IDLE_MS))
-                draw_beam_charge(win, prog)
-        pygame.display.flip()
+        if state.quantum_enabled:
+            rects.append(draw_beam_charge(self.win, state.beam_progress()))
+        return rects
+
+    def _mark(self, name):
+        if self.profiler is not None:
+            self.profiler.mark(name)
+
+    def draw(self, state, dt, alpha=1.0):
+        if self.starfield:
+            # обновляем с учётом прошедшего времени
+            self.starfield.update(dt)
+            self._mark("starfield")
+        self.draw_background(dt)
+        self._mark("background")
+        self.draw_sprites(state, alpha)
+        self._mark("sprites")
+        self.draw_particles(state)
+        self._mark("particles")
+        self.draw_hud(state)
+        self._mark("hud")
+
+    def note_rect(self, rect):
+        """Something extra (e.g. the profiler overlay) was drawn over the frame."""
+        pass
+
+    def invalidate(self):
+        """The next frame must be drawn in full (e.g. the background changed)."""
+        pass
+
+    def present(self):
+        display.present()
+
+
+class DirtyRectRenderer(GameRenderer):
+    """
+    Рендер с грязными прямоугольниками: фон перерисовывается только там, где в прошлом
+    кадре были спрайты, HUD или звёзды, а на экран уходит pygame.display.update(rects).
+    Если грязная площадь больше threshold от экрана — обычный полный кадр и flip().
+    """
+
+    def __init__(self, win, font=None, threshold=None, starfield=None):
+        super().__init__(win, font, starfield)
+        self.threshold = DIRTY_FULL_THRESHOLD if threshold is None else threshold
+        self._prev = []
+        self._update = None
+        self.full_frames = 0
+        self.dirty_frames = 0
+
+    def _sprite_rects(self, state, alpha=1.0):
+        rects = [sprite_dest(s, alpha).copy() for s in state.all_sprites]
+        horde = state.horde
+        if horde is not None and len(horde):
+            size = horde.size
+            if len(horde) * size * size > self.threshold * WIDTH * HEIGHT:
+                return None
+            rects.extend(pygame.Rect(pos, (size, size)) for _, pos in horde.blit_sequence(state.horde_images, alpha))
+        return rects
+
+    def _erase(self, rect):
+        if self.starfield:
+            self.win.fill((0, 0, 0), rect)
+        elif self.background:
+            self.win.blit(self.background, rect, rect)
+        else:
+            self.win.fill(GRAY, rect)
+
+    def draw(self, state, dt, alpha=1.0):
+        if self.starfield:
+            self.starfield.update(dt)
+            self._mark("starfield")
+        prev = self._prev
+        sprite_rects = self._sprite_rects(state, alpha)
+        full = not prev or sprite_rects is None or self.bg_frames
+        if not full:
+            area = sum(r.w * r.h for r in prev) + sum(r.w * r.h for r in sprite_rects)
+            full = area > self.threshold * WIDTH * HEIGHT
+        if full:
+            self.draw_background(dt)
+            star_rects = self.starfield.star_rects() if self.starfield else []
+            self._mark("background")
+            self.draw_sprites(state, alpha)
+            self._mark("sprites")
+            particle_rect = self.draw_particles(state)
+            self._mark("particles")
+            hud_rects = self.draw_hud(state)
+            self._mark("hud")
+            self._prev = star_rects + (sprite_rects or []) + hud_rects
+            if particle_rect:
+                self._prev.append(particle_rect)
+            self._update = None
+            self.full_frames += 1
+            return
+        # стираем прошлое положение всего, что двигалось, и рисуем поверх заново
+        for r in prev:
+            self._erase(r)
+        star_rects = self.starfield.render_stars(self.win) if self.starfield else []
+        self._mark("background")
+        self.draw_sprites(state, alpha)
+        self._mark("sprites")
+        particle_rect = self.draw_particles(state)
+        self._mark("particles")
+        hud_rects = self.draw_hud(state)
+        self._mark("hud")
+        cur = star_rects + sprite_rects + hud_rects
+        if particle_rect:
+            cur.append(particle_rect)
+        self._update = prev + cur
+        self._prev = cur
+        self.dirty_frames += 1
+
+    def note_rect(self, rect):
+        # стереть в следующем кадре и отправить на экран в этом
+        self._prev.append(rect)
+        if self._update is not None:
+            self._update.append(rect)
+
+    def invalidate(self):
+        self._prev = []
+
+    def present(self):
+        display.present(self._update)
+
+
+def apply_quality(settings, renderer=None, state=None):
+    """Switch the visual knobs to one of quality.LEVELS; hitboxes don't depend on them (see RotationCache.rect)."""
+    global CHARGED_TINT_ENABLED
+    CHARGED_TINT_ENABLED = settings["charged_tint"]
+    Explosion.frame_step = settings["explosion_step"]
+    # шаги кратны ROTATION_STEP_DEG — уже построенные повороты остаются в кэше
+    ROTATIONS.set_step(max(ROTATION_STEP_DEG, settings["rotation_step"]))
+    if renderer is not None:
+        if renderer.starfield:
+            renderer.starfield.max_layers = settings["star_layers"]
+        renderer.invalidate()
+    if state is not None and state.particles is not None:
+        state.particles.scale = settings["particle_scale"]
+
+
+# ==============================
+#         Headless-режим
+# ==============================
+
+def init_headless():
+    """
+    Prepare pygame without a real window (SDL dummy driver) so sprites can
+    load and convert their images. Returns the (invisible) display surface.
+    """
+    if not pygame.display.get_init():
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        pygame.init()
+    win = pygame.display.get_surface()
+    if win is None:
+        win = pygame.display.set_mode((WIDTH, HEIGHT))
+    return win
+
+
+def run_headless(ticks, input_source=None, dt=SIM_DT, purchases=None, render=False, mode="classic"):
+    """
+    Step a GameState as fast as possible: no flip, no clock.tick.
+    input_source(state) -> InputState; by default the player stands still.
+    With render=True every tick is also drawn to the off-screen surface.
+    Stops early on game over and returns the final state.
+    """
+    win = init_headless()
+    Assets.prepare_assets()
+    preload_assets(win, show=False)
+    state = GameState(purchases=purchases, mode=mode)
+    renderer = GameRenderer(win) if render else None
+    idle = InputState()
+    for _ in range(ticks):
+        inputs = input_source(state) if input_source else idle
+        state.step(inputs, dt)
+        if renderer:
+            renderer.draw(state, dt)
+        if state.game_over:
+            break
+    return state
+
+
+# ==============================
+#         Загрузка
+# ==============================
+
+def draw_loading_screen(win, font, progress, current=None):
+    win.fill(BLACK)
+    title = font.render("Loading...", True, WHITE)
+    win.blit(title, title.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 40)))
+    bar = pygame.Rect(0, 0, 400, 20)
+    bar.center = (WIDTH // 2, HEIGHT // 2)
+    pygame.draw.rect(win, (220, 220, 220), bar, 2, border_radius=4)
+    fill = bar.inflate(-4, -4)
+    fill.width = int(fill.width * max(0.0, min(1.0, progress)))
+    pygame.draw.rect(win, (0, 255, 140), fill, border_radius=3)
+    if current:
+        name = font.render(os.path.basename(current), True, (150, 150, 150))
+        win.blit(name, name.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 40)))
+
+
+def preload_assets(win, font=None, show=True):
+    """
+    Decode every manifest image on a worker thread (with a progress screen if
+    show=True), then pack the atlas, so nothing is loaded lazily mid-game.
+    Returns False if the window was closed while loading.
+    """
+    if Assets._atlas is not None:
+        return True
+    pending = [entry for entry in Assets.manifest() if entry not in Assets._cache]
+    preloader = AssetPreloader(pending).start()
+    if show:
+        font = font or FontCompat(24)
+        clock = pygame.time.Clock()
+        while not preloader.done():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    preloader.wait()
+                    return False
+            draw_loading_screen(win, font, preloader.progress(), preloader.current)
+            display.present()
+            clock.tick(FPS)
+    preloader.install(Assets._cache)
+    t0 = time.perf_counter()
+    Assets.build_atlas()
+    pack_ms = (time.perf_counter() - t0) * 1000
+    Assets.load_report = preloader.report() + f"\n  atlas pack: {pack_ms:.1f} ms"
+    return True
+
+
+# ==============================
+#         Основная игра
+# ==============================
+
+def main(fullscreen=False, purchases=None, mode="classic", seed=None, record_path=None, services=None):
+    """
+    One game session. With services (scenes.Services) the shared window, fonts
+    and starfield are reused; without it the window is created here as before.
+    """
+    # Ensure game assets are prepared into ./assets on first run
+    Assets.prepare_assets()
+    if services is not None:
+        win = services.win
+        font = services.font(FontCompat, 24)
+        starfield = services.cache.get("starfield") if USE_PROCEDURAL_STARFIELD else None
+        if USE_PROCEDURAL_STARFIELD and starfield is None:
+            starfield = services.cache["starfield"] = Starfield(WIDTH, HEIGHT, layers=3, density_per_100px=0.9)
+    else:
+        win = display.set_mode(fullscreen)
+        font = FontCompat(24)
+        starfield = None
+    clock = pygame.time.Clock()
+    # декодируем все ассеты заранее, чтобы не было рывка на первом выстреле/взрыве
+    if not preload_assets(win, font):
+        return "quit"
+
+    state = GameState(purchases=purchases, mode=mode, seed=seed)
+    if USE_DIRTY_RECTS:
+        renderer = DirtyRectRenderer(win, font, starfield=starfield)
+    else:
+        renderer = GameRenderer(win, font, starfield=starfield)
+    if record_path is None and RECORD_REPLAYS:
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+        record_path = os.path.join(REPLAY_DIR, time.strftime("%Y%m%d-%H%M%S") + f"-{mode}.rpl")
+    recorder = InputRecorder(state.seed, mode, purchases, SIM_HZ) if record_path else None
+    # симуляция идёт фиксированными тиками SIM_DT; рендер — сколько успевает
+    stepper = FixedStep(SIM_HZ, MAX_FRAME_MS)
+    # профилировщик фаз кадра: F3 — оверлей (и запись), F4 — трейс в TRACE_DIR
+    profiler = FrameProfiler(enabled=PROFILE)
+    overlay = ProfilerOverlay(services.font(FontCompat, 16) if services else FontCompat(16))
+    state.profiler = renderer.profiler = profiler
+
+    # запись кадров: F5 — старт/стоп, кодируют фоновые потоки
+    capture = toggle_capture(None) if CAPTURE else None
+
+    # регулятор качества: work time кадра (без сна в clock.tick) против бюджета 1000 / FPS
+    governor = None
+    if ADAPTIVE_QUALITY:
+        governor = QualityGovernor(1000 / (FPS or 60), apply=lambda s: apply_quality(s, renderer, state))
+
+    quit_requested = False
+    # пауза: просто не шагаем симуляцию — время state.now, а с ним все таймеры стоят
+    paused = False
+    while not state.game_over and not quit_requested:
+        profiler.begin_frame()
+        frame_ms = clock.tick(FPS)
+        profiler.mark("wait")
+        if governor is not None and not paused:
+            governor.sample(clock.get_rawtime())
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                quit_requested = True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                if overlay.toggle():
+                    profiler.enabled = True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4 and profiler.count:
+                profiler.export_chrome_trace(os.path.join(TRACE_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json"))
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                capture = toggle_capture(capture)
+            elif event.type == pygame.KEYDOWN and event.key in (pygame.K_p, pygame.K_ESCAPE):
+                paused = not paused
+            elif event.type == getattr(pygame, "WINDOWFOCUSLOST", None):
+                paused = True
+        if quit_requested:
+            break
+
+        inputs = InputState.poll()
+        profiler.mark("events")
+        if not paused:
+            for _ in range(stepper.advance(frame_ms)):
+                if recorder:
+                    recorder.record(inputs)
+                state.step(inputs, SIM_DT)
+                if state.game_over:
+                    break
+        # на паузе и фон стоит (dt=0)
+        renderer.draw(state, 0 if paused else frame_ms, stepper.alpha)
+        if paused:
+            renderer.note_rect(draw_pause(win, font))
+        rect = overlay.draw(win, profiler)
+        if rect:
+            renderer.note_rect(rect)
+            profiler.mark("overlay")
+        if capture is not None:
+            capture.capture(win)
+            profiler.mark("capture")
+        renderer.present()
+        profiler.mark("flip")
+        if profiler.enabled:
+            counts = state.entity_counts()
+            if governor is not None:
+                counts["quality"] = governor.level
+            if capture is not None:
+                counts["captured"] = capture.queued
+                counts["dropped"] = capture.dropped
+            profiler.end_frame(counts)
+        else:
+            profiler.end_frame()
+
+    if capture is not None:
+        capture.stop()  # партия кончилась — дождаться кодирования можно
+
+    if PROFILE and profiler.count:
+        try:
+            profiler.export_chrome_trace(os.path.join(TRACE_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json"))
+        except OSError:
+            pass
+
+    if recorder:
+        try:
+            recorder.save(record_path, {"ticks": state.ticks, "score": state.score})
+        except OSError:
+            pass
+    if quit_requested:
+        return "quit"
+
+    score = state.score
+    max_enemy_level = state.max_enemy_level
+    # рекорд и достигнутая сложность (для магазина) пишутся фоновым потоком хранилища
+    store = storage.get_storage()
+    store.record_max("top_score", score)
+    store.record_max("max_difficulty", max_enemy_level)
 
     # экран конца игры
     win.fill(BLACK)
-    title_font = FontCompat(64, bold=True)
-    small_font = FontCompat(32)
+    title_font = services.font(FontCompat, 64, bold=True) if services else FontCompat(64, bold=True)
+    small_font = services.font(FontCompat, 32) if services else FontCompat(32)
     game_over_text = title_font.render("GAME OVER", True, RED)
     score_text = small_font.render(f"Score: {score}", True, WHITE)
     tip_text = small_font.render("Returning to menu...", True, (180, 180, 180))
     win.blit(game_over_text, game_over_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 40)))
     win.blit(score_text, score_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 20)))
     win.blit(tip_text, tip_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 70)))
-    pygame.display.flip()
+    display.present()
     pygame.time.wait(2500)
 
-    # сохранение рекорда
-    try:
-        with open("top_score.txt", "r") as f:
-            best = int(f.read().strip() or 0)
-    except FileNotFoundError:
-        best = 0
-    if score > best:
-        with open("top_score.txt", "w") as f:
-            f.write(str(score))
-
-    # сохраняем достигнутый максимум сложности для магазина
-    try:
-        with open("max_difficulty.txt", "r") as f:
-            best_difficulty = int(f.read().strip() or 1)
-    except Exception:
-        best_difficulty = 1
-    if max_enemy_level > best_difficulty:
-        try:
-            with open("max_difficulty.txt", "w") as f:
-                f.write(str(max_enemy_level))
-        except Exception:
-            pass
+    return "game_over"
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    # python main_game.py [ticks] — прогон симуляции без окна и замер скорости
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3600
+
+    def _autofire_input(state):
+        return InputState(mouse_pos=(WIDTH // 2, 0), fire=True)
 
-    return "game_over"
\ No newline at end of file
+    t0 = time.perf_counter()
+    st = run_headless(n, input_source=_autofire_input)
+    elapsed = time.perf_counter() - t0
+    sim_ms = st.now
+    print(f"ticks={st.ticks} sim={sim_ms / 1000:.1f}s wall={elapsed:.3f}s "
+          f"speedup={sim_ms / 1000 / max(elapsed, 1e-9):.0f}x score={st.score}")
+    for pool in SPRITE_POOLS:
+        print(pool.stats())
+    print(Assets.load_report)
@@ -1,5 +1,8 @@
 import pygame
-import os
+
+import display
+import storage
+import ui
 
 class FontCompat:
     def __init__(self, size, bold=False):
@@ -25,18 +28,27 @@ class FontCompat:
         surface, _ = self._font.render(text, color)
         return surface
 
+    def size(self, text):
+        if self._mode == "font":
+            return self._font.size(text)
+        return self._font.get_rect(text).size
+
 FULLSCREEN = False
 
-def _create_window(width, height):
-    flags = pygame.FULLSCREEN if FULLSCREEN else 0
-    win = pygame.display.set_mode((width, height), flags)
+def _create_window():
+    # логическая поверхность 800x600; в полноэкранном режиме она растягивается на весь экран
+    win = display.set_mode(FULLSCREEN)
     pygame.display.set_caption("Main Menu")
     return win
 
-def show_menu():
-    global FULLSCREEN
+def show_menu(services=None):
+    """Returns 'start', 'horde', 'shop' or 'exit'. services: shared window/fonts (scenes.Services)."""
     WIDTH, HEIGHT = 800, 600
-    WIN = _create_window(WIDTH, HEIGHT)
+    if services is not None:
+        WIN = services.set_mode(FULLSCREEN)
+        pygame.display.set_caption("Main Menu")
+    else:
+        WIN = _create_window()
 
     GRAY = (40, 40, 40)
     GREEN = (0, 200, 0)
@@ -45,77 +57,52 @@ def show_menu():
     LIGHT_RED = (255, 80, 80)
     WHITE = (255, 255, 255)
 
-    font = FontCompat(36)
-    small_font = FontCompat(28)
-    clock = pygame.time.Clock()
-
-    # --- читаем рекорд ---
-    if os.path.exists("top_score.txt"):
-        with open("top_score.txt", "r") as f:
-            top_score = f.read().strip()
-            if not top_score.isdigit():
-                top_score = "0"
+    if services is not None:
+        font = services.font(FontCompat, 36)
+        small_font = services.font(FontCompat, 28)
     else:
-        top_score = "0"
+        font = FontCompat(36)
+        small_font = FontCompat(28)
+
+    # --- читаем рекорд (из кэша хранилища) ---
+    top_score = storage.get_storage().get("top_score", 0)
+
+    # Виджеты создаются один раз; кадр перерисовывается только при наведении/клике
+    cur_w, cur_h = WIN.get_size()
+    cx = cur_w // 2
+    root = ui.UIRoot(WIN, GRAY)
+
+    def toggle_fullscreen():
+        # переключаем флаг и пересоздаём окно
+        global FULLSCREEN
+        FULLSCREEN = not FULLSCREEN
+        if services is not None:
+            root.set_surface(services.set_mode(FULLSCREEN))
+        else:
+            root.set_surface(_create_window())
+        fs_button.set_text("Fullscreen: ON" if FULLSCREEN else "Fullscreen: OFF")
+
+    root.add(ui.Button("START GAME", font, GREEN, LIGHT_GREEN, on_click=lambda: "start",
+                       center=(cx, int(cur_h * 0.43))))
+    root.add(ui.Button("HORDE MODE", font, (255, 140, 60), on_click=lambda: "horde",
+                       center=(cx, int(cur_h * 0.51))))
+    root.add(ui.Button("SHOP", font, (255, 215, 0), on_click=lambda: "shop",
+                       center=(cx, int(cur_h * 0.58))))
+    fs_button = root.add(ui.Button("Fullscreen: ON" if FULLSCREEN else "Fullscreen: OFF", small_font,
+                                   (180, 180, 255), on_click=toggle_fullscreen,
+                                   center=(cx, int(cur_h * 0.65))))
+    root.add(ui.Button("EXIT", font, RED, LIGHT_RED, on_click=lambda: "exit",
+                       center=(cx, int(cur_h * 0.72))))
+    root.add(ui.Label(f"Top Score: {top_score}", small_font, WHITE,
+                      center=(cx, int(cur_h * 0.80))))
+    root.update_hover(display.mouse_pos())
 
     while True:
-        WIN.fill(GRAY)
-        mx, my = pygame.mouse.get_pos()
-        cur_w, cur_h = WIN.get_size()
-        cx = cur_w // 2
-
-        # Кнопка START
-        start_color = LIGHT_GREEN if 300 < mx < 500 and 250 < my < 300 else GREEN
-        start_text = font.render("START GAME", True, start_color)
-        start_rect = start_text.get_rect(center=(cx, int(cur_h * 0.43)))
-
-        # Кнопка SHOP
-        shop_color = (255, 215, 0)
-        shop_text = font.render("SHOP", True, shop_color)
-        shop_rect = shop_text.get_rect(center=(cx, int(cur_h * 0.53)))
-
-        # Кнопка FULLSCREEN TOGGLE
-        fs_label = "Fullscreen: ON" if FULLSCREEN else "Fullscreen: OFF"
-        fs_color = (180, 180, 255)
-        fs_text = small_font.render(fs_label, True, fs_color)
-        fs_rect = fs_text.get_rect(center=(cx, int(cur_h * 0.61)))
-
-        # Кнопка EXIT
-        exit_color = LIGHT_RED if 300 < mx < 500 and 350 < my < 400 else RED
-        exit_text = font.render("EXIT", True, exit_color)
-        exit_rect = exit_text.get_rect(center=(cx, int(cur_h * 0.70)))
-
-        # Текст TOP SCORE
-        score_text = small_font.render(f"Top Score: {top_score}", True, WHITE)
-        score_rect = score_text.get_rect(center=(cx, int(cur_h * 0.80)))
-
-        # Рисуем + белый контур при наведении
-        def draw_with_hover(text_surf, rect):
-            WIN.blit(text_surf, rect)
-            if rect.collidepoint(mx, my):
-                box = rect.inflate(24, 12)
-                pygame.draw.rect(WIN, WHITE, box, 2, border_radius=6)
-
-        draw_with_hover(start_text, start_rect)
-        draw_with_hover(shop_text, shop_rect)
-        draw_with_hover(fs_text, fs_rect)
-        draw_with_hover(exit_text, exit_rect)
-        WIN.blit(score_text, score_rect)
-        pygame.display.flip()
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                return "exit"
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                if start_rect.collidepoint(mx, my):
-                    return "start"
-                elif shop_rect.collidepoint(mx, my):
-                    return "shop"
-                elif fs_rect.collidepoint(mx, my):
-                    # переключаем флаг и пересоздаём окно
-                    FULLSCREEN = not FULLSCREEN
-                    WIN = _create_window(cur_w, cur_h)
-                elif exit_rect.collidepoint(mx, my):
-                    return "exit"
-
-        clock.tick(60)
\ No newline at end of file
+        root.render()
+        # без событий ждём, не тратя CPU
+        event = root.wait()
+        if event.type == pygame.QUIT:
+            return "exit"
+        choice = root.handle(event)
+        if choice:
+            return choice
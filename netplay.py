@@ -0,0 +1,1409 @@
+"""
+Networked play: a headless authoritative server runs GameState, clients send
+inputs and draw what the server reports.
+
+    python netplay.py server [--port 7777] [--tcp] [--mode classic] [--seed N]
+    python netplay.py client [--host 127.0.0.1] [--port 7777] [--tcp] [--bot]
+                             [--latency 60] [--jitter 10] [--loss 0.05]
+    python netplay.py loopback [--clients 2] [--seconds 20] [--tcp]
+                               [--latency 60] [--jitter 10] [--loss 0.05]
+
+The simulation has one ship, so the first client to join pilots it and the
+rest spectate (the next one in line takes over if the pilot leaves).
+
+The server steps at SIM_HZ and sends a snapshot every SIM_HZ / snapshot_hz
+ticks: positions quantized to QUANT px, angles to 1/256 turn, each entity
+delta-encoded against the last snapshot that client acknowledged (a full
+snapshot if it has none). The horde goes against the same snapshot as
+whole-pixel moves of the surviving enemies, deflated. The pilot predicts its own ship by running
+Player.update on its inputs at once; every snapshot says which input the
+server applied last, and the client rewinds to the server position and
+replays the newer ones. --latency/--jitter/--loss (one way, applied by the
+client in both directions) fake a bad network on localhost. loopback runs a
+server process and autopilot clients and prints bandwidth per client and
+server tick time.
+"""
+import argparse
+import heapq
+import logging
+import math
+import multiprocessing
+import os
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+
+import pygame
+
+try:
+    import numpy as np
+except ImportError:  # без numpy нет орды: её блок в снимке клиент пропускает
+    np = None
+
+import main_game as mg
+
+log = logging.getLogger("netplay")
+
+PORT = 7777
+PROTOCOL_VERSION = 2
+SNAPSHOT_HZ = 30
+INPUT_SEND_EVERY = 2  # тиков между пакетами ввода (60 пакетов/с при SIM_HZ 120)
+INPUT_REDUNDANCY = 32  # столько последних неподтверждённых вводов повторяется в каждом пакете
+MAX_INPUT_QUEUE = 8  # буфер ввода на сервере, тиков; старший ввод сверх него выбрасывается
+HISTORY = 64  # снимков хранится для дельт (у клиента — столько же)
+CLIENT_TIMEOUT_S = 5.0
+HELLO_RETRY_S = 0.25
+QUANT = 4  # позиции — в 1/4 px
+HORDE_QUANT = 1  # орда — в целых px: врагу 40x40 хватает, а сдвиги за снимок влезают в 4 бита
+ORIGIN = 1024  # сдвиг, чтобы -ORIGIN..(65535 / QUANT - ORIGIN) px влезали в uint16
+SNAP_DIST = 64  # px: дальше между снимками не интерполируем, а переставляем (пуля из пула)
+CORRECTION_PX = 0.5  # расхождение предсказания больше этого считается поправкой
+
+MSG_HELLO, MSG_WELCOME, MSG_INPUT, MSG_SNAPSHOT, MSG_BYE = 1, 2, 3, 4, 5
+ROLE_PILOT, ROLE_SPECTATOR = 0, 1
+KIND_ENEMY, KIND_BULLET, KIND_BEAM, KIND_POWERUP = 1, 2, 3, 4
+MODES = ("classic", "horde")
+
+HELLO = struct.Struct("!BB")  # тип, версия
+WELCOME = struct.Struct("!BBBHBBIB")  # тип, id, роль, SIM_HZ, частота снимков, режим, seed, quantum
+BYE = struct.Struct("!BB")
+INPUT_HEAD = struct.Struct("!BIIB")  # тип, ack снимка, seq первого ввода, сколько серий
+INPUT_RUN = struct.Struct("!BBHH")  # серия одинаковых вводов: длина, кнопки, мышь x, y
+# тип, seq, базовый seq (0 — полный), тик, последний применённый ввод, счёт, HP, уровень,
+# флаги, бонус, скорость*100, заряд луча, x, y и угол корабля
+SNAP_HEAD = struct.Struct("!BIIIIIhBBBHBHHB")
+COUNT = struct.Struct("!H")
+ENT_ID = struct.Struct("!HB")  # id, маска полей
+ENT_FULL = struct.Struct("!BHHBB")  # вид, x, y, угол, extra
+U8, U16, I8 = struct.Struct("!B"), struct.Struct("!H"), struct.Struct("!bb")
+
+F_GAME_OVER, F_BEAM_READY, F_QUANTUM, F_AUTOFIRE, F_PILOT = 1, 2, 4, 8, 16
+# маска полей дельты; M_SMALL — x и y приращениями int8 вместо абсолютных uint16
+M_KIND, M_X, M_Y, M_ANGLE, M_EXTRA, M_SMALL = 1, 2, 4, 8, 16, 32
+M_ALL = M_KIND | M_X | M_Y | M_ANGLE | M_EXTRA
+
+# блок орды: полностью — записи HORDE_DTYPE; дельтой — удалённые индексы, новые записи
+# и сдвиги выживших по int8 (HORDE_DELTA8) или по 4 бита (HORDE_DELTA4)
+HORDE_FULL, HORDE_DELTA8, HORDE_DELTA4 = 0, 1, 2
+HORDE_ZLIB = 128  # флаг в байте режима: дальше до конца датаграммы — zlib
+HORDE_ZLIB_MIN = 64  # байт; меньший блок не сжимаем
+HORDE_DTYPE = np.dtype([("x", ">u2"), ("y", ">u2"), ("skin", "u1")]) if np is not None else None
+
+
+def quantize(v):
+    return max(0, min(65535, int(round((v + ORIGIN) * QUANT))))
+
+
+def dequantize(q):
+    return q / QUANT - ORIGIN
+
+
+def quantize_angle(deg):
+    return int(round(deg * 256 / 360)) & 255
+
+
+def pack_input(inputs):
+    flags = (inputs.up | inputs.down << 1 | inputs.left << 2 | inputs.right << 3
+             | inputs.fire << 4 | inputs.focused << 5)
+    mx, my = inputs.mouse_pos
+    return flags, quantize(mx), quantize(my)
+
+
+def input_packet_ok(data):
+    """True if an MSG_INPUT datagram holds its header and every run the header announces."""
+    if len(data) < INPUT_HEAD.size:
+        return False
+    (n,) = U8.unpack_from(data, INPUT_HEAD.size - 1)  # число серий — последнее поле заголовка
+    return len(data) >= INPUT_HEAD.size + n * INPUT_RUN.size
+
+
+def unpack_input(flags, mx, my):
+    return mg.InputState(up=bool(flags & 1), down=bool(flags & 2), left=bool(flags & 4), right=bool(flags & 8),
+                         mouse_pos=(dequantize(mx), dequantize(my)), fire=bool(flags & 16), focused=bool(flags & 32))
+
+
+# ------------------------------------------------------------------ снимки
+
+def encode_entities(out, base, cur):
+    """Append the delta from base to cur ({id: (kind, x, y, angle, extra)}) to bytearray out."""
+    removed = [nid for nid in base if nid not in cur]
+    out += COUNT.pack(len(removed))
+    out += struct.pack(f"!{len(removed)}H", *removed)
+    at = len(out)
+    out += COUNT.pack(0)
+    changed = 0
+    for nid, rec in cur.items():
+        old = base.get(nid)
+        if old == rec:
+            continue
+        changed += 1
+        if old is None:
+            out += ENT_ID.pack(nid, M_ALL)
+            out += ENT_FULL.pack(*rec)
+            continue
+        kind, x, y, angle, extra = rec
+        dx, dy = x - old[1], y - old[2]
+        mask = M_KIND if kind != old[0] else 0
+        if (dx or dy) and -128 <= dx <= 127 and -128 <= dy <= 127:
+            mask |= M_SMALL
+        else:
+            mask |= (M_X if dx else 0) | (M_Y if dy else 0)
+        mask |= (M_ANGLE if angle != old[3] else 0) | (M_EXTRA if extra != old[4] else 0)
+        out += ENT_ID.pack(nid, mask)
+        if mask & M_KIND:
+            out += U8.pack(kind)
+        if mask & M_SMALL:
+            out += I8.pack(dx, dy)
+        if mask & M_X:
+            out += U16.pack(x)
+        if mask & M_Y:
+            out += U16.pack(y)
+        if mask & M_ANGLE:
+            out += U8.pack(angle)
+        if mask & M_EXTRA:
+            out += U8.pack(extra)
+    COUNT.pack_into(out, at, changed)
+    return changed
+
+
+def decode_entities(data, offset, base):
+    """Inverse of encode_entities; returns (entities, removed ids, new offset)."""
+    ents = dict(base)
+    (n,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    removed = struct.unpack_from(f"!{n}H", data, offset)
+    offset += 2 * n
+    for nid in removed:
+        ents.pop(nid, None)
+    (n,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    for _ in range(n):
+        nid, mask = ENT_ID.unpack_from(data, offset)
+        offset += ENT_ID.size
+        if mask == M_ALL:
+            ents[nid] = ENT_FULL.unpack_from(data, offset)
+            offset += ENT_FULL.size
+            continue
+        kind, x, y, angle, extra = ents[nid]
+        if mask & M_KIND:
+            (kind,) = U8.unpack_from(data, offset)
+            offset += 1
+        if mask & M_SMALL:
+            dx, dy = I8.unpack_from(data, offset)
+            x, y = x + dx, y + dy
+            offset += 2
+        if mask & M_X:
+            (x,) = U16.unpack_from(data, offset)
+            offset += 2
+        if mask & M_Y:
+            (y,) = U16.unpack_from(data, offset)
+            offset += 2
+        if mask & M_ANGLE:
+            (angle,) = U8.unpack_from(data, offset)
+            offset += 1
+        if mask & M_EXTRA:
+            (extra,) = U8.unpack_from(data, offset)
+            offset += 1
+        ents[nid] = (kind, x, y, angle, extra)
+    return ents, removed, offset
+
+
+def quantize_horde(store):
+    """(uid, x, y, skin) arrays of a horde EnemyStore, positions in 1 / HORDE_QUANT px."""
+    n = len(store)
+    x = np.clip(np.rint((store.x[:n] + ORIGIN) * HORDE_QUANT), 0, 65535).astype(np.int32)
+    y = np.clip(np.rint((store.y[:n] + ORIGIN) * HORDE_QUANT), 0, 65535).astype(np.int32)
+    return store.uid[:n].copy(), x, y, store.sprite[:n].astype(np.uint8)
+
+
+def _pack_horde(out, x, y, skin):
+    block = np.empty(len(x), dtype=HORDE_DTYPE)
+    block["x"], block["y"], block["skin"] = x, y, skin
+    out += COUNT.pack(len(block))
+    out += block.tobytes()
+
+
+def _horde_body(out, base, cur):
+    if cur is None:  # не орда
+        out += COUNT.pack(0)
+        return HORDE_FULL
+    uid, x, y, skin = cur
+    if base is not None and len(uid):
+        buid, bx, by, _ = base
+        keep = np.isin(buid, uid, assume_unique=True)
+        kept = int(np.count_nonzero(keep))
+        if np.array_equal(uid[:kept], buid[keep]):
+            dx = x[:kept] - bx[keep]
+            dy = y[:kept] - by[keep]
+            span = int(max(np.abs(dx).max(), np.abs(dy).max())) if kept else 0
+            if span <= 127:
+                mode = HORDE_DELTA4 if span <= 7 else HORDE_DELTA8
+                removed = np.flatnonzero(~keep)
+                out += COUNT.pack(len(removed))
+                out += removed.astype(">u2").tobytes()
+                _pack_horde(out, x[kept:], y[kept:], skin[kept:])
+                if mode == HORDE_DELTA4:
+                    out += ((dx + 8) << 4 | (dy + 8)).astype(np.uint8).tobytes()
+                else:
+                    moves = np.empty(2 * kept, dtype=np.int8)
+                    moves[0::2], moves[1::2] = dx, dy
+                    out += moves.tobytes()
+                return mode
+    _pack_horde(out, x, y, skin)
+    return HORDE_FULL
+
+
+def encode_horde(out, base, cur):
+    """
+    Append the horde cur = (uid, x, y, skin) to bytearray out, as a delta
+    from base (the same tuple for the acked snapshot) when there is one.
+    EnemyStore only compacts and appends, so cur is base minus the removed
+    indices followed by the new enemies: survivors cost one move each.
+    Falls back to a full block if a move doesn't fit int8. The block is the
+    last thing in a snapshot, so it is deflated to the end of the datagram
+    when that is shorter. Returns the mode byte.
+    """
+    body = bytearray()
+    mode = _horde_body(body, base, cur)
+    if len(body) > HORDE_ZLIB_MIN:
+        packed = zlib.compress(body, 1)
+        if len(packed) < len(body):
+            mode |= HORDE_ZLIB
+            body = packed
+    out += U8.pack(mode)
+    out += body
+    return mode
+
+
+def full_snapshot_size(ents, horde):
+    """Bytes of a full snapshot of ents and horde before deflate, counted without encoding it."""
+    size = SNAP_HEAD.size + 2 * COUNT.size + len(ents) * (ENT_ID.size + ENT_FULL.size) + 1 + COUNT.size
+    if horde is not None:
+        size += len(horde[0]) * HORDE_DTYPE.itemsize
+    return size
+
+
+def decode_horde(data, offset, base):
+    """
+    Inverse of encode_horde: ((x, y, skin), new offset); base is what this
+    returned for the acked snapshot. A block that can't be decoded raises
+    ValueError, struct.error, zlib.error or IndexError.
+    """
+    (mode,) = U8.unpack_from(data, offset)
+    offset += 1
+    end = None
+    if mode & HORDE_ZLIB:
+        data, offset, end = zlib.decompress(data[offset:]), 0, len(data)
+        mode &= ~HORDE_ZLIB
+    if mode not in (HORDE_FULL, HORDE_DELTA8, HORDE_DELTA4):
+        raise ValueError(f"unknown horde mode {mode}")
+    if mode != HORDE_FULL and base is None:
+        raise ValueError("horde delta without a horde in the base snapshot")
+    removed = ()
+    if mode != HORDE_FULL:
+        (n,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        removed = np.frombuffer(data, dtype=">u2", count=n, offset=offset)
+        offset += 2 * n
+    (n,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    block = np.frombuffer(data, dtype=HORDE_DTYPE, count=n, offset=offset)
+    offset += n * HORDE_DTYPE.itemsize
+    new = (block["x"].astype(np.int32), block["y"].astype(np.int32), block["skin"].copy())
+    if mode == HORDE_FULL:
+        horde = new
+    else:
+        bx, by, bskin = base
+        keep = np.ones(len(bx), dtype=bool)
+        keep[removed] = False
+        kept = len(bx) - len(removed)
+        if mode == HORDE_DELTA4:
+            packed = np.frombuffer(data, dtype=np.uint8, count=kept, offset=offset).astype(np.int32)
+            offset += kept
+            dx, dy = (packed >> 4) - 8, (packed & 15) - 8
+        else:
+            moves = np.frombuffer(data, dtype=np.int8, count=2 * kept, offset=offset).astype(np.int32)
+            offset += 2 * kept
+            dx, dy = moves[0::2], moves[1::2]
+        horde = (np.concatenate((bx[keep] + dx, new[0])), np.concatenate((by[keep] + dy, new[1])),
+                 np.concatenate((bskin[keep], new[2])))
+    return horde, offset if end is None else end
+
+
+# ------------------------------------------------------------------ транспорт
+
+class UdpTransport:
+    """
+    One non-blocking UDP socket. The server binds it and talks to many
+    addresses; a client passes peer and sends to it. A lost or refused
+    datagram is just gone — the protocol resends what matters.
+    """
+
+    def __init__(self, bind=None, peer=None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        if bind is not None:
+            self.sock.bind(bind)
+        self.peer = peer
+
+    @property
+    def address(self):
+        return self.sock.getsockname()
+
+    def send(self, data, addr=None):
+        try:
+            self.sock.sendto(data, addr or self.peer)
+        except (BlockingIOError, ConnectionRefusedError):
+            pass
+
+    def receive(self):
+        """Everything that has arrived: [(addr, payload)]."""
+        got = []
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(65535)
+            except (BlockingIOError, ConnectionResetError, ConnectionRefusedError):
+                return got
+            got.append((addr, data))
+
+    def close(self):
+        self.sock.close()
+
+
+class TcpTransport:
+    """
+    Length-prefixed frames over TCP, same interface as UdpTransport. The
+    server listens on bind and keeps one connection per client address;
+    a client connects to peer. Nothing is ever lost, but a late frame holds
+    up every frame behind it.
+    """
+
+    FRAME = struct.Struct("!I")
+
+    def __init__(self, bind=None, peer=None):
+        self.listener = None
+        self.peer = peer
+        self._conns = {}  # addr -> [socket, входной буфер, выходной буфер]
+        if bind is not None:
+            self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.listener.bind(bind)
+            self.listener.listen()
+            self.listener.setblocking(False)
+        if peer is not None:
+            self._add(socket.create_connection(peer), peer)
+
+    @property
+    def address(self):
+        return (self.listener or self._conns[self.peer][0]).getsockname()
+
+    def _add(self, sock, addr):
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._conns[addr] = [sock, bytearray(), bytearray()]
+
+    def _drop(self, addr):
+        conn = self._conns.pop(addr, None)
+        if conn is not None:
+            conn[0].close()
+
+    def _flush(self, addr, conn):
+        try:
+            while conn[2]:
+                sent = conn[0].send(conn[2])
+                del conn[2][:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._drop(addr)
+
+    def send(self, data, addr=None):
+        addr = addr or self.peer
+        conn = self._conns.get(addr)
+        if conn is None:
+            return
+        conn[2] += self.FRAME.pack(len(data))
+        conn[2] += data
+        self._flush(addr, conn)
+
+    def receive(self):
+        got = []
+        if self.listener is not None:
+            while True:
+                try:
+                    sock, addr = self.listener.accept()
+                except BlockingIOError:
+                    break
+                self._add(sock, addr)
+        for addr, conn in list(self._conns.items()):
+            self._flush(addr, conn)
+            sock, buf = conn[0], conn[1]
+            try:
+                while True:
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        self._drop(addr)
+                        break
+                    buf += chunk
+            except BlockingIOError:
+                pass
+            except OSError:
+                self._drop(addr)
+            head = self.FRAME.size
+            while len(buf) >= head:
+                (n,) = self.FRAME.unpack_from(buf)
+                if len(buf) < head + n:
+                    break
+                got.append((addr, bytes(buf[head:head + n])))
+                del buf[:head + n]
+        return got
+
+    def close(self):
+        for addr in list(self._conns):
+            self._drop(addr)
+        if self.listener is not None:
+            self.listener.close()
+
+
+class DelayLine:
+    """
+    Packets go in, come out latency_ms ± jitter_ms later; with probability
+    loss a packet is dropped. ordered=True models TCP: nothing is reordered
+    and a "lost" packet arrives one retransmission timeout late instead,
+    holding back everything sent after it.
+    """
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, loss=0.0, ordered=False, seed=None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.loss = loss
+        self.ordered = ordered
+        self.rto = max(0.2, 3 * self.latency)  # как минимальный RTO в Linux
+        self.rng = random.Random(seed)
+        self._heap = []
+        self._seq = 0
+        self._last = 0.0
+        self.dropped = 0
+        self.delayed = 0
+
+    def push(self, data, now=None):
+        now = time.perf_counter() if now is None else now
+        due = now + max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        if self.loss and self.rng.random() < self.loss:
+            if not self.ordered:
+                self.dropped += 1
+                return
+            self.delayed += 1
+            due += self.rto
+        if self.ordered:
+            due = self._last = max(due, self._last)
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, data))
+
+    def pop_due(self, now=None):
+        now = time.perf_counter() if now is None else now
+        heap = self._heap
+        out = []
+        while heap and heap[0][0] <= now:
+            out.append(heapq.heappop(heap)[2])
+        return out
+
+
+class NetShim:
+    """Fake network conditions on one client: up for what it sends, down for what it receives."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, loss=0.0, ordered=False, seed=None):
+        self.up = DelayLine(latency_ms, jitter_ms, loss, ordered, seed)
+        self.down = DelayLine(latency_ms, jitter_ms, loss, ordered, None if seed is None else seed + 1)
+
+    def stats(self):
+        return {"dropped": self.up.dropped + self.down.dropped, "retransmitted": self.up.delayed + self.down.delayed}
+
+
+def make_transport(tcp, bind=None, peer=None):
+    return TcpTransport(bind, peer) if tcp else UdpTransport(bind, peer)
+
+
+# ------------------------------------------------------------------ сервер
+
+class Session:
+    """One connected client as the server sees it."""
+
+    def __init__(self, cid, addr, role, now):
+        self.id = cid
+        self.addr = addr
+        self.role = role
+        self.heard = now
+        self.inputs = deque()  # (seq, InputState), ещё не применённые
+        self.received = 0  # старший принятый seq ввода
+        self.last_input = 0  # seq последнего применённого
+        self.held = mg.InputState()  # ввод не пришёл к тику — повторяем прошлый
+        self.acked = 0  # последний снимок, который клиент подтвердил
+        self.bytes_in = self.bytes_out = 0
+        self.packets_in = self.packets_out = 0
+        self.full = self.deltas = 0
+        self.starved = self.overflow = 0
+        self.bad = 0  # отброшено битых пакетов
+        self.rtts = deque(maxlen=512)
+
+    def next_input(self):
+        while len(self.inputs) > MAX_INPUT_QUEUE:
+            self.inputs.popleft()
+            self.overflow += 1
+        if self.inputs:
+            self.last_input, self.held = self.inputs.popleft()
+        else:
+            self.starved += 1
+        return self.held
+
+
+class Server:
+    """
+    Owns the GameState. run() steps it in real time at SIM_HZ once a pilot
+    has joined and sends every client a snapshot each SIM_HZ / snapshot_hz
+    ticks. It stops on game over, after `seconds`, or when everyone who
+    joined has left; report() has bandwidth per client and tick timings.
+    """
+
+    def __init__(self, transport, mode="classic", seed=None, purchases=None, snapshot_hz=SNAPSHOT_HZ,
+                 timeout_s=CLIENT_TIMEOUT_S):
+        self.transport = transport
+        self.mode = mode
+        self.purchases = purchases or {}
+        self.state = mg.GameState(purchases=self.purchases, mode=mode, seed=seed)
+        self.snapshot_every = max(1, round(mg.SIM_HZ / snapshot_hz))
+        self.snapshot_hz = mg.SIM_HZ / self.snapshot_every
+        self.timeout_s = timeout_s
+        self.sessions = {}  # addr -> Session, в порядке подключения
+        self.departed = []
+        self.bad_packets = 0  # битые пакеты и пакеты от неизвестных адресов
+        self._next_cid = 1
+        self.seq = 0
+        self.history = {}  # seq -> (время отправки, сущности, орда); порядок вставки = порядок seq
+        self._ids = {}  # спрайт -> сетевой id
+        self._used_ids = set()  # значения _ids: поиск свободного id без прохода по словарю
+        self._next_id = 1
+        self.skins = {id(img): i for i, img in enumerate(mg.GameState._load_enemy_images())}
+        self.snapshot_bytes = 0  # всё, что ушло снимками
+        self.full_bytes = 0  # сколько ушло бы, будь каждый снимок полным и несжатым
+        self.tick_ms = []  # весь тик: ввод + step + снимки
+        self.sim_ms = []
+        self.snap_ms = []
+        self.started = None
+        self.stopped = None
+
+    # --- сеть
+
+    def _send(self, session, data):
+        session.bytes_out += len(data)
+        session.packets_out += 1
+        self.transport.send(data, session.addr)
+
+    def pilot(self):
+        for s in self.sessions.values():
+            if s.role == ROLE_PILOT:
+                return s
+        return None
+
+    def _join(self, addr, now):
+        role = ROLE_SPECTATOR if self.pilot() else ROLE_PILOT
+        session = self.sessions[addr] = Session(self._next_cid, addr, role, now)
+        self._next_cid += 1
+        log.info("client %d %s:%d joined as %s", session.id, addr[0], addr[1],
+                 "pilot" if role == ROLE_PILOT else "spectator")
+        return session
+
+    def _leave(self, session, why):
+        del self.sessions[session.addr]
+        self.departed.append(session)
+        log.info("client %d left (%s)", session.id, why)
+        if session.role == ROLE_PILOT:
+            # корабль переходит к следующему по очереди
+            for s in self.sessions.values():
+                s.role = ROLE_PILOT
+                break
+
+    def receive(self):
+        now = time.perf_counter()
+        for addr, data in self.transport.receive():
+            if not data:
+                continue
+            session = self.sessions.get(addr)
+            kind = data[0]
+            if kind == MSG_HELLO:
+                if len(data) < HELLO.size or HELLO.unpack_from(data)[1] != PROTOCOL_VERSION:
+                    self.transport.send(BYE.pack(MSG_BYE, 1), addr)
+                    continue
+                if session is None:
+                    session = self._join(addr, now)
+                # повторный HELLO — значит, WELCOME потерялся
+                flags = 1 if self.purchases.get("quantum_capacitor") else 0
+                self._send(session, WELCOME.pack(MSG_WELCOME, session.id, session.role, mg.SIM_HZ,
+                                                 round(self.snapshot_hz), MODES.index(self.mode),
+                                                 self.state.seed, flags))
+            if session is None:
+                self.bad_packets += kind != MSG_HELLO
+                continue
+            if kind not in (MSG_INPUT, MSG_BYE, MSG_HELLO) or (kind == MSG_INPUT and not input_packet_ok(data)):
+                # обрезанный или чужой пакет: отбрасываем, до разбора и до отметки «клиент жив»
+                session.bad += 1
+                self.bad_packets += 1
+                continue
+            session.heard = now
+            session.bytes_in += len(data)
+            session.packets_in += 1
+            if kind == MSG_INPUT:
+                self._on_input(session, data, now)
+            elif kind == MSG_BYE:
+                self._leave(session, "bye")
+        for session in list(self.sessions.values()):
+            if now - session.heard > self.timeout_s:
+                self._leave(session, "timeout")
+
+    def _on_input(self, session, data, now):
+        _, ack, first, n = INPUT_HEAD.unpack_from(data)
+        if ack > session.acked:
+            sent = self.history.get(ack)
+            if sent is not None:
+                # до ack клиент ещё ждёт своего пакета ввода — RTT завышен максимум на INPUT_SEND_EVERY тиков
+                session.rtts.append((now - sent[0]) * 1000)
+            session.acked = ack
+        if session.role != ROLE_PILOT:
+            return
+        seq = first
+        for i in range(n):
+            run, *rec = INPUT_RUN.unpack_from(data, INPUT_HEAD.size + i * INPUT_RUN.size)
+            inputs = None
+            for seq in range(seq, seq + run):
+                if seq > session.received:
+                    inputs = inputs or unpack_input(*rec)
+                    session.inputs.append((seq, inputs))
+                    session.received = seq
+            seq += 1
+
+    # --- снимки
+
+    def _net_id(self, sprite, seen):
+        nid = self._ids.get(sprite)
+        if nid is None:
+            nid = self._next_id
+            used = self._used_ids
+            while nid in used or nid in seen:
+                nid = nid % 65535 + 1
+            self._next_id = nid % 65535 + 1
+            self._ids[sprite] = nid
+            used.add(nid)
+        seen.add(nid)
+        return nid
+
+    def capture(self):
+        """Quantized entities {id: (kind, x, y, angle, extra)} plus the horde (see quantize_horde) or None."""
+        state = self.state
+        ents = {}
+        seen = set()
+        for e in state.enemies:
+            ents[self._net_id(e, seen)] = (KIND_ENEMY, quantize(e.pos.x), quantize(e.pos.y), 0,
+                                           self.skins.get(id(e.image), 0))
+        for b in state.bullets:
+            if isinstance(b, mg.BeamBullet):
+                rec = (KIND_BEAM, quantize(b.pos.x), quantize(b.pos.y),
+                       quantize_angle(math.degrees(math.atan2(b.vy, b.vx))), 0)
+            else:
+                rec = (KIND_BULLET, quantize(b.pos.x), quantize(b.pos.y), quantize_angle(b.angle),
+                       int(b.charged))
+            ents[self._net_id(b, seen)] = rec
+        for p in state.powerups:
+            ents[self._net_id(p, seen)] = (KIND_POWERUP, quantize(p.rect.centerx), quantize(p.rect.centery), 0,
+                                           mg.PowerUp.TYPES.index(p.type))
+        if len(self._ids) > len(seen):
+            self._ids = {s: nid for s, nid in self._ids.items() if nid in seen}
+            self._used_ids = set(seen)
+        horde = quantize_horde(state.horde) if state.horde is not None else None
+        return ents, horde
+
+    def _header(self, session, base):
+        state = self.state
+        player = state.player
+        flags = ((F_GAME_OVER if state.game_over else 0) | (F_BEAM_READY if state.beam_ready else 0)
+                 | (F_QUANTUM if state.quantum_enabled else 0) | (F_AUTOFIRE if state.autofire else 0)
+                 | (F_PILOT if session.role == ROLE_PILOT else 0))
+        powerup = mg.PowerUp.TYPES.index(state.powerup_active) + 1 if state.powerup_active else 0
+        return SNAP_HEAD.pack(MSG_SNAPSHOT, self.seq, base, state.ticks, session.last_input,
+                              min(state.score, 0xFFFFFFFF), max(-32768, min(32767, int(player.health))),
+                              min(255, state.enemy_level), flags, powerup,
+                              min(65535, round(state.player_speed * 100)),
+                              round(state.beam_progress() * 255),
+                              quantize(player.pos.x), quantize(player.pos.y),
+                              quantize_angle(player.last_angle_deg))
+
+    def broadcast(self, now):
+        self.seq += 1
+        ents, horde = self.capture()
+        history = self.history
+        history[self.seq] = (now, ents, horde)
+        while len(history) > HISTORY:
+            del history[next(iter(history))]
+        empty = {}
+        self.full_bytes += full_snapshot_size(ents, horde) * len(self.sessions)
+        for session in self.sessions.values():
+            sent = history.get(session.acked) if session.acked else None
+            base_seq, base, base_horde = (session.acked, sent[1], sent[2]) if sent is not None else (0, empty, None)
+            out = bytearray(self._header(session, base_seq))
+            encode_entities(out, base, ents)
+            encode_horde(out, base_horde, horde)
+            if base_seq:
+                session.deltas += 1
+            else:
+                session.full += 1
+            self.snapshot_bytes += len(out)
+            self._send(session, bytes(out))
+
+    # --- цикл
+
+    def tick(self):
+        t0 = time.perf_counter()
+        pilot = self.pilot()
+        inputs = pilot.next_input() if pilot is not None else mg.InputState()
+        self.state.step(inputs, mg.SIM_DT)
+        t1 = time.perf_counter()
+        if self.state.ticks % self.snapshot_every == 0 or self.state.game_over:
+            self.broadcast(t1)
+            self.snap_ms.append((time.perf_counter() - t1) * 1000)
+        t2 = time.perf_counter()
+        self.sim_ms.append((t1 - t0) * 1000)
+        self.tick_ms.append((t2 - t0) * 1000)
+
+    def run(self, seconds=None):
+        period = mg.SIM_DT / 1000
+        deadline = None
+        next_tick = time.perf_counter()
+        while True:
+            self.receive()
+            now = time.perf_counter()
+            if self.started is None:
+                if not self.pilot():
+                    time.sleep(0.005)
+                    continue
+                # партия начинается с первым пилотом
+                self.started = next_tick = now
+                deadline = now + seconds if seconds else None
+            if not self.sessions or (deadline is not None and now >= deadline):
+                break
+            if now < next_tick:
+                time.sleep(min(next_tick - now, 0.002))
+                continue
+            self.tick()
+            if self.state.game_over:
+                break
+            next_tick += period
+            if now - next_tick > mg.MAX_FRAME_MS / 1000:
+                next_tick = now  # после фриза не догоняем пачкой тиков
+        self.stopped = time.perf_counter()
+        # последний снимок и BYE — несколько раз, UDP может потерять
+        for _ in range(3):
+            self.broadcast(self.stopped)
+            for session in self.sessions.values():
+                self._send(session, BYE.pack(MSG_BYE, 0))
+
+    def report(self):
+        elapsed = max(1e-9, (self.stopped or time.perf_counter()) - (self.started or time.perf_counter()))
+        clients = []
+        for s in list(self.departed) + list(self.sessions.values()):
+            rtts = sorted(s.rtts)
+            clients.append({
+                "id": s.id, "role": "pilot" if s.role == ROLE_PILOT else "spectator",
+                "kbps_out": round(s.bytes_out * 8 / 1000 / elapsed, 1),
+                "kbps_in": round(s.bytes_in * 8 / 1000 / elapsed, 1),
+                "packets_out": s.packets_out, "packets_in": s.packets_in,
+                "full": s.full, "deltas": s.deltas,
+                "rtt_ms": round(rtts[len(rtts) // 2], 1) if rtts else None,
+                "input_starved": s.starved, "input_dropped": s.overflow, "bad_packets": s.bad,
+            })
+        return {
+            "seconds": round(elapsed, 2), "ticks": self.state.ticks, "snapshots": self.seq,
+            "score": self.state.score, "game_over": self.state.game_over, "bad_packets": self.bad_packets,
+            "delta_ratio": round(self.snapshot_bytes / self.full_bytes, 3) if self.full_bytes else None,
+            "tick_ms": _percentiles(self.tick_ms), "sim_ms": _percentiles(self.sim_ms),
+            "snapshot_ms": _percentiles(self.snap_ms), "clients": sorted(clients, key=lambda c: c["id"]),
+        }
+
+
+def _percentiles(samples):
+    if not samples:
+        return {}
+    s = sorted(samples)
+    n = len(s)
+    return {"mean": round(sum(s) / n, 3), "p50": round(s[n // 2], 3), "p95": round(s[min(n - 1, n * 95 // 100)], 3),
+            "max": round(s[-1], 3)}
+
+
+# ------------------------------------------------------------------ клиент
+
+class NetSprite(pygame.sprite.Sprite):
+    """A server-owned entity on the client, drawn between its last two snapshot positions."""
+
+    def __init__(self, kind, image, x, y):
+        super().__init__()
+        self.kind = kind
+        self.key = None  # (угол, extra), под которые построена картинка
+        self.image = image
+        self.pos = pygame.Vector2(x, y)
+        self.start = pygame.Vector2(x, y)
+        self.target = pygame.Vector2(x, y)
+        self.rect = image.get_rect(center=(round(x), round(y)))
+
+    def retarget(self, x, y):
+        self.start.update(self.pos)
+        self.target.update(x, y)
+        if self.start.distance_squared_to(self.target) > SNAP_DIST * SNAP_DIST:
+            self.start.update(x, y)  # телепорт (объект из пула) — не размазываем
+
+    def place(self, t):
+        self.pos = self.start.lerp(self.target, t)
+        self.rect = self.image.get_rect(center=(round(self.pos.x), round(self.pos.y)))
+
+
+class ClientView:
+    """
+    What the client knows about the game, shaped like GameState where the
+    renderer and the autopilot look (player, sprite groups, horde, HUD
+    fields), so both work on it unchanged.
+    """
+
+    def __init__(self, mode="classic", quantum=False, particles=True):
+        self.mode = mode
+        self.now = 0
+        self.ticks = 0
+        self.player = mg.Player(mg.WIDTH // 2, mg.HEIGHT // 2)
+        self.all_sprites = pygame.sprite.Group(self.player)
+        self.enemies = pygame.sprite.Group()
+        self.bullets = pygame.sprite.Group()
+        self.powerups = pygame.sprite.Group()
+        self.effects = pygame.sprite.Group()
+        self.sprites = {}  # сетевой id -> NetSprite
+        self.horde = None
+        self.horde_images = mg.GameState._load_enemy_images()
+        self.score = 0
+        self.enemy_level = 1
+        self.powerup_active = None
+        self.player_speed = mg.PLAYER_SPEED_BASE
+        self.quantum_enabled = quantum
+        self.beam_ready = False
+        self.beam = 0.0
+        self.autofire = False
+        self.game_over = False
+        self.particles = None
+        if particles and mg.PARTICLES:
+            try:
+                self.particles = mg.ParticleSystem(mg.PARTICLE_BUDGET)
+            except RuntimeError:
+                pass
+        probe = mg.Bullet(0, 0, 0)  # заодно загружает кадры пули
+        self._bullet_image = probe.frames[0] if probe.frames else probe.image
+        self._powerup_images = {}
+        self._rng = random.Random(0)
+
+    def beam_progress(self):
+        return 1.0 if self.beam_ready else self.beam
+
+    def image_for(self, kind, angle, extra):
+        deg = angle * 360 / 256
+        if kind == KIND_ENEMY:
+            return self.horde_images[extra % len(self.horde_images)]
+        if kind == KIND_BULLET:
+            tint = mg.CHARGED_TINT if extra and mg.CHARGED_TINT_ENABLED else None
+            return mg.ROTATIONS.get(self._bullet_image, -deg + 90, tint)
+        if kind == KIND_BEAM:
+            return mg.ROTATIONS.get(mg.BeamBullet._scaled_image(), -deg + 90)
+        ptype = mg.PowerUp.TYPES[extra % len(mg.PowerUp.TYPES)]
+        if ptype not in self._powerup_images:
+            self._powerup_images[ptype] = mg.PowerUp(self._rng, kind=ptype).image
+        return self._powerup_images[ptype]
+
+    def _group(self, kind):
+        if kind == KIND_ENEMY:
+            return self.enemies
+        return self.powerups if kind == KIND_POWERUP else self.bullets
+
+    def apply(self, ents, removed):
+        for nid in removed:
+            sprite = self.sprites.pop(nid, None)
+            if sprite is None:
+                continue
+            sprite.kill()
+            # враги исчезают только сбитыми, бонусы — только подобранными
+            if sprite.kind == KIND_ENEMY:
+                self._effect(mg.Explosion(sprite.rect.center))
+                if self.particles is not None:
+                    self.particles.emit("debris", *sprite.rect.center)
+            elif sprite.kind == KIND_POWERUP:
+                self._effect(mg.Flash(sprite.rect.center))
+        for nid, (kind, qx, qy, angle, extra) in ents.items():
+            x, y = dequantize(qx), dequantize(qy)
+            sprite = self.sprites.get(nid)
+            if sprite is not None and sprite.kind != kind:
+                sprite.kill()
+                sprite = None
+            if sprite is None:
+                sprite = self.sprites[nid] = NetSprite(kind, self.image_for(kind, angle, extra), x, y)
+                self.all_sprites.add(sprite)
+                self._group(kind).add(sprite)
+            else:
+                sprite.retarget(x, y)
+            if sprite.key != (angle, extra):
+                sprite.key = (angle, extra)
+                sprite.image = self.image_for(kind, angle, extra)
+
+    def set_horde(self, x, y, skin):
+        n = len(x)
+        if self.horde is None:
+            self.horde = mg.EnemyStore(capacity=max(64, n))
+        horde = self.horde
+        if n > horde.capacity:
+            horde._grow(n)
+        # у орды нет id — без интерполяции, просто последние позиции
+        horde.x[:n] = horde.prev_x[:n] = x / HORDE_QUANT - ORIGIN
+        horde.y[:n] = horde.prev_y[:n] = y / HORDE_QUANT - ORIGIN
+        horde.sprite[:n] = np.minimum(skin, len(self.horde_images) - 1)
+        horde.count = n
+
+    def _effect(self, sprite):
+        self.all_sprites.add(sprite)
+        self.effects.add(sprite)
+
+    def place(self, t):
+        for sprite in self.sprites.values():
+            sprite.place(t)
+
+    def update_effects(self, dt):
+        self.effects.update(dt)
+        if self.particles is not None:
+            self.particles.update(dt)
+
+
+class Client:
+    """
+    Connects, sends one input per sim tick (batched INPUT_SEND_EVERY ticks
+    to a packet, with the unacknowledged ones repeated), applies snapshots
+    and, as pilot, predicts its own ship. pilot(view) -> InputState drives
+    it headless (an autopilot); without one it reads the keyboard and mouse.
+    """
+
+    def __init__(self, transport, shim=None, pilot=None, render=False, name="client"):
+        self.transport = transport
+        self.shim = shim
+        self.pilot_fn = pilot
+        self.render = render
+        self.name = name
+        self.view = None
+        self.id = None
+        self.role = None
+        self.snapshot_hz = SNAPSHOT_HZ
+        self.connected = False
+        self.closed = False
+        self.snapshots = {}  # seq -> (сущности, орда), для дельт
+        self.first = 0  # первый полученный снимок (сервер мог начать считать без нас)
+        self.latest = 0
+        self.latest_at = 0.0
+        self.seq = 0  # последний отправленный ввод
+        self.pending = deque()  # (seq, InputState, предсказанная позиция после него)
+        self.bytes_in = self.bytes_out = 0
+        self.received = self.full = self.stale = self.undecodable = 0
+        self.corrections = 0
+        self.errors = []  # расхождение предсказания и сервера, px
+        self._last_hello = 0.0
+
+    # --- сеть
+
+    def _send(self, data):
+        self.bytes_out += len(data)
+        if self.shim is not None:
+            self.shim.up.push(data)
+        else:
+            self.transport.send(data)
+
+    def pump(self):
+        now = time.perf_counter()
+        shim = self.shim
+        incoming = [data for _, data in self.transport.receive()]
+        if shim is not None:
+            for data in shim.up.pop_due(now):
+                self.transport.send(data)
+            for data in incoming:
+                shim.down.push(data, now)
+            incoming = shim.down.pop_due(now)
+        for data in incoming:
+            self.bytes_in += len(data)
+            self._handle(data, now)
+        if not self.connected and now - self._last_hello > HELLO_RETRY_S:
+            self._last_hello = now
+            self._send(HELLO.pack(MSG_HELLO, PROTOCOL_VERSION))
+
+    def _handle(self, data, now):
+        kind = data[0]
+        if kind == MSG_WELCOME and not self.connected:
+            if len(data) < WELCOME.size:
+                return  # битый WELCOME: ждём следующего, HELLO повторится сам
+            _, cid, role, sim_hz, snapshot_hz, mode, seed, flags = WELCOME.unpack_from(data)
+            if mode >= len(MODES):
+                return
+            self.id, self.role, self.snapshot_hz = cid, role, snapshot_hz
+            if sim_hz != mg.SIM_HZ:
+                log.warning("%s: server runs at %d Hz, this client at %d Hz", self.name, sim_hz, mg.SIM_HZ)
+            self.view = ClientView(MODES[mode], quantum=bool(flags & 1), particles=self.render)
+            self.connected = True
+        elif kind == MSG_SNAPSHOT and self.view is not None:
+            self._on_snapshot(data, now)
+        elif kind == MSG_BYE:
+            self.closed = True
+
+    def _on_snapshot(self, data, now):
+        self.received += 1
+        if len(data) < SNAP_HEAD.size:
+            self.undecodable += 1
+            return
+        (_, seq, base, tick, last_input, score, health, level, flags, powerup, speed, beam,
+         px, py, pangle) = SNAP_HEAD.unpack_from(data)
+        if seq <= self.latest:
+            self.stale += 1  # UDP перепутал порядок — новее уже есть
+            return
+        if base and base not in self.snapshots:
+            self.undecodable += 1
+            return
+        # весь разбор — до первого изменения состояния: битый снимок просто пропускаем
+        base_ents, base_horde = self.snapshots.get(base, ({}, None))
+        try:
+            ents, removed, offset = decode_entities(data, SNAP_HEAD.size, base_ents)
+            horde = None
+            if np is not None:  # блок орды — последний в снимке, без numpy его можно просто не читать
+                horde, offset = decode_horde(data, offset, base_horde)
+            powerup_type = mg.PowerUp.TYPES[powerup - 1] if powerup else None
+        except (struct.error, zlib.error, KeyError, IndexError, ValueError):
+            self.undecodable += 1
+            return
+        if not base:
+            self.full += 1
+            removed = [nid for nid in self.view.sprites if nid not in ents]
+        self.first = self.first or seq
+        self.snapshots[seq] = (ents, horde)
+        while len(self.snapshots) > HISTORY:
+            del self.snapshots[next(iter(self.snapshots))]
+        self.latest, self.latest_at = seq, now
+
+        view = self.view
+        view.apply(ents, removed)
+        if horde is not None and len(horde[0]):
+            view.set_horde(*horde)
+        elif view.horde is not None:
+            view.horde.count = 0
+        view.score, view.enemy_level = score, level
+        view.game_over = bool(flags & F_GAME_OVER)
+        view.beam_ready = bool(flags & F_BEAM_READY)
+        view.autofire = bool(flags & F_AUTOFIRE)
+        view.quantum_enabled = bool(flags & F_QUANTUM)
+        view.powerup_active = powerup_type
+        view.player_speed = speed / 100
+        view.beam = beam / 255
+        player = view.player
+        player.health = health
+        self.role = ROLE_PILOT if flags & F_PILOT else ROLE_SPECTATOR
+        sx, sy = dequantize(px), dequantize(py)
+        if self.role == ROLE_PILOT:
+            self._reconcile(last_input, sx, sy)
+        else:
+            self.pending.clear()
+            player.prev_pos = None
+            player.pos.update(sx, sy)
+            base_image = player._select_base_image_for_health()
+            player.image = mg.ROTATIONS.get(base_image, pangle * 360 / 256)
+            player.rect = player.image.get_rect(center=(round(sx), round(sy)))
+
+    def _reconcile(self, last_input, sx, sy):
+        """Rewind the ship to the server's position after input last_input and replay the newer inputs."""
+        pending = self.pending
+        predicted = None
+        while pending and pending[0][0] <= last_input:
+            seq, _, pos = pending.popleft()
+            if seq == last_input:
+                predicted = pos
+        player = self.view.player
+        if predicted is not None:
+            err = math.hypot(predicted[0] - sx, predicted[1] - sy)
+            self.errors.append(err)
+            if err <= CORRECTION_PX:
+                return  # предсказание сошлось (с точностью до квантования)
+            self.corrections += 1
+        elif not last_input:
+            return  # сервер ещё не применил ни одного нашего ввода
+        player.pos.update(sx, sy)
+        speed = self.view.player_speed
+        for i, (seq, inputs, _) in enumerate(pending):
+            player.update(inputs, speed, mg.SIM_DT)
+            pending[i] = (seq, inputs, (player.pos.x, player.pos.y))
+
+    # --- тик
+
+    def tick(self, raw_inputs):
+        """One sim tick: predict with this input (pilot) and send a batch every INPUT_SEND_EVERY ticks."""
+        view = self.view
+        view.ticks += 1
+        view.now += mg.SIM_DT
+        view.update_effects(mg.SIM_DT)
+        if self.role == ROLE_PILOT:
+            self.seq += 1
+            rec = pack_input(raw_inputs)
+            inputs = unpack_input(*rec)  # предсказываем на том же квантованном вводе, что увидит сервер
+            view.player.update(inputs, view.player_speed, mg.SIM_DT)
+            self.pending.append((self.seq, inputs, (view.player.pos.x, view.player.pos.y)))
+            if view.particles is not None and inputs.moving:
+                mx, my = inputs.mouse_pos
+                back = math.atan2(view.player.pos.y - my, view.player.pos.x - mx)
+                view.particles.emit("exhaust", view.player.pos.x + math.cos(back) * 20,
+                                    view.player.pos.y + math.sin(back) * 20, back)
+        if view.ticks % INPUT_SEND_EVERY == 0:
+            self._send_inputs()
+
+    def _send_inputs(self):
+        batch = list(self.pending)[-INPUT_REDUNDANCY:] if self.role == ROLE_PILOT else []
+        # одинаковые вводы подряд (стоим, держим кнопку, мышь не двигается) — одной серией
+        runs = []
+        for _, inputs, _ in batch:
+            rec = pack_input(inputs)
+            if runs and runs[-1][1] == rec and runs[-1][0] < 255:
+                runs[-1][0] += 1
+            else:
+                runs.append([1, rec])
+        out = bytearray(INPUT_HEAD.pack(MSG_INPUT, self.latest, batch[0][0] if batch else 0, len(runs)))
+        for run, rec in runs:
+            out += INPUT_RUN.pack(run, *rec)
+        self._send(bytes(out))
+
+    def interpolation(self, now):
+        return max(0.0, min(1.0, (now - self.latest_at) * self.snapshot_hz)) if self.latest else 1.0
+
+    def run(self, seconds=None, connect_timeout=5.0):
+        """Play until the server says bye, the window closes or `seconds` pass."""
+        t0 = time.perf_counter()
+        while not self.connected:
+            self.pump()
+            if self.closed or time.perf_counter() - t0 > connect_timeout:
+                return False
+            time.sleep(0.005)
+        win = renderer = clock = None
+        if self.render:
+            win = mg.display.set_mode(False)
+            pygame.display.set_caption(f"Top-Down Shooter — {self.name}")
+            renderer = mg.GameRenderer(win, mg.FontCompat(24))
+            clock = pygame.time.Clock()
+        stepper = mg.FixedStep(mg.SIM_HZ, mg.MAX_FRAME_MS)
+        started = last = time.perf_counter()
+        while not self.closed:
+            if seconds is not None and last - started >= seconds:
+                break
+            if self.render:
+                clock.tick(mg.FPS)
+                if any(e.type == pygame.QUIT for e in pygame.event.get()):
+                    break
+            else:
+                time.sleep(mg.SIM_DT / 1000 / 2)
+            now = time.perf_counter()
+            frame_ms, last = (now - last) * 1000, now
+            self.pump()
+            for _ in range(stepper.advance(frame_ms)):
+                raw = self.pilot_fn(self.view) if self.pilot_fn else mg.InputState.poll()
+                self.tick(raw)
+            self.view.place(self.interpolation(now))
+            if self.render:
+                renderer.draw(self.view, frame_ms, stepper.alpha if self.role == ROLE_PILOT else 1.0)
+                if self.view.game_over:
+                    renderer.note_rect(mg.draw_pause(win, renderer.font))
+                renderer.present()
+        self._send(BYE.pack(MSG_BYE, 0))
+        if self.shim is not None:
+            # BYE тоже идёт через задержку — доставим его, а не бросим в очереди
+            end = time.perf_counter() + self.shim.up.latency + self.shim.up.jitter + 0.01
+            while time.perf_counter() < end:
+                self.pump()
+                time.sleep(0.005)
+        return True
+
+    def report(self, elapsed):
+        errors = sorted(self.errors)
+        return {
+            "name": self.name, "role": "pilot" if self.role == ROLE_PILOT else "spectator",
+            "kbps_in": round(self.bytes_in * 8 / 1000 / max(elapsed, 1e-9), 1),
+            "kbps_out": round(self.bytes_out * 8 / 1000 / max(elapsed, 1e-9), 1),
+            "snapshots": self.received, "full": self.full, "stale": self.stale,
+            "undecodable": self.undecodable, "lost": max(0, self.latest - self.first + 1 - self.received) if self.latest else 0,
+            "corrections": self.corrections,
+            "error_px": {"p50": round(errors[len(errors) // 2], 2), "max": round(errors[-1], 2)} if errors else {},
+            "shim": self.shim.stats() if self.shim else {},
+        }
+
+
+# ------------------------------------------------------------------ запуск
+
+def _headless():
+    win = mg.init_headless()
+    mg.Assets.prepare_assets()
+    mg.preload_assets(win, show=False)
+
+
+def _serve(args, ready=None, results=None):
+    logging.basicConfig(level=logging.INFO, format="%(message)s")  # процесс сервера под spawn не наследует main()
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_NO_SIGNAL_HANDLERS"] = "1"
+    mg.PARTICLES = False  # сервер ничего не рисует
+    _headless()
+    transport = make_transport(args.tcp, bind=(args.bind, args.port))
+    purchases = {item: True for item in args.purchase}
+    server = Server(transport, mode=args.mode, seed=args.seed, purchases=purchases, snapshot_hz=args.snapshot_hz)
+    proto = "tcp" if args.tcp else "udp"
+    print(f"server on {proto} {transport.address[0]}:{transport.address[1]}, seed {server.state.seed}, "
+          f"{server.snapshot_hz:g} snapshots/s")
+    if ready is not None:
+        ready.set()
+    try:
+        server.run(args.seconds)
+    except KeyboardInterrupt:
+        server.stopped = time.perf_counter()
+    finally:
+        transport.close()
+    report = server.report()
+    if results is not None:
+        results.put(report)
+    else:
+        print_server_report(report)
+    return report
+
+
+def print_server_report(r):
+    print(f"server: {r['seconds']}s, {r['ticks']} ticks, {r['snapshots']} snapshots, score {r['score']}"
+          f"{', game over' if r['game_over'] else ''}")
+    if r["delta_ratio"] is not None:
+        print(f"  snapshots took {r['delta_ratio']:.0%} of the bytes uncompressed full snapshots would")
+    if r["bad_packets"]:
+        print(f"  dropped {r['bad_packets']} malformed or stray packets")
+    for name in ("tick_ms", "sim_ms", "snapshot_ms"):
+        p = r[name]
+        if p:
+            print(f"  {name:<12} mean {p['mean']:.3f}  p50 {p['p50']:.3f}  p95 {p['p95']:.3f}  max {p['max']:.3f}")
+    print(f"  {'client':>6} {'role':>9} {'kbit/s out':>10} {'kbit/s in':>9} {'full':>5} {'delta':>6} "
+          f"{'rtt ms':>7} {'starved':>7}")
+    for c in r["clients"]:
+        rtt = "-" if c["rtt_ms"] is None else f"{c['rtt_ms']:.0f}"
+        print(f"  {c['id']:>6} {c['role']:>9} {c['kbps_out']:>10} {c['kbps_in']:>9} {c['full']:>5} "
+              f"{c['deltas']:>6} {rtt:>7} {c['input_starved']:>7}")
+
+
+def print_client_report(r):
+    err = r["error_px"]
+    print(f"  {r['name']:>8} {r['role']:>9}  in {r['kbps_in']:>6} kbit/s  out {r['kbps_out']:>5} kbit/s  "
+          f"snapshots {r['snapshots']} (full {r['full']}, lost {r['lost']}, late {r['stale']}, "
+          f"undecodable {r['undecodable']})"
+          + (f"  prediction: {r['corrections']} corrections, error p50 {err['p50']} max {err['max']} px"
+             if err else ""))
+
+
+def _client(args, index=0, bot=False):
+    shim = None
+    if args.latency or args.jitter or args.loss:
+        shim = NetShim(args.latency, args.jitter, args.loss, ordered=args.tcp, seed=index)
+    transport = make_transport(args.tcp, peer=(args.host, args.port))
+    pilot = None
+    if bot:
+        from balance_sweep import Autopilot
+        pilot = Autopilot(seed=index)
+    return Client(transport, shim, pilot, render=not bot, name=f"client{index}")
+
+
+def _add_net_args(ap, server=False):
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--tcp", action="store_true", help="TCP instead of UDP")
+    ap.add_argument("--seconds", type=float, help="stop after this long")
+    if server:
+        ap.add_argument("--bind", default="127.0.0.1")
+        ap.add_argument("--mode", choices=MODES, default="classic")
+        ap.add_argument("--seed", type=int)
+        ap.add_argument("--purchase", action="append", default=[], help="owned shop item (repeatable)")
+        ap.add_argument("--snapshot-hz", type=float, default=SNAPSHOT_HZ)
+    ap.add_argument("--latency", type=float, default=0.0, help="simulated one-way delay, ms")
+    ap.add_argument("--jitter", type=float, default=0.0, help="± ms on top of --latency")
+    ap.add_argument("--loss", type=float, default=0.0, help="packet loss 0..1 (TCP: retransmit delay)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Authoritative server and clients for networked play")
+    sub = ap.add_subparsers(dest="command", required=True)
+    _add_net_args(sub.add_parser("server", help="headless game server"), server=True)
+    cp = sub.add_parser("client", help="join a server")
+    _add_net_args(cp)
+    cp.add_argument("--host", default="127.0.0.1")
+    cp.add_argument("--bot", action="store_true", help="headless, played by the autopilot")
+    lp = sub.add_parser("loopback", help="server process + autopilot clients on localhost, then a report")
+    _add_net_args(lp, server=True)
+    lp.add_argument("--clients", type=int, default=2)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "server":
+        _serve(args)
+    elif args.command == "client":
+        if args.bot:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            _headless()
+        else:
+            pygame.init()
+            mg.Assets.prepare_assets()
+        client = _client(args, bot=args.bot)
+        t0 = time.perf_counter()
+        if not client.run(args.seconds):
+            sys.exit(f"no answer from {args.host}:{args.port}")
+        print_client_report(client.report(time.perf_counter() - t0))
+    else:
+        loopback(args)
+
+
+def loopback(args):
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_NO_SIGNAL_HANDLERS"] = "1"
+    args.host = args.bind
+    if args.seconds is None:
+        args.seconds = 20.0
+    ctx = multiprocessing.get_context()
+    ready, results = ctx.Event(), ctx.Queue()
+    server = ctx.Process(target=_serve, args=(args, ready, results))
+    server.start()
+    try:
+        if not ready.wait(30):
+            sys.exit("server did not start")
+        _headless()
+        mg.PARTICLES = False
+        clients = [_client(args, i, bot=True) for i in range(args.clients)]
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=c.run, args=(args.seconds + 2,), daemon=True) for c in clients]
+        for t in threads:
+            t.start()
+            time.sleep(0.05)  # пилотом становится первый
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        report = results.get(timeout=30)
+    finally:
+        server.join(5)
+        if server.is_alive():
+            server.terminate()
+    print_server_report(report)
+    proto = "tcp" if args.tcp else "udp"
+    print(f"clients ({proto}, one-way latency {args.latency:g}±{args.jitter:g} ms, loss {args.loss:.0%}):")
+    for c in clients:
+        print_client_report(c.report(elapsed))
+
+
+if __name__ == "__main__":
+    main()
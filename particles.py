@@ -0,0 +1,160 @@
+import math
+import random
+
+import pygame
+
+from timestep import FRAME_MS
+
+try:
+    import numpy as np
+except ImportError:  # без numpy частиц нет, игра работает как раньше
+    np = None
+
+# Пресеты эмиттеров: count, скорость (px/кадр), жизнь (мс), разброс угла (рад),
+# затухание скорости за кадр, размер точки и палитра
+EMITTERS = {
+    "debris": dict(count=28, speed=(0.8, 4.5), life=(350, 900), spread=2 * math.pi, drag=0.93, size=2,
+                   colors=((255, 190, 60), (255, 120, 30), (255, 230, 150), (180, 80, 40))),
+    "sparks": dict(count=10, speed=(2.0, 6.0), life=(90, 220), spread=1.4, drag=0.85, size=1,
+                   colors=((255, 255, 255), (160, 240, 255), (255, 240, 160))),
+    "exhaust": dict(count=2, speed=(0.6, 1.6), life=(140, 320), spread=0.5, drag=0.9, size=2,
+                    colors=((90, 170, 255), (150, 210, 255), (255, 180, 90))),
+}
+
+
+class ParticleSystem:
+    """
+    Fixed-budget particles in preallocated NumPy arrays. Emitting writes into
+    a ring buffer, so once the budget is full the oldest particles are recycled
+    first. update() moves every slot in one vectorized step; draw() adds all
+    live particles into the target's pixels in one pass (additive, fading with
+    remaining life) and returns the rect it touched.
+    """
+
+    FIELDS = ("x", "y", "vx", "vy", "life", "ttl", "drag", "size", "color")
+
+    def __init__(self, capacity=20000, seed=None):
+        if np is None:
+            raise RuntimeError("ParticleSystem requires numpy (pip install numpy)")
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)  # мс до исчезновения, <= 0 — слот свободен
+        self.ttl = np.ones(capacity, dtype=np.float32)
+        self.drag = np.ones(capacity, dtype=np.float32)
+        self.size = np.ones(capacity, dtype=np.uint8)
+        self.color = np.zeros((capacity, 3), dtype=np.uint16)
+        # частицы — только картинка: свой генератор, чтобы не трогать потоки симуляции
+        self.rng = np.random.default_rng(random.getrandbits(32) if seed is None else seed)
+        self.head = 0  # следующий слот для записи (он же самый старый)
+        self.count = 0  # сколько слотов вообще было занято
+        self.emitted = 0
+        self.recycled = 0  # перезаписано ещё живых частиц
+        self.scale = 1.0  # доля от count пресетов в emit() (регулятор качества)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.life[:self.count] > 0))
+
+    def emit(self, kind, x, y, angle=0.0, count=None):
+        """Emit a preset from EMITTERS at (x, y); angle (radians) is the centre of the cone."""
+        p = EMITTERS[kind]
+        if count is None:
+            count = max(1, int(round(p["count"] * self.scale)))
+        return self.burst(x, y, count, p["speed"], p["life"],
+                          p["colors"], angle, p["spread"], p["drag"], p["size"])
+
+    def burst(self, x, y, n, speed, life, colors, angle=0.0, spread=2 * math.pi, drag=0.9, size=1):
+        if n <= 0:
+            return 0
+        n = min(n, self.capacity)
+        rng = self.rng
+        idx = (self.head + np.arange(n)) % self.capacity
+        self.recycled += int(np.count_nonzero(self.life[idx] > 0))
+        a = angle + (rng.random(n, dtype=np.float32) - 0.5) * spread
+        v = rng.uniform(speed[0], speed[1], n).astype(np.float32)
+        self.x[idx] = x
+        self.y[idx] = y
+        self.vx[idx] = np.cos(a) * v
+        self.vy[idx] = np.sin(a) * v
+        ttl = rng.uniform(life[0], life[1], n).astype(np.float32)
+        self.life[idx] = ttl
+        self.ttl[idx] = ttl
+        self.drag[idx] = drag
+        self.size[idx] = size
+        palette = np.asarray(colors, dtype=np.uint16)
+        self.color[idx] = palette[rng.integers(0, len(palette), n)]
+        self.head = int((self.head + n) % self.capacity)
+        self.count = min(self.capacity, self.count + n)
+        self.emitted += n
+        return n
+
+    def update(self, dt=FRAME_MS):
+        n = self.count
+        if not n:
+            return
+        k = dt / FRAME_MS
+        vx, vy = self.vx[:n], self.vy[:n]
+        self.x[:n] += vx * k
+        self.y[:n] += vy * k
+        damp = self.drag[:n] ** k
+        vx *= damp
+        vy *= damp
+        self.life[:n] -= dt
+
+    def clear(self):
+        self.life[:] = 0
+        self.head = self.count = 0
+
+    def draw(self, target):
+        """Add live particles into target's pixels; returns the touched rect or None."""
+        n = self.count
+        if not n:
+            return None
+        live = np.flatnonzero(self.life[:n] > 0)
+        if not live.size:
+            return None
+        w, h = target.get_size()
+        xs = self.x[live].astype(np.int32)
+        ys = self.y[live].astype(np.int32)
+        # 2x2 точки тоже должны целиком попасть в экран
+        inside = (xs >= 0) & (xs < w - 1) & (ys >= 0) & (ys < h - 1)
+        live, xs, ys = live[inside], xs[inside], ys[inside]
+        if not live.size:
+            return None
+        fade = self.life[live] / self.ttl[live]
+        add = (self.color[live] * fade[:, None]).astype(np.uint32)
+        big = self.size[live] > 1
+        if big.any():
+            # 2x2: остальные три пикселя точки идут в тот же проход
+            bx, by, badd = xs[big], ys[big], add[big]
+            xs = np.concatenate((xs, bx + 1, bx, bx + 1))
+            ys = np.concatenate((ys, by, by + 1, by + 1))
+            add = np.concatenate((add, badd, badd, badd))
+        if target.get_bitsize() == 32:
+            pixels = pygame.surfarray.pixels2d(target)
+            try:
+                self._add_packed(pixels, xs, ys, add, target.get_shifts())
+            finally:
+                del pixels  # снять блокировку поверхности до следующих blit
+        else:
+            # 24/16 бит и прочее: по прямоугольнику на пиксель, медленно, но честно
+            for x, y, c in zip(xs.tolist(), ys.tolist(), add.tolist()):
+                target.fill(c, (x, y, 1, 1), special_flags=pygame.BLEND_RGB_ADD)
+        left, top = int(xs.min()), int(ys.min())
+        return pygame.Rect(left, top, int(xs.max()) - left + 2, int(ys.max()) - top + 2)
+
+    @staticmethod
+    def _add_packed(pixels, xs, ys, add, shifts):
+        """Saturating add of (n, 3) colours into packed 32-bit pixels at (xs, ys)."""
+        cur = pixels[xs, ys].astype(np.uint32)
+        out = cur & ~np.uint32((255 << shifts[0]) | (255 << shifts[1]) | (255 << shifts[2]))  # альфа и т.п.
+        for ch in range(3):
+            sh = shifts[ch]
+            c = (cur >> sh) & 255
+            c += add[:, ch]
+            np.minimum(c, 255, out=c)
+            out |= c << sh
+        # при совпадении координат побеждает последняя частица — для искр это незаметно
+        pixels[xs, ys] = out
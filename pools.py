@@ -0,0 +1,67 @@
+import abc
+
+import pygame
+
+
+class PooledSprite(pygame.sprite.Sprite, metaclass=abc.ABCMeta):
+    """
+    Sprite that goes back to its pool when kill()ed.
+    Subclasses put all per-use setup into reset(*args); __init__ just calls it.
+    """
+    _pool = None
+
+    @abc.abstractmethod
+    def reset(self, *args, **kwargs):
+        """Put the sprite in its fresh state for this use (called by __init__ and SpritePool.acquire)."""
+
+    def kill(self):
+        was_alive = self.alive()
+        super().kill()
+        if was_alive and self._pool is not None:
+            self._pool.release(self)
+
+
+class SpritePool:
+    """
+    Free list of reusable sprites of one class.
+    acquire() reuses a released instance via reset() (a hit) or constructs a new
+    one (a miss); release() keeps at most `cap` idle instances around.
+    """
+
+    def __init__(self, cls, cap=256):
+        self.cls = cls
+        self.cap = cap
+        self._free = []
+        self.hits = 0
+        self.misses = 0
+        self.dropped = 0
+
+    def acquire(self, *args, **kwargs):
+        if self._free:
+            sprite = self._free.pop()
+            sprite.reset(*args, **kwargs)
+            self.hits += 1
+            return sprite
+        sprite = self.cls(*args, **kwargs)
+        sprite._pool = self
+        self.misses += 1
+        return sprite
+
+    def release(self, sprite):
+        if len(self._free) < self.cap:
+            self._free.append(sprite)
+        else:
+            self.dropped += 1
+
+    def clear(self):
+        self._free.clear()
+
+    def stats(self):
+        return {
+            "class": self.cls.__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "dropped": self.dropped,
+            "idle": len(self._free),
+            "cap": self.cap,
+        }
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pygame
+
+
+class AssetPreloader:
+    """
+    Decodes and scales (path, size) manifest entries on a worker thread.
+    Display-format conversion needs the main thread, so install() does that
+    step once the worker is finished. Timings are kept per phase and per file.
+    """
+
+    def __init__(self, manifest):
+        self.manifest = list(manifest)
+        self.total = len(self.manifest)
+        self.current = None
+        self.errors = []
+        self.per_file = []  # (path, decode_ms, scale_ms)
+        self.timings = {"decode_ms": 0.0, "scale_ms": 0.0, "convert_ms": 0.0, "wall_ms": 0.0}
+        self._results = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._t0 = None
+
+    def start(self):
+        self._t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="asset-preloader", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        for path, size in self.manifest:
+            self.current = path
+            t0 = time.perf_counter()
+            try:
+                img = pygame.image.load(path)
+                if img.get_bitsize() != 32:
+                    # smoothscale нужен 32-битный источник; convert_alpha без главного потока нельзя
+                    rgba = pygame.Surface(img.get_size(), pygame.SRCALPHA, 32)
+                    rgba.blit(img, (0, 0))
+                    img = rgba
+                t1 = time.perf_counter()
+                if size is not None:
+                    img = pygame.transform.smoothscale(img, size)
+                t2 = time.perf_counter()
+            except Exception as e:
+                with self._lock:
+                    self.errors.append((path, e))
+                continue
+            with self._lock:
+                self._results.append(((path, size), img))
+                self.per_file.append((path, (t1 - t0) * 1000, (t2 - t1) * 1000))
+                self.timings["decode_ms"] += (t1 - t0) * 1000
+                self.timings["scale_ms"] += (t2 - t1) * 1000
+        self.current = None
+
+    @property
+    def loaded(self):
+        with self._lock:
+            return len(self._results) + len(self.errors)
+
+    def progress(self):
+        return self.loaded / self.total if self.total else 1.0
+
+    def done(self):
+        return self._thread is not None and not self._thread.is_alive()
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+
+    def install(self, cache):
+        """Main thread: convert decoded images to display format and store them in cache."""
+        self.wait()
+        t0 = time.perf_counter()
+        for key, img in self._results:
+            cache[key] = img.convert_alpha()
+        self.timings["convert_ms"] = (time.perf_counter() - t0) * 1000
+        self.timings["wall_ms"] = (time.perf_counter() - self._t0) * 1000
+        self._results = []
+
+    def report(self, slowest=5):
+        t = self.timings
+        lines = [
+            f"assets: {self.total - len(self.errors)}/{self.total} loaded in {t['wall_ms']:.1f} ms wall "
+            f"(decode {t['decode_ms']:.1f} ms, scale {t['scale_ms']:.1f} ms, convert {t['convert_ms']:.1f} ms)"
+        ]
+        for path, dec, sc in sorted(self.per_file, key=lambda r: -(r[1] + r[2]))[:slowest]:
+            lines.append(f"  {dec + sc:7.2f} ms  {path}")
+        for path, err in self.errors:
+            lines.append(f"  failed: {path}: {err}")
+        return "\n".join(lines)
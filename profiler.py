@@ -0,0 +1,160 @@
+import json
+import os
+import time
+
+import pygame
+
+
+class FrameProfiler:
+    """
+    Opt-in per-phase frame timings in a fixed-size ring buffer.
+    begin_frame() starts a frame; each mark(name) closes the span since the
+    previous mark and files it under `name` (a phase may be marked several
+    times per frame, e.g. once per sim tick); end_frame(counts) stores the
+    frame with optional entity counts. While disabled every call returns at once.
+    """
+
+    def __init__(self, capacity=600, enabled=False):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.frames = [None] * capacity  # (start_ns, end_ns, spans, counts)
+        self.count = 0  # кадров записано всего
+        self.phases = []  # порядок первого появления, для стабильного вывода
+        self._spans = []
+        self._start = 0
+        self._last = 0
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self._start = self._last = time.perf_counter_ns()
+        self._spans = []
+
+    def mark(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self._spans.append((name, self._last, now))
+        self._last = now
+
+    def end_frame(self, counts=None):
+        if not self.enabled or not self._start:
+            return
+        for name, _, _ in self._spans:
+            if name not in self.phases:
+                self.phases.append(name)
+        self.frames[self.count % self.capacity] = (self._start, self._last, self._spans, counts or {})
+        self.count += 1
+        self._start = 0
+
+    def recent(self, n=None):
+        """Stored frames, oldest first (at most n of the newest)."""
+        stored = min(self.count, self.capacity)
+        n = stored if n is None else min(n, stored)
+        return [self.frames[i % self.capacity] for i in range(self.count - n, self.count)]
+
+    def clear(self):
+        self.frames = [None] * self.capacity
+        self.count = 0
+        self.phases = []
+
+    def summary(self, n=120):
+        """
+        Mean ms per phase and frame-time percentiles over the last n frames:
+        {"phases": {name: ms}, "frame": {"p50", "p95", "p99", "max"}, "counts": {...}, "frames": n}
+        """
+        frames = self.recent(n)
+        if not frames:
+            return {"phases": {}, "frame": {}, "counts": {}, "frames": 0}
+        totals = dict.fromkeys(self.phases, 0)
+        for _, _, spans, _ in frames:
+            for name, t0, t1 in spans:
+                totals[name] += t1 - t0
+        k = len(frames)
+        durations = sorted((end - start) / 1e6 for start, end, _, _ in frames)
+
+        def pct(p):
+            return durations[min(k - 1, int(p * k))]
+
+        return {
+            "phases": {name: ns / 1e6 / k for name, ns in totals.items()},
+            "frame": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "max": durations[-1]},
+            "counts": frames[-1][3],
+            "frames": k,
+        }
+
+    def trace_events(self):
+        """Chrome trace_event list: one complete ("X") event per span, a counter per frame."""
+        frames = self.recent()
+        if not frames:
+            return []
+        origin = frames[0][0]
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "game"}}]
+        for start, end, spans, counts in frames:
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 0,
+                           "ts": (start - origin) / 1000, "dur": (end - start) / 1000})
+            for name, t0, t1 in spans:
+                events.append({"name": name, "ph": "X", "pid": 1, "tid": 1,
+                               "ts": (t0 - origin) / 1000, "dur": (t1 - t0) / 1000})
+            if counts:
+                events.append({"name": "entities", "ph": "C", "pid": 1,
+                               "ts": (start - origin) / 1000, "args": counts})
+        return events
+
+    def export_chrome_trace(self, path):
+        """Write the buffer as Chrome/Perfetto trace JSON (chrome://tracing, ui.perfetto.dev)."""
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f)
+        return path
+
+
+class ProfilerOverlay:
+    """
+    F3 panel: per-phase ms, frame-time percentiles and entity counts.
+    Text is re-rendered a few times per second, not every frame.
+    """
+
+    def __init__(self, font, refresh_ms=250, window=120):
+        self.font = font
+        self.refresh_ms = refresh_ms
+        self.window = window
+        self.visible = False
+        self._surface = None
+        self._next = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        self._next = 0
+        return self.visible
+
+    def _build(self, profiler):
+        s = profiler.summary(self.window)
+        lines = [f"frame p50 {s['frame'].get('p50', 0):5.2f}  p95 {s['frame'].get('p95', 0):5.2f}  "
+                 f"p99 {s['frame'].get('p99', 0):5.2f}  max {s['frame'].get('max', 0):5.2f} ms"]
+        for name, ms in s["phases"].items():
+            lines.append(f"{name:<14}{ms:7.3f} ms")
+        if s["counts"]:
+            lines.append("  ".join(f"{k} {v}" for k, v in s["counts"].items()))
+        rendered = [self.font.render(line, True, (230, 230, 230)) for line in lines]
+        w = max(r.get_width() for r in rendered) + 16
+        h = sum(r.get_height() + 2 for r in rendered) + 12
+        panel = pygame.Surface((w, h), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        y = 6
+        for r in rendered:
+            panel.blit(r, (8, y))
+            y += r.get_height() + 2
+        self._surface = panel
+
+    def draw(self, target, profiler):
+        """Blit the panel in the top-right corner; returns its rect (or None when hidden)."""
+        if not self.visible:
+            return None
+        now = pygame.time.get_ticks()
+        if self._surface is None or now >= self._next:
+            self._build(profiler)
+            self._next = now + self.refresh_ms
+        return target.blit(self._surface, self._surface.get_rect(topright=(target.get_width() - 8, 60)))
@@ -0,0 +1,106 @@
+from collections import deque
+
+# Уровни качества от лучшего к худшему. Каждый следующий дешевле прошлого:
+#   star_layers     — сколько ближних слоёв Starfield рисовать (0 — чёрный фон)
+#   explosion_step  — через сколько кадров анимации взрыва шагать (короче взрыв)
+#   charged_tint    — отдельный тонированный поворот для заряженных пуль
+#   rotation_step   — шаг квантования углов, °; кратен базовому, так что кэш поворотов не пересобирается
+#   particle_scale  — доля частиц от пресета эмиттера
+LEVELS = (
+    dict(name="high", star_layers=3, explosion_step=1, charged_tint=True, rotation_step=2, particle_scale=1.0),
+    dict(name="medium", star_layers=2, explosion_step=1, charged_tint=True, rotation_step=4, particle_scale=0.6),
+    dict(name="low", star_layers=1, explosion_step=2, charged_tint=False, rotation_step=6, particle_scale=0.35),
+    dict(name="minimal", star_layers=0, explosion_step=3, charged_tint=False, rotation_step=10, particle_scale=0.15),
+)
+
+
+class QualityGovernor:
+    """
+    Picks a quality level from measured frame work time. sample(work_ms) adds
+    one frame to a rolling window; once the window is full its 90th percentile
+    is compared with the budget. Above down_ratio * budget the level drops at
+    once; the level rises only after up_hold frames in a row below
+    up_ratio * budget. The gap between the two thresholds plus the hold is the
+    hysteresis: a step up that has to be undone soon after doubles that level's
+    hold, so a borderline scene settles instead of flapping. apply(settings)
+    is called on every change (and once from the constructor).
+    """
+
+    def __init__(self, budget_ms, apply=None, levels=LEVELS, window=60, down_ratio=1.0, up_ratio=0.6,
+                 up_hold=180, max_hold=3600):
+        self.levels = levels
+        self.budget_ms = budget_ms
+        self.apply = apply
+        self.window = deque(maxlen=window)
+        self.down_ratio = down_ratio
+        self.up_ratio = up_ratio
+        self.up_hold = up_hold
+        self.max_hold = max_hold
+        self._holds = [up_hold] * len(levels)
+        self._calm = 0  # кадров подряд с запасом
+        self._raised_at = None  # номер кадра последнего шага вверх
+        self.frames = 0
+        self.level = 0
+        self.p90 = 0.0
+        self.changes = []  # (кадр, старый уровень, новый, p90 в момент решения)
+        self.frames_at = [0] * len(levels)
+        if apply is not None:
+            apply(levels[0])
+
+    @property
+    def name(self):
+        return self.levels[self.level]["name"]
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    def sample(self, work_ms):
+        """Feed one frame's work time (ms); returns the new level if it changed, else None."""
+        self.frames += 1
+        self.frames_at[self.level] += 1
+        window = self.window
+        window.append(work_ms)
+        if len(window) < window.maxlen:
+            return None
+        ordered = sorted(window)
+        self.p90 = p90 = ordered[int(len(ordered) * 0.9) - 1]
+        if p90 > self.budget_ms * self.down_ratio:
+            self._calm = 0
+            if self.level + 1 < len(self.levels):
+                # откат сразу после шага вверх — этот уровень пока не по силам, ждём дольше
+                if self._raised_at is not None and self.frames - self._raised_at <= 2 * window.maxlen:
+                    self._holds[self.level] = min(self.max_hold, self._holds[self.level] * 2)
+                return self.set_level(self.level + 1)
+            return None
+        if p90 < self.budget_ms * self.up_ratio and self.level > 0:
+            self._calm += 1
+            if self._calm >= self._holds[self.level - 1]:
+                self._raised_at = self.frames
+                return self.set_level(self.level - 1)
+        else:
+            self._calm = 0
+        return None
+
+    def set_level(self, level):
+        level = max(0, min(len(self.levels) - 1, level))
+        if level == self.level:
+            return None
+        self.changes.append((self.frames, self.level, level, round(self.p90, 2)))
+        self.level = level
+        # новый уровень меряем с чистого окна: старые кадры его не описывают
+        self.window.clear()
+        self._calm = 0
+        if self.apply is not None:
+            self.apply(self.levels[level])
+        return level
+
+    def stats(self):
+        return {
+            "level": self.level,
+            "name": self.name,
+            "p90_ms": round(self.p90, 2),
+            "budget_ms": round(self.budget_ms, 2),
+            "changes": len(self.changes),
+            "frames_at": dict(zip((lv["name"] for lv in self.levels), self.frames_at)),
+        }
@@ -0,0 +1,182 @@
+import json
+import os
+import struct
+import time
+import zlib
+
+import pygame
+
+# Формат файла: MAGIC, длина заголовка (uint32), JSON-заголовок, затем zlib-поток
+# RLE-записей RUN: (повторов, биты кнопок, mouse x, mouse y) — по записи на смену ввода.
+MAGIC = b"SGRPL1\n"
+RUN = struct.Struct("<HBhh")
+MAX_RUN = 0xFFFF
+
+BIT_UP, BIT_DOWN, BIT_LEFT, BIT_RIGHT, BIT_FIRE, BIT_FOCUSED = 1, 2, 4, 8, 16, 32
+
+
+def pack_input(inputs):
+    """InputState -> (bits, mx, my)"""
+    bits = ((BIT_UP if inputs.up else 0) | (BIT_DOWN if inputs.down else 0)
+            | (BIT_LEFT if inputs.left else 0) | (BIT_RIGHT if inputs.right else 0)
+            | (BIT_FIRE if inputs.fire else 0) | (BIT_FOCUSED if inputs.focused else 0))
+    mx, my = inputs.mouse_pos
+    return bits, int(mx), int(my)
+
+
+class InputRecorder:
+    """
+    Collects one input sample per sim tick, run-length encoded in memory.
+    save() writes the header (seed, mode, purchases, tick rate, result) and the runs.
+    """
+
+    def __init__(self, seed, mode="classic", purchases=None, sim_hz=120):
+        self.header = {"version": 1, "seed": seed, "mode": mode,
+                       "purchases": purchases or {}, "sim_hz": sim_hz}
+        self.ticks = 0
+        self._runs = bytearray()
+        self._last = None
+        self._count = 0
+
+    def record(self, inputs):
+        sample = pack_input(inputs)
+        if sample == self._last and self._count < MAX_RUN:
+            self._count += 1
+        else:
+            self._flush()
+            self._last = sample
+            self._count = 1
+        self.ticks += 1
+
+    def _flush(self):
+        if self._count:
+            self._runs += RUN.pack(self._count, *self._last)
+
+    def save(self, path, result=None):
+        self._flush()
+        self._count = 0
+        self._last = None
+        header = dict(self.header, ticks=self.ticks, result=result or {})
+        head = json.dumps(header).encode("utf-8")
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(head)))
+            f.write(head)
+            f.write(zlib.compress(bytes(self._runs), 6))
+        os.replace(tmp, path)
+
+
+class InputLog:
+    """A loaded recording: header dict plus (count, bits, mx, my) runs."""
+
+    def __init__(self, header, runs):
+        self.header = header
+        self.runs = runs
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{path}: not an input recording")
+        pos = len(MAGIC)
+        (head_len,) = struct.unpack_from("<I", data, pos)
+        pos += 4
+        header = json.loads(data[pos:pos + head_len].decode("utf-8"))
+        body = zlib.decompress(data[pos + head_len:])
+        runs = [RUN.unpack_from(body, off) for off in range(0, len(body), RUN.size)]
+        return InputLog(header, runs)
+
+    @property
+    def ticks(self):
+        return self.header.get("ticks", sum(r[0] for r in self.runs))
+
+    def inputs(self, make):
+        """Yield one input per tick; make(bits, mx, my) builds it once per run."""
+        for count, bits, mx, my in self.runs:
+            sample = make(bits, mx, my)
+            for _ in range(count):
+                yield sample
+
+
+def play(path, render=False, realtime=False):
+    """
+    Replay a recording. Headless and as fast as possible by default (render=True
+    also draws each tick off-screen); realtime=True paces it with the normal
+    fixed-step loop in a window. Returns (state, stats).
+    """
+    import main_game as mg
+    from timestep import FixedStep
+
+    log = InputLog.load(path)
+    h = log.header
+    if realtime:
+        if not pygame.display.get_init():
+            pygame.init()
+        win = pygame.display.get_surface() or pygame.display.set_mode((mg.WIDTH, mg.HEIGHT))
+    else:
+        win = mg.init_headless()
+    mg.Assets.prepare_assets()
+    mg.preload_assets(win, show=False)
+
+    def make(bits, mx, my):
+        return mg.InputState(up=bool(bits & BIT_UP), down=bool(bits & BIT_DOWN),
+                             left=bool(bits & BIT_LEFT), right=bool(bits & BIT_RIGHT),
+                             mouse_pos=(mx, my), fire=bool(bits & BIT_FIRE),
+                             focused=bool(bits & BIT_FOCUSED))
+
+    state = mg.GameState(purchases=h.get("purchases"), mode=h.get("mode", "classic"), seed=h["seed"])
+    dt = 1000 / h.get("sim_hz", mg.SIM_HZ)
+    renderer = mg.GameRenderer(win) if (render or realtime) else None
+    source = log.inputs(make)
+    t0 = time.perf_counter()
+    if realtime:
+        clock = pygame.time.Clock()
+        stepper = FixedStep(h.get("sim_hz", mg.SIM_HZ), mg.MAX_FRAME_MS)
+        done = False
+        while not done:
+            frame_ms = clock.tick(mg.FPS)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    done = True
+            for _ in range(stepper.advance(frame_ms)):
+                inputs = next(source, None)
+                if inputs is None or state.game_over:
+                    done = True
+                    break
+                state.step(inputs, dt)
+            renderer.draw(state, frame_ms, stepper.alpha)
+            renderer.present()
+    else:
+        for inputs in source:
+            state.step(inputs, dt)
+            if renderer:
+                renderer.draw(state, dt)
+            if state.game_over:
+                break
+    wall = time.perf_counter() - t0
+    expected = h.get("result") or {}
+    stats = {
+        "ticks": state.ticks,
+        "sim_s": state.now / 1000,
+        "wall_s": wall,
+        "speedup": state.now / 1000 / max(wall, 1e-9),
+        "score": state.score,
+        "matches": all(getattr(state, k, None) == v for k, v in expected.items()),
+    }
+    return state, stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a recorded session")
+    parser.add_argument("path")
+    parser.add_argument("--render", action="store_true", help="draw every tick off-screen")
+    parser.add_argument("--realtime", action="store_true", help="play back in a window at normal speed")
+    args = parser.parse_args()
+    _, st = play(args.path, render=args.render, realtime=args.realtime)
+    print(f"ticks={st['ticks']} sim={st['sim_s']:.1f}s wall={st['wall_s']:.3f}s "
+          f"speedup={st['speedup']:.0f}x score={st['score']} "
+          f"{'matches recording' if st['matches'] else 'DIVERGED from recording'}")
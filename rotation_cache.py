@@ -0,0 +1,115 @@
+import math
+from collections import OrderedDict
+
+import pygame
+
+
+class RotationCache:
+    """
+    Shared cache of rotated sprite frames with angles snapped to a fixed step.
+    Key: (source frame, tint, snapped angle in degrees). The source is the
+    un-rotated frame Surface itself — one per laser frame / player damage
+    state — so callers just pass what they would have handed to
+    pygame.transform.rotate. Since the key is the angle and not a bucket
+    index, after set_step() to a multiple of the old step every coarse angle
+    is already in the cache.
+    Entries are built lazily on first use, or up front with prebuild(). With
+    max_bytes the least recently used frames are evicted past that size.
+    Hitboxes come from rect(): the rotated size at the constructor's base
+    step, so collisions don't change when set_step() coarsens the picture.
+    """
+
+    def __init__(self, step=2, max_bytes=None):
+        self.step = step
+        self.base_step = step
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()  # от давно не использованных к свежим
+        self._tinted = {}
+        self.bytes = 0  # пиксели повёрнутых кадров в _cache
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def set_step(self, step):
+        self.step = step
+
+    def clear(self):
+        self._cache.clear()
+        self._tinted.clear()
+        self.bytes = 0
+
+    @staticmethod
+    def _surface_bytes(surf):
+        w, h = surf.get_size()
+        return w * h * surf.get_bytesize()
+
+    def _snap(self, angle):
+        return int(round(angle / self.step)) * self.step % 360
+
+    def rotated_size(self, source, angle):
+        """Size pygame.transform.rotate gives source at angle snapped to the base step."""
+        w, h = source.get_size()
+        snapped = int(round(angle / self.base_step)) * self.base_step % 360
+        if snapped % 90 == 0:
+            return (w, h) if snapped % 180 == 0 else (h, w)
+        # та же формула, что в transform.rotate
+        rad = math.radians(snapped)
+        c, s = abs(math.cos(rad)), abs(math.sin(rad))
+        return int(c * w + s * h), int(s * w + c * h)
+
+    def rect(self, source, angle, center):
+        """Hitbox of source rotated by angle, centred on center; independent of the current step."""
+        rect = pygame.Rect((0, 0), self.rotated_size(source, angle))
+        rect.center = center
+        return rect
+
+    def _tint_source(self, source, tint):
+        key = (source, tint)
+        tinted = self._tinted.get(key)
+        if tinted is None:
+            tinted = source.copy()
+            overlay = pygame.Surface(tinted.get_size(), pygame.SRCALPHA)
+            overlay.fill(tint)
+            tinted.blit(overlay, (0, 0), special_flags=pygame.BLEND_PREMULTIPLIED)
+            self._tinted[key] = tinted
+        return tinted
+
+    def get(self, source, angle, tint=None):
+        """Rotated (and optionally tinted) copy of source; angle in pygame degrees."""
+        snapped = self._snap(angle)
+        key = (source, tint, snapped)
+        cache = self._cache
+        img = cache.get(key)
+        if img is not None:
+            self.hits += 1
+            cache.move_to_end(key)
+            return img
+        self.misses += 1
+        base = self._tint_source(source, tint) if tint else source
+        img = pygame.transform.rotate(base, snapped)
+        cache[key] = img
+        self.bytes += self._surface_bytes(img)
+        if self.max_bytes is not None:
+            while self.bytes > self.max_bytes and len(cache) > 1:
+                _, old = cache.popitem(last=False)
+                self.bytes -= self._surface_bytes(old)
+                self.evictions += 1
+        return img
+
+    def prebuild(self, source, tint=None):
+        """Build every snapped angle for one frame (e.g. at load time); max_bytes still applies."""
+        for bucket in range(int(round(360 / self.step))):
+            self.get(source, bucket * self.step, tint)
+
+    def memory_bytes(self):
+        return self.bytes + sum(self._surface_bytes(s) for s in self._tinted.values())
+
+    def stats(self):
+        return {
+            "step": self.step,
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes": self.memory_bytes(),
+        }
@@ -0,0 +1,126 @@
+import abc
+import time
+
+import pygame
+
+import display
+import main_game
+import main_menu
+import shop
+import storage
+
+
+class Services:
+    """
+    Long-lived state shared by every scene: one window (display.Display), fonts keyed by
+    (class, size, bold), the progress store and a free-form cache (starfield,
+    shop catalog, ...). Cached objects with a close() are closed on shutdown.
+    """
+
+    def __init__(self, fullscreen=False):
+        self.display = display.get_display()
+        self.size = self.display.size
+        self.win = None
+        self.storage = storage.get_storage()
+        self.cache = {}
+        self._fonts = {}
+        self.set_mode(fullscreen)
+
+    def set_mode(self, fullscreen):
+        """Logical surface to draw to; the window is recreated only if the mode changed."""
+        self.win = self.display.set_mode(fullscreen)
+        return self.win
+
+    @property
+    def fullscreen(self):
+        return self.display.fullscreen
+
+    def font(self, factory, size, bold=False):
+        key = (factory, size, bold)
+        font = self._fonts.get(key)
+        if font is None:
+            font = self._fonts[key] = factory(size, bold=bold)
+        return font
+
+    def close(self):
+        for item in self.cache.values():
+            close = getattr(item, "close", None)
+            if close is not None:
+                close()
+        self.cache.clear()
+        self.storage.flush()
+
+
+class Scene(abc.ABC):
+    """
+    One screen. enter() gets the shared services and the parameters the previous
+    scene passed on; run() blocks until the screen is done and returns
+    (next_scene, params) or None to quit; exit() always runs after run().
+    """
+
+    def enter(self, services, **params):
+        self.services = services
+        self.params = params
+
+    @abc.abstractmethod
+    def run(self):
+        """Run the screen until it is done; returns (next_scene, params) or None to quit."""
+
+    def exit(self):
+        pass
+
+
+class MenuScene(Scene):
+    def run(self):
+        choice = main_menu.show_menu(self.services)
+        if choice in ("start", "horde"):
+            return "game", {"mode": "horde" if choice == "horde" else "classic"}
+        if choice == "shop":
+            return "shop", {}
+        return None
+
+
+class ShopScene(Scene):
+    def run(self):
+        shop.show_shop(services=self.services)
+        return "menu", {}
+
+
+class GameScene(Scene):
+    def enter(self, services, **params):
+        super().enter(services, **params)
+        pygame.display.set_caption("Top-Down Shooter")
+        pygame.event.clear()  # клик по кнопке меню не должен стать выстрелом
+
+    def run(self):
+        result = main_game.main(purchases=self.services.storage.purchases(),
+                                mode=self.params.get("mode", "classic"), services=self.services)
+        return None if result == "quit" else ("menu", {})
+
+
+class SceneManager:
+    """Runs scenes one after another on a single Services instance."""
+
+    def __init__(self, services, scenes=None):
+        self.services = services
+        self.scenes = scenes or {"menu": MenuScene(), "shop": ShopScene(), "game": GameScene()}
+        self.switch_ms = []  # (from, to, ms): время на exit() + enter()
+
+    def run(self, name="menu", **params):
+        prev = prev_name = None
+        try:
+            while name is not None:
+                scene = self.scenes[name]
+                t0 = time.perf_counter()
+                if prev is not None:
+                    prev.exit()
+                    prev = None
+                scene.enter(self.services, **params)
+                self.switch_ms.append((prev_name, name, (time.perf_counter() - t0) * 1000))
+                prev, prev_name = scene, name
+                nxt = scene.run()
+                name, params = nxt if nxt else (None, {})
+        finally:
+            if prev is not None:
+                prev.exit()
+            self.services.close()
@@ -1,6 +1,9 @@
 import pygame
 import os
-import json
+import display
+from shop_catalog import IconCatalog
+import storage
+import ui
 
 class FontCompat:
     def __init__(self, size, bold=False):
@@ -44,57 +47,37 @@ class FontCompat:
         surface, _ = self._font.render(text, color)
         return surface
 
-PURCHASES_FILE = "purchases.json"
-MAX_DIFFICULTY_FILE = "max_difficulty.txt"
+    def size(self, text):
+        if self._mode == "font":
+            return self._font.size(text)
+        return self._font.get_rect(text).size
 
 def _load_purchases():
-    try:
-        with open(PURCHASES_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+    return storage.get_storage().purchases()
 
-def _save_purchases(data):
-    try:
-        with open(PURCHASES_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f)
-    except Exception:
-        pass
+def _save_purchase(item_id):
+    storage.get_storage().set_purchase(item_id, True)
 
 def _load_max_difficulty():
-    try:
-        with open(MAX_DIFFICULTY_FILE, "r", encoding="utf-8") as f:
-            return int(f.read().strip() or 1)
-    except Exception:
-        return 1
+    return storage.get_storage().get("max_difficulty", 1)
 
 def _wrap_text(text, font_obj, max_width):
     """
-    Naive word-wrap using rendered width measurement.
-    font_obj is FontCompat; we measure by rendering and reading surface width.
+    Naive word-wrap; font_obj is FontCompat, widths come from font_obj.size()
+    so nothing is rendered just to be measured.
     """
-    if not text:
-        return [""]
-    words = text.split()
-    lines = []
-    cur = ""
-    for w in words:
-        test = w if not cur else cur + " " + w
-        surf = font_obj.render(test, True, (255, 255, 255))
-        if surf.get_width() <= max_width:
-            cur = test
-        else:
-            if cur:
-                lines.append(cur)
-            cur = w
-    if cur:
-        lines.append(cur)
-    return lines
+    return ui.wrap_text(text, font_obj, max_width)
 
-def show_shop(fullscreen=False):
+def show_shop(fullscreen=False, services=None):
+    """
+    Returns 'back'. With services (scenes.Services) the window, fonts and the icon
+    catalog (with its loaded thumbnails) are shared and survive between visits.
+    """
     WIDTH, HEIGHT = 800, 600
-    flags = pygame.FULLSCREEN if fullscreen else 0
-    win = pygame.display.set_mode((WIDTH, HEIGHT), flags)
+    if services is not None:
+        win = services.win
+    else:
+        win = display.set_mode(fullscreen)
     pygame.display.set_caption("Shop")
 
     GRAY = (40, 40, 40)
@@ -105,51 +88,28 @@ def show_shop(fullscreen=False):
     HOVER = (120, 120, 255)
     GREEN = (0, 200, 120)
 
-    title_font = FontCompat(42, bold=True)
-    font = FontCompat(28)
-    small = FontCompat(22)
-    clock = pygame.time.Clock()
+    make_font = services.font if services is not None else (lambda cls, size, bold=False: cls(size, bold))
+    title_font = make_font(FontCompat, 42, bold=True)
+    font = make_font(FontCompat, 28)
+    small = make_font(FontCompat, 22)
 
     max_difficulty = _load_max_difficulty()
 
-    # Load icons from assets/shop_icons
-    icons = []
+    # Каталог иконок: классификация берётся из кэша на диске, миниатюры грузятся в фоне
     icons_dir = os.path.join("assets", "shop_icons")
-    if os.path.isdir(icons_dir):
-        for fname in sorted(os.listdir(icons_dir)):
-            if fname.lower().endswith(".png"):
-                try:
-                    img = pygame.image.load(os.path.join(icons_dir, fname)).convert_alpha()
-                    img = pygame.transform.smoothscale(img, (64, 64))
+    if services is not None:
+        catalog = services.cache.get("shop_catalog")
+        if catalog is None:
+            catalog = services.cache["shop_catalog"] = IconCatalog(icons_dir)
+    else:
+        catalog = IconCatalog(icons_dir)
+    icons = catalog.items
 
-                    # Heuristic filter: skip "planet-like" round icons
-                    # 1) find opaque bounding box
-                    w, h = img.get_width(), img.get_height()
-                    minx, miny, maxx, maxy = w, h, 0, 0
-                    opaque = 0
-                    px = pygame.PixelArray(img)
-                    # sample every 2 px for speed
-                    for y in range(0, h, 2):
-                        for x in range(0, w, 2):
-                            a = (img.unmap_rgb(px[x, y]).a if hasattr(img, "unmap_rgb") else img.get_at((x, y)).a)
-                            if a > 10:
-                                opaque += 1
-                                if x < minx: minx = x
-                                if y < miny: miny = y
-                                if x > maxx: maxx = x
-                                if y > maxy: maxy = y
-                    del px
-                    if maxx > minx and maxy > miny:
-                        bw, bh = (maxx - minx + 1), (maxy - miny + 1)
-                        aspect = bw / bh if bh else 1.0
-                        fill_ratio = opaque / ((w//2) * (h//2) + 1e-6)
-                        # circle-like if nearly square bbox and medium-high fill density
-                        if 0.9 <= aspect <= 1.1 and 0.60 <= fill_ratio <= 0.90:
-                            continue
-
-                    icons.append((fname, img))
-                except Exception:
-                    continue
+    def leave():
+        # общий каталог живёт до закрытия Services, свой — закрываем сразу
+        if services is None:
+            catalog.close()
+        return "back"
 
     # Ability mapping (initial: 1.png → quantum_capacitor, price 0)
     ABILITIES = {
@@ -185,206 +145,140 @@ def show_shop(fullscreen=False):
         }
     }
     purchases = _load_purchases()
-    selected = None
 
     # Pagination (arrow navigation)
     cols = 4
     rows_per_page = 2
     per_page = cols * rows_per_page  # 8
-    page = 0
-    pages = (len(icons) + per_page - 1) // per_page if icons else 1
     start_y = 150
     gap_x = 190
     gap_y = 160
-    total_width = gap_x * (cols - 1)
-    start_x = (WIDTH // 2) - (total_width // 2)
+    state = {"page": 0, "pages": 1}
+    cache = services.cache if services is not None else {}
+    previews = cache.setdefault("shop_previews", {})  # fname -> иконка 96x96 для модального окна
+    wrapped = cache.setdefault("shop_wrapped", {})    # fname -> строки описания
 
-    while True:
-        win.fill(GRAY)
-        mx, my = pygame.mouse.get_pos()
+    root = ui.UIRoot(win, GRAY)
 
-        title = title_font.render("SHOP", True, GOLD)
-        win.blit(title, title.get_rect(center=(WIDTH // 2, 80)))
-
-        progress_text = font.render(f"Макс. сложность: {max_difficulty}", True, WHITE)
-        win.blit(progress_text, (20, 20))
+    def cell(fname):
+        entry = {"key": fname, "image": catalog.thumb(fname)}
+        # Render price/owned for abilities
+        if fname in ABILITIES:
+            meta = ABILITIES[fname]
+            is_owned = purchases.get(meta["id"], False)
+            unlockable = max_difficulty >= meta.get("required_level", 0)
+            if is_owned:
+                entry.update(label="OWNED", label_color=GREEN, owned=True)
+            else:
+                entry.update(label=f"Требует ур. {meta.get('required_level', 0)}",
+                             label_color=GREEN if unlockable else WHITE)
+        return entry
 
-        # Draw icon grid for current page
-        if not icons:
-            empty = small.render("No items available", True, (190, 190, 190))
-            win.blit(empty, empty.get_rect(center=(WIDTH // 2, HEIGHT // 2)))
-        else:
-            start_index = page * per_page
-            end_index = min(len(icons), start_index + per_page)
-            for i in range(start_index, end_index):
-                col = (i - start_index) % cols
-                row = (i - start_index) // cols
-                x = start_x + col * gap_x
-                y = start_y + row * gap_y
-                rect = pygame.Rect(0, 0, 96, 96)
-                rect.center = (x, y)
-                hovered = rect.collidepoint(mx, my)
-                border_color = HOVER if hovered else (90, 90, 90)
-                pygame.draw.rect(win, border_color, rect, 2)
-                fname, icon_img = icons[i]
-                win.blit(icon_img, icon_img.get_rect(center=rect.center))
-                # Render price/owned for abilities
-                if fname in ABILITIES:
-                    meta = ABILITIES[fname]
-                    is_owned = purchases.get(meta["id"], False)
-                    unlockable = max_difficulty >= meta.get("required_level", 0)
-                    if is_owned:
-                        label = "OWNED"
-                        color = GREEN
-                    else:
-                        label = f"Требует ур. {meta.get('required_level', 0)}"
-                        color = GREEN if unlockable else WHITE
-                    lbl = small.render(label, True, color)
-                    win.blit(lbl, lbl.get_rect(center=(rect.centerx, rect.bottom + 18)))
-                    # owned highlight
-                    if is_owned:
-                        pygame.draw.rect(win, GREEN, rect.inflate(6, 6), 2, border_radius=6)
+    def refresh():
+        pages = (len(icons) + per_page - 1) // per_page if icons else 1
+        page = min(state["page"], max(0, pages - 1))
+        state["page"], state["pages"] = page, pages
+        names = icons[page * per_page:(page + 1) * per_page]
+        catalog.request(names)
+        grid.set_cells([cell(n) for n in names])
+        page_label.set_text(f"{page + 1}/{max(1, pages)}")
+        for w in (grid, left, right, page_label):
+            w.set_visible(bool(icons))
+        empty.set_visible(not icons)
+        if not root.modal:
+            root.update_hover(display.mouse_pos())
 
-            # Page controls
-            left_rect = pygame.Rect(0, 0, 48, 48)
-            right_rect = pygame.Rect(0, 0, 48, 48)
-            left_rect.center = (WIDTH // 2 - 120, HEIGHT - 70)
-            right_rect.center = (WIDTH // 2 + 120, HEIGHT - 70)
-            pg_text = small.render(f"{page + 1}/{max(1, pages)}", True, WHITE)
-            win.blit(pg_text, pg_text.get_rect(center=(WIDTH // 2, HEIGHT - 70)))
-            # draw arrows with hover highlight
-            left_hover = left_rect.collidepoint(mx, my)
-            right_hover = right_rect.collidepoint(mx, my)
-            left_color = HOVER if left_hover else (200, 200, 200)
-            right_color = HOVER if right_hover else (200, 200, 200)
-            pygame.draw.polygon(win, left_color, [(left_rect.centerx + 12, left_rect.centery - 14),
-                                                  (left_rect.centerx - 12, left_rect.centery),
-                                                  (left_rect.centerx + 12, left_rect.centery + 14)], 0)
-            pygame.draw.polygon(win, right_color, [(right_rect.centerx - 12, right_rect.centery - 14),
-                                                   (right_rect.centerx + 12, right_rect.centery),
-                                                   (right_rect.centerx - 12, right_rect.centery + 14)], 0)
+    def turn(delta):
+        if icons and state["pages"] > 1:
+            state["page"] = (state["page"] + delta) % state["pages"]
+            refresh()
 
-        # Modal overlay for selected ability
-        if selected:
-            overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 160))
-            win.blit(overlay, (0, 0))
-            panel = pygame.Rect(0, 0, 520, 320)
-            panel.center = (WIDTH // 2, HEIGHT // 2)
-            pygame.draw.rect(win, (30, 30, 30), panel, border_radius=10)
-            pygame.draw.rect(win, (220, 220, 220), panel, 2, border_radius=10)
-            title = font.render(selected["name"], True, GOLD)
-            win.blit(title, title.get_rect(midtop=(panel.centerx, panel.top + 16)))
-            # icon preview
+    def preview(fname):
+        if fname not in previews:
             try:
-                icon_fname = selected.get("_filename", "quantum_capacitor.png")  # используем сохранённое имя файла
-                icon_img = pygame.image.load(os.path.join(icons_dir, icon_fname)).convert_alpha()
-                icon_img = pygame.transform.smoothscale(icon_img, (96, 96))
-                win.blit(icon_img, icon_img.get_rect(topleft=(panel.left + 24, panel.top + 60)))
+                icon_img = pygame.image.load(os.path.join(icons_dir, fname)).convert_alpha()
+                previews[fname] = pygame.transform.smoothscale(icon_img, (96, 96))
             except Exception:
-                pass
-            # description (wrapped)
-            desc = selected.get("desc", "")
-            text_x = panel.left + 140
-            # разместим описание чуть ниже строки с ценой/OWNED,
-            # чтобы текст не перекрывался
-            text_y = panel.top + 96
-            maxw = panel.width - (text_x - panel.left) - 24
-            for line in _wrap_text(desc, small, maxw):
-                txt = small.render(line, True, WHITE)
-                win.blit(txt, (text_x, text_y))
-                text_y += txt.get_height() + 4
-            # price / owned
-            is_owned = purchases.get(selected["id"], False)
-            required_level = selected.get("required_level", 0)
-            unlockable = max_difficulty >= required_level
-            if is_owned:
-                status_text = "OWNED"
-                status_color = GREEN
-            elif unlockable:
-                status_text = f"Доступно: ур. >= {required_level}"
-                status_color = GREEN
-            else:
-                status_text = f"Требуется сложность {required_level} (у вас {max_difficulty})"
-                status_color = WHITE
-            win.blit(small.render(status_text, True, status_color), (panel.left + 140, panel.top + 60))
-            # buy button
-            buy_rect = pygame.Rect(0, 0, 160, 44)
-            buy_rect.midbottom = (panel.centerx, panel.bottom - 24)
-            buy_hover = buy_rect.collidepoint(mx, my)
-            buy_color = (0, 180, 0) if buy_hover else (0, 140, 0)
-            pygame.draw.rect(win, buy_color, buy_rect, border_radius=8)
-            pygame.draw.rect(win, (220, 220, 220), buy_rect, 2, border_radius=8)
-            if is_owned:
-                btn_label = "Close"
-            elif unlockable:
-                btn_label = "Unlock"
-            else:
-                btn_label = "Locked"
-            lbl = font.render(btn_label, True, WHITE)
-            win.blit(lbl, lbl.get_rect(center=buy_rect.center))
-
-        # Back button
-        back = font.render("BACK", True, WHITE)
-        back_rect = back.get_rect(topleft=(20, HEIGHT - 70))
-        back_hover = back_rect.collidepoint(mx, my)
-        # draw back with hover color similar to menu buttons
-        back_color = LIGHT_RED if back_hover else RED
-        back = font.render("BACK", True, back_color)
-        win.blit(back, back_rect)
-
-        pygame.display.flip()
+                previews[fname] = None
+        return previews[fname]
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                return "back"
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                if back_rect.collidepoint(mx, my):
-                    return "back"
-                # modal buy/close click
-                if selected:
-                    # compute buy rect again
-                    buy_rect = pygame.Rect(0, 0, 160, 44)
-                    buy_rect.midbottom = (WIDTH // 2, HEIGHT // 2 + 320//2 - 24)
-                    if buy_rect.collidepoint(mx, my):
-                        if purchases.get(selected["id"], False):
-                            selected = None
-                        else:
-                            required_level = selected.get("required_level", 0)
-                            if max_difficulty >= required_level:
-                                purchases[selected["id"]] = True
-                                _save_purchases(purchases)
-                            selected = None
-                # opening modal by clicking on ability icon
-                elif icons:
-                    start_index = page * per_page
-                    end_index = min(len(icons), start_index + per_page)
-                    for i in range(start_index, end_index):
-                        col = (i - start_index) % cols
-                        row = (i - start_index) // cols
-                        x = start_x + col * gap_x
-                        y = start_y + row * gap_y
-                        rect = pygame.Rect(0, 0, 96, 96)
-                        rect.center = (x, y)
-                        if rect.collidepoint(mx, my):
-                            fname, _img = icons[i]
-                            if fname in ABILITIES:
-                                selected = ABILITIES[fname].copy()
-                                selected["_filename"] = fname  # сохраняем имя файла для иконки
-                # arrows
-                left_rect = pygame.Rect(0, 0, 40, 40); left_rect.center = (WIDTH // 2 - 120, HEIGHT - 70)
-                right_rect = pygame.Rect(0, 0, 40, 40); right_rect.center = (WIDTH // 2 + 120, HEIGHT - 70)
-                if icons and left_rect.collidepoint(mx, my) and pages > 1:
-                    page = (page - 1) % pages
-                elif icons and right_rect.collidepoint(mx, my) and pages > 1:
-                    page = (page + 1) % pages
-            # Keyboard arrows
-            if event.type == pygame.KEYDOWN and icons and pages > 1:
-                if event.key == pygame.K_LEFT:
-                    page = (page - 1) % pages
-                elif event.key == pygame.K_RIGHT:
-                    page = (page + 1) % pages
+    def buy(meta):
+        if not purchases.get(meta["id"], False) and max_difficulty >= meta.get("required_level", 0):
+            purchases[meta["id"]] = True
+            _save_purchase(meta["id"])
+        root.close_modal()
+        refresh()
 
-        clock.tick(60)
+    def open_details(fname):
+        # opening modal by clicking on ability icon
+        if fname not in ABILITIES:
+            return None
+        meta = ABILITIES[fname]
+        panel = pygame.Rect(0, 0, 520, 320)
+        panel.center = (WIDTH // 2, HEIGHT // 2)
+        widgets = [ui.Panel(panel),
+                   ui.Label(meta["name"], font, GOLD, midtop=(panel.centerx, panel.top + 16))]
+        icon_img = preview(fname)
+        if icon_img is not None:
+            widgets.append(ui.Image(icon_img, topleft=(panel.left + 24, panel.top + 60)))
+        # price / owned
+        is_owned = purchases.get(meta["id"], False)
+        required_level = meta.get("required_level", 0)
+        unlockable = max_difficulty >= required_level
+        if is_owned:
+            status_text, status_color, btn_label = "OWNED", GREEN, "Close"
+        elif unlockable:
+            status_text, status_color, btn_label = f"Доступно: ур. >= {required_level}", GREEN, "Unlock"
+        else:
+            status_text = f"Требуется сложность {required_level} (у вас {max_difficulty})"
+            status_color, btn_label = WHITE, "Locked"
+        widgets.append(ui.Label(status_text, small, status_color, topleft=(panel.left + 140, panel.top + 60)))
+        # description (wrapped) — ниже строки статуса, чтобы текст не перекрывался
+        text_x = panel.left + 140
+        text_y = panel.top + 96
+        if fname not in wrapped:
+            wrapped[fname] = _wrap_text(meta.get("desc", ""), small, panel.width - (text_x - panel.left) - 24)
+        for line in wrapped[fname]:
+            lbl = ui.Label(line, small, WHITE, topleft=(text_x, text_y))
+            widgets.append(lbl)
+            text_y += lbl.rect.height + 4
+        # buy button
+        widgets.append(ui.Button(btn_label, font, WHITE, size=(160, 44), fill=(0, 140, 0),
+                                 hover_fill=(0, 180, 0), on_click=lambda: buy(meta),
+                                 midbottom=(panel.centerx, panel.bottom - 24)))
+        # BACK остаётся доступен и поверх окна покупки, как было до retained-UI
+        root.open_modal(widgets + [back])
+        root.update_hover(display.mouse_pos())
+        return None
 
+    root.add(ui.Label("SHOP", title_font, GOLD, center=(WIDTH // 2, 80)))
+    root.add(ui.Label(f"Макс. сложность: {max_difficulty}", font, WHITE, topleft=(20, 20)))
+    empty = root.add(ui.Label("No items available", small, (190, 190, 190), center=(WIDTH // 2, HEIGHT // 2)))
+    grid = root.add(ui.IconGrid(cols, WIDTH // 2, start_y, gap_x, gap_y, small,
+                                hover_color=HOVER, owned_color=GREEN, on_click=open_details))
+    left = root.add(ui.ArrowButton(-1, (WIDTH // 2 - 120, HEIGHT - 70), on_click=lambda: turn(-1), hover_color=HOVER))
+    right = root.add(ui.ArrowButton(1, (WIDTH // 2 + 120, HEIGHT - 70), on_click=lambda: turn(1), hover_color=HOVER))
+    page_label = root.add(ui.Label("1/1", small, WHITE, center=(WIDTH // 2, HEIGHT - 70)))
+    back = root.add(ui.Button("BACK", font, RED, LIGHT_RED, on_click=lambda: "back", outline=False,
+                              topleft=(20, HEIGHT - 70)))
+    refresh()
 
+    while True:
+        if catalog.poll():
+            refresh()
+        root.render()
+        # пока миниатюры грузятся, просыпаемся раз в 50 мс, чтобы забрать готовые;
+        # иначе спим до следующего события
+        event = root.wait(50 if catalog.loading() else None)
+        if event.type == pygame.QUIT:
+            return leave()
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE and root.modal:
+                root.close_modal()
+                refresh()
+            elif not root.modal and event.key == pygame.K_LEFT:
+                turn(-1)
+            elif not root.modal and event.key == pygame.K_RIGHT:
+                turn(1)
+        if root.handle(event) == "back":
+            return leave()
@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+from collections import deque
+
+import pygame
+
+try:
+    import numpy as np
+except ImportError:  # fall back to the per-pixel loop
+    np = None
+
+ICON_CACHE_FILE = "shop_icon_cache.json"
+THUMB_SIZE = (64, 64)
+
+
+def classify_icon(img):
+    """
+    Heuristic filter for "planet-like" round icons on a thumbnail:
+    opaque bounding box + fill ratio, sampling every 2 px.
+    Returns {"aspect", "fill", "skip"}.
+    """
+    w, h = img.get_width(), img.get_height()
+    if np is not None:
+        alpha = pygame.surfarray.array_alpha(img)[::2, ::2]  # [x, y]
+        mask = alpha > 10
+        opaque = int(mask.sum())
+        if opaque:
+            xs = np.flatnonzero(mask.any(axis=1)) * 2
+            ys = np.flatnonzero(mask.any(axis=0)) * 2
+            minx, maxx, miny, maxy = int(xs[0]), int(xs[-1]), int(ys[0]), int(ys[-1])
+        else:
+            minx, miny, maxx, maxy = w, h, 0, 0
+    else:
+        minx, miny, maxx, maxy = w, h, 0, 0
+        opaque = 0
+        for y in range(0, h, 2):
+            for x in range(0, w, 2):
+                if img.get_at((x, y)).a > 10:
+                    opaque += 1
+                    minx, miny = min(minx, x), min(miny, y)
+                    maxx, maxy = max(maxx, x), max(maxy, y)
+    aspect = fill_ratio = 0.0
+    skip = False
+    if maxx > minx and maxy > miny:
+        bw, bh = (maxx - minx + 1), (maxy - miny + 1)
+        aspect = bw / bh if bh else 1.0
+        fill_ratio = opaque / ((w // 2) * (h // 2) + 1e-6)
+        # circle-like if nearly square bbox and medium-high fill density
+        skip = 0.9 <= aspect <= 1.1 and 0.60 <= fill_ratio <= 0.90
+    return {"aspect": round(aspect, 4), "fill": round(fill_ratio, 4), "skip": skip}
+
+
+def _load_thumb(path, size):
+    img = pygame.image.load(path)
+    if img.get_bitsize() != 32:
+        rgba = pygame.Surface(img.get_size(), pygame.SRCALPHA, 32)
+        rgba.blit(img, (0, 0))
+        img = rgba
+    return pygame.transform.smoothscale(img, size)
+
+
+class IconCatalog:
+    """
+    Shop icon list that opens without decoding anything.
+    The directory is scanned with stat() only. Classification results persist
+    in ICON_CACHE_FILE keyed by file mtime and size, so known "planet" icons are
+    filtered at once. Thumbnails are decoded on a worker thread, visible page
+    first; unknown files are classified as they load and dropped if filtered.
+    """
+
+    def __init__(self, icons_dir, cache_path=ICON_CACHE_FILE, thumb_size=THUMB_SIZE):
+        self.icons_dir = icons_dir
+        self.cache_path = cache_path
+        self.thumb_size = thumb_size
+        self._cache = self._read_cache()
+        self._stats = {}
+        self._thumbs = {}
+        self._done = []
+        self._wanted = deque()
+        self._queued = set()
+        self._cond = threading.Condition()
+        self._stop = False
+        self._busy = False
+        self._dirty_cache = False
+        self.items = []
+        try:
+            entries = sorted((e for e in os.scandir(icons_dir)
+                              if e.is_file() and e.name.lower().endswith(".png")), key=lambda e: e.name)
+        except OSError:
+            entries = []
+        for e in entries:
+            st = e.stat()
+            self._stats[e.name] = {"mtime": st.st_mtime_ns, "size": st.st_size}
+            meta = self._cached_meta(e.name)
+            if meta is None or not meta["skip"]:
+                self.items.append(e.name)
+        # всё ещё не классифицированные — в фон после видимой страницы
+        self._background = [n for n in self.items if self._cached_meta(n) is None]
+        self._thread = threading.Thread(target=self._worker, name="shop-thumbs", daemon=True)
+        self._thread.start()
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def _cached_meta(self, name):
+        meta = self._cache.get(name)
+        st = self._stats.get(name)
+        if meta and st and meta.get("mtime") == st["mtime"] and meta.get("size") == st["size"]:
+            return meta
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._wanted and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                name = self._wanted.popleft()
+                self._busy = True
+            try:
+                thumb = _load_thumb(os.path.join(self.icons_dir, name), self.thumb_size)
+                meta = classify_icon(thumb)
+            except Exception:
+                thumb, meta = None, {"aspect": 0.0, "fill": 0.0, "skip": True}
+            with self._cond:
+                self._done.append((name, thumb, meta))
+                self._busy = False
+
+    def request(self, names):
+        """Queue thumbnails for these names ahead of everything else."""
+        with self._cond:
+            for name in reversed(list(names)):
+                if name in self._thumbs:
+                    continue
+                if name in self._queued:
+                    try:
+                        self._wanted.remove(name)
+                    except ValueError:
+                        continue  # already being decoded
+                self._queued.add(name)
+                self._wanted.appendleft(name)
+            # незнакомые файлы классифицируем в фоне, после видимых
+            for name in self._background:
+                if name not in self._queued:
+                    self._queued.add(name)
+                    self._wanted.append(name)
+            self._background = []
+            self._cond.notify()
+
+    def poll(self):
+        """Main thread: adopt finished thumbnails. Returns True if anything changed."""
+        with self._cond:
+            done, self._done = self._done, []
+        for name, thumb, meta in done:
+            st = self._stats.get(name)
+            if st and self._cached_meta(name) is None:
+                self._cache[name] = dict(meta, **st)
+                self._dirty_cache = True
+            if meta["skip"]:
+                if name in self.items:
+                    self.items.remove(name)
+            elif thumb is not None:
+                self._thumbs[name] = thumb.convert_alpha()
+        if self._dirty_cache and not self._wanted:
+            self.save()
+        return bool(done)
+
+    def thumb(self, name):
+        return self._thumbs.get(name)
+
+    def loading(self):
+        return bool(self._wanted) or bool(self._done) or self._busy
+
+    def save(self):
+        # пишем во временный файл и подменяем, чтобы не оставить битый JSON
+        tmp = self.cache_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._cache, f)
+            os.replace(tmp, self.cache_path)
+            self._dirty_cache = False
+        except OSError:
+            pass
+
+    def close(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._dirty_cache:
+            self.save()
@@ -0,0 +1,96 @@
+class SpatialHash:
+    """
+    Uniform grid broadphase for rect collisions.
+    Items are anything with a pygame.Rect (sprites by default: item.rect).
+    rebuild() every tick is O(n); collide() only looks at the cells a rect covers.
+    Hits come back in insertion order, so results match pygame.sprite.spritecollide
+    over a group that was inserted in the same order.
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self._cells = {}
+        self._order = {}
+        self._rects = {}
+        self._spans = {}
+        self._next = 0
+
+    def __len__(self):
+        return len(self._order)
+
+    def clear(self):
+        self._cells.clear()
+        self._order.clear()
+        self._rects.clear()
+        self._spans.clear()
+        self._next = 0
+
+    def _cell_range(self, rect):
+        cs = self.cell_size
+        return (rect.left // cs, rect.top // cs,
+                (rect.right - 1) // cs, (rect.bottom - 1) // cs)
+
+    def insert(self, item, rect=None):
+        if rect is None:
+            rect = item.rect
+        self._order[item] = self._next
+        self._next += 1
+        self._rects[item] = rect
+        span = self._spans[item] = self._cell_range(rect)
+        x0, y0, x1, y1 = span
+        cells = self._cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = [item]
+                else:
+                    bucket.append(item)
+
+    def remove(self, item):
+        span = self._spans.pop(item, None)
+        if span is None:
+            return
+        del self._order[item]
+        del self._rects[item]
+        x0, y0, x1, y1 = span
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = self._cells.get((cx, cy))
+                if bucket and item in bucket:
+                    bucket.remove(item)
+
+    def rebuild(self, items):
+        self.clear()
+        for item in items:
+            self.insert(item)
+
+    def candidates(self, rect):
+        """Items sharing at least one cell with rect (deduplicated, insertion order)."""
+        x0, y0, x1, y1 = self._cell_range(rect)
+        cells = self._cells
+        if x0 == x1 and y0 == y1:
+            return list(cells.get((x0, y0), ()))
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        order = self._order
+        return sorted(found, key=order.__getitem__)
+
+    def collide(self, rect):
+        """Items whose rect overlaps the given rect."""
+        rects = self._rects
+        return [item for item in self.candidates(rect) if rects[item].colliderect(rect)]
+
+    def collide_sprite(self, sprite, dokill=False):
+        """spritecollide(sprite, group, dokill) equivalent backed by the grid."""
+        hits = self.collide(sprite.rect)
+        if dokill:
+            for item in hits:
+                item.kill()
+                self.remove(item)
+        return hits
+
@@ -0,0 +1,192 @@
+import atexit
+import json
+import queue
+import sqlite3
+import sys
+import threading
+
+STORAGE_FILE = "progress.db"
+SCHEMA_VERSION = 1
+
+# Старые файлы прогресса: импортируются один раз при создании базы
+LEGACY_TOP_SCORE = "top_score.txt"
+LEGACY_MAX_DIFFICULTY = "max_difficulty.txt"
+LEGACY_COINS = "coins.txt"
+LEGACY_PURCHASES = "purchases.json"
+
+MIGRATIONS = {
+    1: [
+        "CREATE TABLE progress (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        "CREATE TABLE purchases (item TEXT PRIMARY KEY, owned INTEGER NOT NULL)",
+    ],
+}
+
+
+def _read_int(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read().strip()
+        return int(text) if text else None
+    except (OSError, ValueError):
+        return None
+
+
+class Storage:
+    """
+    Player progress in SQLite (WAL journal): integer counters such as top_score,
+    max_difficulty and coins, plus owned shop items.
+
+    Everything is read once into memory; reads never touch the disk. Every write
+    updates the cache at once and is committed as its own transaction. With
+    background=True the commit happens on a writer thread, so callers (e.g. the
+    game-over screen) never wait on disk; flush() waits for pending writes.
+    A crash mid-write leaves the previous committed state intact.
+    """
+
+    def __init__(self, path=STORAGE_FILE, background=True):
+        self.path = path
+        self.errors = []
+        self._progress = {}
+        self._purchases = {}
+        # с background это же соединение уходит потоку записи: если база не открывается,
+        # ошибка вылетает здесь, а не в потоке, на котором потом навсегда повиснет flush()
+        conn = self._connect(check_same_thread=not background)
+        try:
+            self._migrate(conn)
+            self._progress = dict(conn.execute("SELECT key, value FROM progress"))
+            self._purchases = {item: bool(owned) for item, owned in conn.execute("SELECT item, owned FROM purchases")}
+        except BaseException:
+            conn.close()
+            raise
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._writer, args=(conn,), name="storage-writer", daemon=True)
+            self._thread.start()
+        else:
+            conn.close()
+
+    def _connect(self, check_same_thread=True):
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=check_same_thread)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _migrate(self, conn):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(f"{self.path}: schema v{version} is newer than supported v{SCHEMA_VERSION}")
+        fresh = version == 0
+        with conn:
+            for v in range(version + 1, SCHEMA_VERSION + 1):
+                for sql in MIGRATIONS[v]:
+                    conn.execute(sql)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            if fresh:
+                self._import_legacy(conn)
+
+    @staticmethod
+    def _import_legacy(conn):
+        for key, path in (("top_score", LEGACY_TOP_SCORE), ("max_difficulty", LEGACY_MAX_DIFFICULTY),
+                          ("coins", LEGACY_COINS)):
+            value = _read_int(path)
+            if value is not None:
+                conn.execute("INSERT OR REPLACE INTO progress (key, value) VALUES (?, ?)", (key, value))
+        try:
+            with open(LEGACY_PURCHASES, "r", encoding="utf-8") as f:
+                purchases = json.load(f)
+        except (OSError, ValueError):
+            purchases = {}
+        if isinstance(purchases, dict):
+            conn.executemany("INSERT OR REPLACE INTO purchases (item, owned) VALUES (?, ?)",
+                             [(str(k), int(bool(v))) for k, v in purchases.items()])
+
+    # --- чтение (из кэша)
+
+    def get(self, key, default=0):
+        return self._progress.get(key, default)
+
+    def purchases(self):
+        """Copy of {item_id: owned}."""
+        return dict(self._purchases)
+
+    def owned(self, item):
+        return self._purchases.get(item, False)
+
+    # --- запись
+
+    def set(self, key, value):
+        value = int(value)
+        self._progress[key] = value
+        self._submit("INSERT INTO progress (key, value) VALUES (?, ?) "
+                     "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, value))
+
+    def record_max(self, key, value):
+        """Keep the larger of the stored and the new value; returns True if it grew."""
+        value = int(value)
+        if key in self._progress and self._progress[key] >= value:
+            return False
+        self._progress[key] = value
+        self._submit("INSERT INTO progress (key, value) VALUES (?, ?) "
+                     "ON CONFLICT(key) DO UPDATE SET value = max(value, excluded.value)", (key, value))
+        return True
+
+    def set_purchase(self, item, owned=True):
+        self._purchases[item] = bool(owned)
+        self._submit("INSERT INTO purchases (item, owned) VALUES (?, ?) "
+                     "ON CONFLICT(item) DO UPDATE SET owned = excluded.owned", (item, int(bool(owned))))
+
+    def _submit(self, sql, params):
+        if self._queue is not None:
+            self._queue.put((sql, params))
+        else:
+            conn = self._connect()
+            try:
+                self._execute(conn, sql, params)
+            finally:
+                conn.close()
+
+    def _execute(self, conn, sql, params):
+        try:
+            with conn:
+                conn.execute(sql, params)
+        except sqlite3.Error as e:
+            # не глотаем молча: запоминаем и пишем в stderr
+            self.errors.append(e)
+            print(f"storage: write to {self.path} failed: {e}", file=sys.stderr)
+
+    def _writer(self, conn):
+        try:
+            while True:
+                job = self._queue.get()
+                try:
+                    if job is None:
+                        return
+                    self._execute(conn, *job)
+                finally:
+                    self._queue.task_done()
+        finally:
+            conn.close()
+
+    def flush(self):
+        """Block until every submitted write is committed."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+_default = None
+
+
+def get_storage():
+    """Shared Storage for the game, opened on first use and flushed at exit."""
+    global _default
+    if _default is None:
+        _default = Storage(STORAGE_FILE)
+        atexit.register(_default.close)
+    return _default
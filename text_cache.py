@@ -0,0 +1,80 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class DigitAtlas:
+    """
+    Pre-rendered glyphs for one (font, colour): numbers are drawn glyph by glyph,
+    so a changing score never rasterizes new text.
+    """
+    CHARS = "0123456789-"
+
+    def __init__(self, font, color, antialias=True):
+        self.glyphs = {ch: font.render(ch, antialias, color) for ch in self.CHARS}
+        self.height = max(g.get_height() for g in self.glyphs.values())
+
+    def width(self, value):
+        glyphs = self.glyphs
+        return sum(glyphs[ch].get_width() for ch in str(value))
+
+    def draw(self, target, value, pos):
+        """Blit str(value) at pos (top-left); returns the covered rect."""
+        x, y = pos
+        glyphs = self.glyphs
+        seq = []
+        for ch in str(value):
+            g = glyphs[ch]
+            seq.append((g, (x, y)))
+            x += g.get_width()
+        target.blits(seq, doreturn=False)
+        return pygame.Rect(pos[0], y, x - pos[0], self.height)
+
+
+class TextCache:
+    """
+    LRU cache of rendered text surfaces keyed by (font, text, colour, antialias).
+    Also hands out one DigitAtlas per (font, colour) for numeric HUD fields.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._surfaces = OrderedDict()
+        self._atlases = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surf = self._surfaces.get(key)
+        if surf is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = font.render(text, antialias, color)
+        self._surfaces[key] = surf
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surf
+
+    def digits(self, font, color, antialias=True):
+        key = (font, tuple(color), antialias)
+        atlas = self._atlases.get(key)
+        if atlas is None:
+            atlas = self._atlases[key] = DigitAtlas(font, color, antialias)
+        return atlas
+
+    def draw_label_number(self, target, font, label, value, color, pos):
+        """Cached label followed by atlas digits, e.g. 'SCORE: ' + 1234; returns the rect."""
+        label_surf = self.render(font, label, color)
+        rect = target.blit(label_surf, pos)
+        num_rect = self.digits(font, color).draw(target, value, (rect.right, pos[1]))
+        return rect.union(num_rect)
+
+    def clear(self):
+        self._surfaces.clear()
+        self._atlases.clear()
@@ -0,0 +1,157 @@
+import heapq
+
+FRAME_MS = 1000 / 60  # единица скоростей: спрайты и частицы движутся в пикселях за кадр при 60 FPS
+
+
+class FixedStep:
+    """
+    Accumulator for a fixed-rate simulation. advance(frame_ms) adds real time
+    and returns how many whole sim steps to run; alpha is the leftover fraction
+    of a step, used to interpolate sprite positions between the last two ticks.
+    Frames longer than max_frame_ms are clamped so a stall does not snowball
+    into ever more catch-up steps; the clipped time is counted in dropped_ms.
+    """
+
+    def __init__(self, hz=120, max_frame_ms=250):
+        self.dt = 1000.0 / hz
+        self.max_frame_ms = max_frame_ms
+        self.accumulator = 0.0
+        self.dropped_ms = 0.0
+
+    def advance(self, frame_ms):
+        if frame_ms > self.max_frame_ms:
+            self.dropped_ms += frame_ms - self.max_frame_ms
+            frame_ms = self.max_frame_ms
+        self.accumulator += frame_ms
+        steps = int(self.accumulator // self.dt)
+        self.accumulator -= steps * self.dt
+        return steps
+
+    @property
+    def alpha(self):
+        return self.accumulator / self.dt
+
+
+class FireScheduler:
+    """
+    Emits shots at exactly `rate` per second of sim time while the trigger is
+    held. The first shot fires on the tick the trigger goes down; releasing it
+    does not bank shots for later.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1000.0 / rate
+        self.next_time = 0.0
+
+    def set_rate(self, rate):
+        self.interval = 1000.0 / rate
+
+    def update(self, now, active):
+        """Returns the number of shots due at sim time `now` (ms)."""
+        if not active:
+            if self.next_time < now:
+                self.next_time = now
+            return 0
+        shots = 0
+        while self.next_time <= now:
+            shots += 1
+            self.next_time += self.interval
+        return shots
+
+
+class Timer:
+    """Handle returned by Scheduler.schedule(); pass it to cancel()/reschedule()."""
+
+    __slots__ = ("due", "interval", "callback", "name", "active", "_seq")
+
+    def __init__(self, due, interval, callback, name):
+        self.due = due
+        self.interval = interval
+        self.callback = callback
+        self.name = name
+        self.active = True
+        self._seq = 0
+
+    def __repr__(self):
+        state = f"due={self.due:.1f}" if self.active else "cancelled"
+        return f"<Timer {self.name or self.callback.__name__} {state}>"
+
+
+class Scheduler:
+    """
+    Timers on sim time (ms). advance(now) runs every timer whose due time has
+    come, in due order (ties: in scheduling order), and costs O(log n) per
+    expired timer, not per live one: only the heap top is looked at.
+    cancel() and reschedule() leave the old heap entry behind and it is skipped
+    when it surfaces. A repeating timer re-arms from the tick it fired on.
+    Time only moves through advance(), so a paused game (no sim steps)
+    freezes every timer at once.
+    """
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self._heap = []
+        self._seq = 0
+        self._stale = 0
+        self.fired = 0
+
+    def __len__(self):
+        return len(self._heap) - self._stale
+
+    def schedule(self, delay, callback, interval=None, name=None):
+        """callback(now) after delay ms; with interval it repeats every interval ms until cancelled."""
+        if interval is not None and interval <= 0:
+            raise ValueError("interval must be positive")
+        timer = Timer(self.now + delay, interval, callback, name)
+        self._push(timer)
+        return timer
+
+    def every(self, interval, callback, name=None):
+        return self.schedule(interval, callback, interval=interval, name=name)
+
+    def cancel(self, timer):
+        if timer is not None and timer.active:
+            timer.active = False
+            self._stale += 1
+
+    def reschedule(self, timer, delay):
+        """Move a timer (even a cancelled or fired one) to now + delay."""
+        if timer.active:
+            self._stale += 1
+        timer.active = True
+        timer.due = self.now + delay
+        self._push(timer)
+        return timer
+
+    def remaining(self, timer):
+        return max(0.0, timer.due - self.now) if timer.active else 0.0
+
+    def _push(self, timer):
+        self._seq += 1
+        timer._seq = self._seq
+        heapq.heappush(self._heap, (timer.due, self._seq, timer))
+        if self._stale > 64 and self._stale > len(self._heap) // 2:
+            # много отменённых — пересобрать кучу, чтобы она не росла бесконечно
+            self._heap[:] = [e for e in self._heap if e[2].active and e[1] == e[2]._seq]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def advance(self, now):
+        """Set the clock to now and run due timers; returns how many fired."""
+        self.now = now
+        heap = self._heap
+        fired = 0
+        while heap and heap[0][0] <= now:
+            _, seq, timer = heapq.heappop(heap)
+            if not timer.active or seq != timer._seq:
+                self._stale -= 1
+                continue
+            if timer.interval is None:
+                timer.active = False
+            else:
+                timer.due = now + timer.interval
+                self._push(timer)
+            fired += 1
+            timer.callback(now)
+        self.fired += fired
+        return fired
@@ -0,0 +1,361 @@
+import pygame
+
+import display
+from text_cache import TextCache
+
+# Общий кэш отрисованных подписей для всех экранов UI
+TEXT = TextCache(max_entries=256)
+
+WHITE = (255, 255, 255)
+
+
+class Widget:
+    """
+    Base retained widget: a rect plus cached drawing. State changes call
+    invalidate(), which tells the root that the next render() has work to do.
+    """
+
+    def __init__(self, rect=None):
+        self.rect = pygame.Rect(rect or (0, 0, 0, 0))
+        self.visible = True
+        self.hovered = False
+        self.root = None
+
+    def invalidate(self):
+        if self.root is not None:
+            self.root.dirty = True
+
+    def set_visible(self, visible):
+        if visible != self.visible:
+            self.visible = visible
+            self.invalidate()
+
+    def contains(self, pos):
+        return self.visible and self.rect.collidepoint(pos)
+
+    def set_hover(self, hovered):
+        if hovered != self.hovered:
+            self.hovered = hovered
+            self.invalidate()
+
+    def hover_at(self, pos):
+        """Called on mouse motion when the widget is under the cursor."""
+        self.set_hover(True)
+
+    def click(self, pos):
+        return None
+
+    def draw(self, surface):
+        pass
+
+
+class Label(Widget):
+    """Text rendered once per (text, colour); anchor is any Rect keyword, e.g. center=(x, y)."""
+
+    def __init__(self, text, font, color, **anchor):
+        super().__init__()
+        self.font = font
+        self.color = color
+        self.anchor = anchor
+        self.text = None
+        self.image = None
+        self.set_text(text)
+
+    def set_text(self, text, color=None):
+        color = self.color if color is None else color
+        if text == self.text and color == self.color and self.image is not None:
+            return
+        self.text = text
+        self.color = color
+        self.image = TEXT.render(self.font, text, color)
+        self.rect = self.image.get_rect(**self.anchor)
+        self.invalidate()
+
+    def draw(self, surface):
+        surface.blit(self.image, self.rect)
+
+
+class Button(Label):
+    """
+    Clickable label. Optional fixed size with fill colours (a panel button),
+    otherwise the text itself is the hit box and a white outline shows on hover.
+    """
+
+    def __init__(self, text, font, color, hover_color=None, on_click=None,
+                 size=None, fill=None, hover_fill=None, outline=True, **anchor):
+        self.hover_color = hover_color or color
+        self.on_click = on_click
+        self.size = size
+        self.fill = fill
+        self.hover_fill = hover_fill or fill
+        self.outline = outline
+        self._hover_image = None
+        super().__init__(text, font, color, **anchor)
+
+    def set_text(self, text, color=None):
+        changed = text != self.text or (color is not None and color != self.color)
+        super().set_text(text, color)
+        if changed or self._hover_image is None:
+            self._hover_image = TEXT.render(self.font, text, self.hover_color)
+        if self.size is not None:
+            self.rect = pygame.Rect((0, 0), self.size)
+            for k, v in self.anchor.items():
+                setattr(self.rect, k, v)
+
+    def click(self, pos):
+        return self.on_click() if self.on_click else None
+
+    def draw(self, surface):
+        img = self._hover_image if self.hovered else self.image
+        if self.size is not None:
+            if self.fill:
+                pygame.draw.rect(surface, self.hover_fill if self.hovered else self.fill, self.rect, border_radius=8)
+            pygame.draw.rect(surface, (220, 220, 220), self.rect, 2, border_radius=8)
+            surface.blit(img, img.get_rect(center=self.rect.center))
+            return
+        surface.blit(img, self.rect)
+        if self.hovered and self.outline:
+            pygame.draw.rect(surface, WHITE, self.rect.inflate(24, 12), 2, border_radius=6)
+
+
+class ArrowButton(Widget):
+    """Filled triangle pointing left (-1) or right (+1)."""
+
+    def __init__(self, direction, center, on_click=None, color=(200, 200, 200), hover_color=(120, 120, 255)):
+        super().__init__((0, 0, 48, 48))
+        self.rect.center = center
+        self.direction = direction
+        self.on_click = on_click
+        self.color = color
+        self.hover_color = hover_color
+
+    def click(self, pos):
+        return self.on_click() if self.on_click else None
+
+    def draw(self, surface):
+        cx, cy = self.rect.center
+        d = self.direction
+        points = [(cx - 12 * d, cy - 14), (cx + 12 * d, cy), (cx - 12 * d, cy + 14)]
+        pygame.draw.polygon(surface, self.hover_color if self.hovered else self.color, points, 0)
+
+
+class IconGrid(Widget):
+    """
+    Page of icon cells. set_cells() takes dicts with keys: key, image (or None while
+    loading), label, label_color, owned. Only real changes invalidate the widget.
+    """
+
+    def __init__(self, cols, center_x, start_y, gap_x, gap_y, font, cell=96, on_click=None,
+                 hover_color=(120, 120, 255), owned_color=(0, 200, 120)):
+        super().__init__()
+        self.cols = cols
+        self.center_x = center_x
+        self.start_y = start_y
+        self.gap_x = gap_x
+        self.gap_y = gap_y
+        self.font = font
+        self.cell = cell
+        self.on_click = on_click
+        self.hover_color = hover_color
+        self.owned_color = owned_color
+        self.cells = []
+        self._rects = []
+        self.hover_index = None
+
+    def _cell_rect(self, i):
+        start_x = self.center_x - (self.gap_x * (self.cols - 1)) // 2
+        rect = pygame.Rect(0, 0, self.cell, self.cell)
+        rect.center = (start_x + (i % self.cols) * self.gap_x, self.start_y + (i // self.cols) * self.gap_y)
+        return rect
+
+    def set_cells(self, cells):
+        if cells == self.cells:
+            return
+        self.cells = cells
+        self._rects = [self._cell_rect(i) for i in range(len(cells))]
+        self.rect = self._rects[0].unionall(self._rects[1:]) if self._rects else pygame.Rect(0, 0, 0, 0)
+        self.hover_index = None
+        self.invalidate()
+
+    def _index_at(self, pos):
+        for i, r in enumerate(self._rects):
+            if r.collidepoint(pos):
+                return i
+        return None
+
+    def contains(self, pos):
+        return self.visible and self._index_at(pos) is not None
+
+    def hover_at(self, pos):
+        self.hovered = True
+        idx = self._index_at(pos)
+        if idx != self.hover_index:
+            self.hover_index = idx
+            self.invalidate()
+
+    def set_hover(self, hovered):
+        if not hovered and self.hover_index is not None:
+            self.hover_index = None
+            self.invalidate()
+        self.hovered = hovered
+
+    def click(self, pos):
+        idx = self._index_at(pos)
+        if idx is not None and self.on_click:
+            return self.on_click(self.cells[idx]["key"])
+        return None
+
+    def draw(self, surface):
+        for i, (cell, rect) in enumerate(zip(self.cells, self._rects)):
+            pygame.draw.rect(surface, self.hover_color if i == self.hover_index else (90, 90, 90), rect, 2)
+            img = cell.get("image")
+            if img is not None:
+                surface.blit(img, img.get_rect(center=rect.center))
+            else:
+                # миниатюра ещё грузится
+                pygame.draw.rect(surface, (60, 60, 60), rect.inflate(-32, -32), border_radius=6)
+            if cell.get("label"):
+                lbl = TEXT.render(self.font, cell["label"], cell.get("label_color", WHITE))
+                surface.blit(lbl, lbl.get_rect(center=(rect.centerx, rect.bottom + 18)))
+            if cell.get("owned"):
+                pygame.draw.rect(surface, self.owned_color, rect.inflate(6, 6), 2, border_radius=6)
+
+
+class Panel(Widget):
+    """Rounded panel background for modals."""
+
+    def __init__(self, rect, fill=(30, 30, 30), border=(220, 220, 220)):
+        super().__init__(rect)
+        self.fill = fill
+        self.border = border
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, self.fill, self.rect, border_radius=10)
+        pygame.draw.rect(surface, self.border, self.rect, 2, border_radius=10)
+
+
+class Image(Widget):
+    def __init__(self, image, **anchor):
+        super().__init__()
+        self.image = image
+        self.rect = image.get_rect(**anchor)
+
+    def draw(self, surface):
+        surface.blit(self.image, self.rect)
+
+
+def wrap_text(text, font, max_width):
+    """Greedy word wrap measured with font.size() (no rendering)."""
+    if not text:
+        return [""]
+    lines = []
+    cur = ""
+    for w in text.split():
+        test = w if not cur else cur + " " + w
+        if font.size(test)[0] <= max_width:
+            cur = test
+        else:
+            if cur:
+                lines.append(cur)
+            cur = w
+    if cur:
+        lines.append(cur)
+    return lines
+
+
+class UIRoot:
+    """
+    Holds widgets, routes mouse events, and redraws only when something was
+    invalidated. A modal layer (list of widgets) captures input while shown.
+    wait() blocks in pygame.event.wait, so an idle screen costs no CPU.
+    """
+
+    def __init__(self, surface, background):
+        self.surface = surface
+        self.background = background
+        self.widgets = []
+        self.modal = []
+        self.dirty = True
+        self.renders = 0
+        self._overlay = None
+
+    def add(self, widget):
+        widget.root = self
+        self.widgets.append(widget)
+        self.dirty = True
+        return widget
+
+    def open_modal(self, widgets):
+        for w in self.widgets:
+            w.set_hover(False)
+        for w in widgets:
+            w.root = self
+        self.modal = list(widgets)
+        self.dirty = True
+
+    def close_modal(self):
+        self.modal = []
+        self.dirty = True
+
+    def set_surface(self, surface):
+        self.surface = surface
+        self._overlay = None
+        self.dirty = True
+
+    def _active(self):
+        return self.modal if self.modal else self.widgets
+
+    def _top_at(self, pos):
+        for w in reversed(self._active()):
+            if w.contains(pos):
+                return w
+        return None
+
+    def update_hover(self, pos):
+        top = self._top_at(pos)
+        for w in self._active():
+            if w is top:
+                w.hover_at(pos)
+            else:
+                w.set_hover(False)
+
+    def handle(self, event):
+        """Route one event; returns whatever a clicked widget's callback returned."""
+        if event.type == pygame.MOUSEMOTION:
+            self.update_hover(display.to_logical(event.pos))
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            pos = display.to_logical(event.pos)
+            top = self._top_at(pos)
+            if top is not None:
+                return top.click(pos)
+        elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE, pygame.WINDOWRESTORED):
+            self.dirty = True
+        return None
+
+    def render(self):
+        if not self.dirty:
+            return False
+        surf = self.surface
+        surf.fill(self.background)
+        for w in self.widgets:
+            if w.visible:
+                w.draw(surf)
+        if self.modal:
+            if self._overlay is None:
+                self._overlay = pygame.Surface(surf.get_size(), pygame.SRCALPHA)
+                self._overlay.fill((0, 0, 0, 160))
+            surf.blit(self._overlay, (0, 0))
+            for w in self.modal:
+                if w.visible:
+                    w.draw(surf)
+        display.present()
+        self.dirty = False
+        self.renders += 1
+        return True
+
+    @staticmethod
+    def wait(timeout=None):
+        """Block until the next event (or timeout ms); returns it, NOEVENT on timeout."""
+        if timeout is None:
+            return pygame.event.wait()
+        return pygame.event.wait(timeout)